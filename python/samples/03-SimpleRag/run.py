@@ -14,6 +14,7 @@ from python.src.connectors import (
 )
 from python.src.kernel import newKernel as Kernel
 from python.src.plugins import SemanticFunction, SKPlugin
+from python.src.streaming import StreamResult
 
 sys.path.append(os.getcwd() + "/python/samples/03-SimpleRag/Plugins")
 from SearchPlugin.search import Search
@@ -56,17 +57,20 @@ async def runner():
         chat_history.add_user_message(user_input)
 
         stream = True
+        variables = {
+            "persona": "You are a snarky (yet helpful) teenage assistant. Make sure to use hip slang in every response.",
+            "messages": chat_history,
+        }
         # get response
-        response = await kernel.run_async(
-            chat_function,
-            variables={
-                "persona": "You are a snarky (yet helpful) teenage assistant. Make sure to use hip slang in every response.",
-                "messages": chat_history,
-            },
-            request_settings={"stream": stream},
-        )
-
-        if not stream:
+        if stream:
+            # chunks are written to stdout by the StreamingResultToStdOutHook
+            async for event in kernel.run_stream_async(
+                chat_function, variables=variables
+            ):
+                if isinstance(event, StreamResult):
+                    response = event.result
+        else:
+            response = await kernel.run_async(chat_function, variables=variables)
             # print response
             print(f"Assistant:> {response[chat_function.output_variable_name]}")
             print(f"Token usage: {response['token_usage']}")
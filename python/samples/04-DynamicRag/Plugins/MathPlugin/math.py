@@ -2,6 +2,8 @@ import math
 from enum import Enum
 from typing import TYPE_CHECKING
 
+import numpy as np
+
 from python.src.planners.handlebars_planner import (
     HandleBarsPlanner,
     HandleBarsPlannerConfig,
@@ -84,29 +86,11 @@ class Math:
                 last_error = str(exc)
                 max_tries -= 1
 
-    def _get_variables(self, args, kwargs, function):
-        if "variables" in kwargs and kwargs["variables"]:
-            return kwargs["variables"]
-        variables = {}
-        idx = 0
-        for parameter in function.__sk_function_context_parameters__:
-            if parameter["direction"] == "output":
-                continue
-            if parameter["name"] in kwargs:
-                variables[parameter["name"]] = kwargs[parameter["name"]]
-            elif args:
-                variables[parameter["name"]] = args[idx]
-            if (
-                variables[parameter["name"]] is None
-                and parameter["default_value"] is not None
-            ):
-                variables[parameter["name"]] = parameter["default_value"]
-            idx += 1
-        return variables
-
     @sk_function(
         description="Adds two numbers",
         name="Add",
+        pure=True,
+        batch="add_batch",
     )
     @sk_function_parameter(
         name="number1",
@@ -127,15 +111,17 @@ class Math:
         type="number",
         required=True,
     )
-    def add(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.add)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return float(variables["number1"]) + float(variables["number2"])
+    def add(self, number1: float, number2: float) -> float:
+        return number1 + number2
+
+    def add_batch(self, number1, number2):
+        return number1 + number2
 
     @sk_function(
         description="Subtracts two numbers",
         name="Subtract",
+        pure=True,
+        batch="subtract_batch",
     )
     @sk_function_parameter(
         name="number1",
@@ -156,15 +142,17 @@ class Math:
         type="number",
         required=True,
     )
-    def subtract(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.subtract)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return float(variables["number1"]) - float(variables["number2"])
+    def subtract(self, number1: float, number2: float) -> float:
+        return number1 - number2
+
+    def subtract_batch(self, number1, number2):
+        return number1 - number2
 
     @sk_function(
         description="Multiplies two numbers",
         name="Multiply",
+        pure=True,
+        batch="multiply_batch",
     )
     @sk_function_parameter(
         name="number1",
@@ -185,15 +173,17 @@ class Math:
         type="number",
         required=True,
     )
-    def multiply(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.multiply)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return float(variables["number1"]) * float(variables["number2"])
+    def multiply(self, number1: float, number2: float) -> float:
+        return number1 * number2
+
+    def multiply_batch(self, number1, number2):
+        return number1 * number2
 
     @sk_function(
         description="Divides two numbers",
         name="Divide",
+        pure=True,
+        batch="divide_batch",
     )
     @sk_function_parameter(
         name="number1",
@@ -214,15 +204,18 @@ class Math:
         type="number",
         required=True,
     )
-    def divide(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.divide)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return float(variables["number1"]) / float(variables["number2"])
+    def divide(self, number1: float, number2: float) -> float:
+        return number1 / number2
+
+    def divide_batch(self, number1, number2):
+        if np.any(number2 == 0):
+            raise ZeroDivisionError("float division by zero")
+        return number1 / number2
 
     @sk_function(
         description="Finds the remainder of two numbers",
         name="Modulo",
+        pure=True,
     )
     @sk_function_parameter(
         name="number1",
@@ -243,15 +236,14 @@ class Math:
         type="number",
         required=True,
     )
-    def modulo(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.modulo)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return float(variables["number1"]) % float(variables["number2"])
+    def modulo(self, number1: float, number2: float) -> float:
+        return number1 % number2
 
     @sk_function(
         description="Gets the absolute value of a number",
         name="Absolute",
+        pure=True,
+        batch="absolute_batch",
     )
     @sk_function_parameter(
         name="number",
@@ -266,13 +258,15 @@ class Math:
         type="number",
         required=True,
     )
-    def absolute(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.absolute)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return abs(float(variables["number"]))
+    def absolute(self, number: float) -> float:
+        return abs(number)
 
-    @sk_function(name="Ceil", description="Gets the ceiling of a single number.")
+    def absolute_batch(self, number):
+        return np.abs(number)
+
+    @sk_function(
+        name="Ceil", description="Gets the ceiling of a single number.", pure=True
+    )
     @sk_function_parameter(
         name="number",
         description="The number to get the ceiling of.",
@@ -286,13 +280,12 @@ class Math:
         type="number",
         required=True,
     )
-    def ceil(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.ceil)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.ceil(float(variables["number"]))
+    def ceil(self, number: float) -> int:
+        return math.ceil(number)
 
-    @sk_function(name="Floor", description="Gets the floor of a single number.")
+    @sk_function(
+        name="Floor", description="Gets the floor of a single number.", pure=True
+    )
     @sk_function_parameter(
         name="number",
         description="The number to get the floor of.",
@@ -306,15 +299,13 @@ class Math:
         type="number",
         required=True,
     )
-    def floor(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.floor)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.floor(float(variables["number"]))
+    def floor(self, number: float) -> int:
+        return math.floor(number)
 
     @sk_function(
         name="Max",
         description="Gets the maximum value of two numbers.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number1",
@@ -335,15 +326,13 @@ class Math:
         type="number",
         required=True,
     )
-    def max(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.max)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return max(float(variables["number1"]), float(variables["number2"]))
+    def max(self, number1: float, number2: float) -> float:
+        return max(number1, number2)
 
     @sk_function(
         name="Min",
         description="Gets the minimum value of two numbers.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number1",
@@ -364,15 +353,13 @@ class Math:
         type="number",
         required=True,
     )
-    def min(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.min)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return min(float(variables["number1"]), float(variables["number2"]))
+    def min(self, number1: float, number2: float) -> float:
+        return min(number1, number2)
 
     @sk_function(
         name="Sign",
         description="Gets the sign of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number",
@@ -387,15 +374,14 @@ class Math:
         type="number",
         required=True,
     )
-    def sign(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.sign)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.copysign(1.0, float(variables["number"]))
+    def sign(self, number: float) -> float:
+        return math.copysign(1.0, number)
 
     @sk_function(
         name="Sqrt",
         description="Gets the square root of a number.",
+        pure=True,
+        batch="sqrt_batch",
     )
     @sk_function_parameter(
         name="number",
@@ -410,15 +396,18 @@ class Math:
         type="number",
         required=True,
     )
-    def sqrt(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.sqrt)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.sqrt(float(variables["number"]))
+    def sqrt(self, number: float) -> float:
+        return math.sqrt(number)
+
+    def sqrt_batch(self, number):
+        if np.any(number < 0):
+            raise ValueError("math domain error")
+        return np.sqrt(number)
 
     @sk_function(
         name="Sin",
         description="Gets the sine of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number",
@@ -433,15 +422,13 @@ class Math:
         type="number",
         required=True,
     )
-    def sin(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.sin)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.sin(float(variables["number"]))
+    def sin(self, number: float) -> float:
+        return math.sin(number)
 
     @sk_function(
         name="Cos",
         description="Gets the cosine of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number",
@@ -456,15 +443,13 @@ class Math:
         type="number",
         required=True,
     )
-    def cos(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.cos)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.cos(float(variables["number"]))
+    def cos(self, number: float) -> float:
+        return math.cos(number)
 
     @sk_function(
         name="Tan",
         description="Gets the tangent of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number",
@@ -479,15 +464,13 @@ class Math:
         type="number",
         required=True,
     )
-    def tan(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.tan)
-        if "number" not in variables:
-            raise ValueError("Missing number in both args and kwargs")
-        return math.tan(float(variables["number"]))
+    def tan(self, number: float) -> float:
+        return math.tan(number)
 
     @sk_function(
         name="Pow",
         description="Gets the power of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number",
@@ -508,15 +491,13 @@ class Math:
         type="number",
         required=True,
     )
-    def pow(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.pow)
-        if "number" not in variables or "power" not in variables:
-            raise ValueError("Missing number or power in both args and kwargs")
-        return math.pow(float(variables["number"]), float(variables["power"]))
+    def pow(self, number: float, power: float) -> float:
+        return math.pow(number, power)
 
     @sk_function(
         name="Log",
         description="Gets the logarithm of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number1",
@@ -537,15 +518,13 @@ class Math:
         type="number",
         required=True,
     )
-    def log(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.log)
-        if "number1" not in variables and "number2" not in variables:
-            raise ValueError("Missing number1 in both args and kwargs")
-        return math.log(float(variables["number1"]), float(variables["number2"]))
+    def log(self, number1: float, number2: float) -> float:
+        return math.log(number1, number2)
 
     @sk_function(
         name="Round",
         description="Gets the rounded value of a number.",
+        pure=True,
     )
     @sk_function_parameter(
         name="number1",
@@ -566,8 +545,5 @@ class Math:
         type="number",
         required=True,
     )
-    def round(self, *args, **kwargs):
-        variables = self._get_variables(args, kwargs, self.round)
-        if "number1" not in variables or "number2" not in variables:
-            raise ValueError("Missing number1 or number2 in both args and kwargs.")
-        return round(float(variables["number1"]), int(variables["number2"]))
+    def round(self, number1: float, number2: float) -> float:
+        return round(number1, int(number2))
@@ -12,10 +12,9 @@ from python.src.connectors import (
     StreamingResultToStdOutHook,
 )
 from python.src.kernel import newKernel as Kernel
-from python.src.plugins import SemanticFunction, SKPlugin
+from python.src.plugins import PluginDirectory, SemanticFunction
 
 sys.path.append(os.getcwd() + "/python/samples/04-DynamicRag/Plugins")
-from MathPlugin.math import Math
 
 
 async def runner():
@@ -29,25 +28,11 @@ async def runner():
         endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
     )
-    math_plugin = SKPlugin.from_class(
-        "Math",
-        Math(),
-    )
-    math_plugin.add_function(
-        SemanticFunction.from_path(
-            path=os.getcwd()
-            + "/python/samples/04-DynamicRag/Plugins/MathPlugin/GenerateMathProblem.prompt.yaml"
-        )
-    )
-    intent_plugin = SKPlugin(
-        "Intent",
-        functions=[
-            SemanticFunction.from_path(
-                path=os.getcwd()
-                + "/python/samples/04-DynamicRag/Plugins/IntentPlugin/GetNextStep.prompt.yaml"
-            )
-        ],
-    )
+    # functions are loaded when first used, the rest of the plugins on a thread
+    plugins = PluginDirectory(os.getcwd() + "/python/samples/04-DynamicRag/Plugins")
+    math_plugin = plugins.plugin("Math")
+    intent_plugin = plugins.plugin("Intent")
+    plugins.warm_up(background=True)
     chat_function = SemanticFunction.from_path(
         path=os.getcwd()
         + "/python/samples/04-DynamicRag/Plugins/ChatPlugin/Chat.prompt.yaml"
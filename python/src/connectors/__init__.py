@@ -1,10 +1,13 @@
 from .ai.openai.azure_chat_completion import RESPONSE_OBJECT_KEY, AzureChatCompletion
+from .ai.openai.load_balancer import LoadBalancer, get_load_balancer
 from .ai.openai.openai_chat_history import OpenAIChatHistory
 from .ai.openai.openai_hooks import (
     AddAssistantMessageToHistoryHook,
     StreamingResultToStdOutHook,
     TokenUsageHook,
 )
+from .ai.openai.rate_limiter import RateLimiter
+from .ai.openai.response_cache import ResponseCache, get_response_cache
 
 __all__ = [
     "RESPONSE_OBJECT_KEY",
@@ -13,4 +16,9 @@ __all__ = [
     "StreamingResultToStdOutHook",
     "TokenUsageHook",
     "AddAssistantMessageToHistoryHook",
+    "RateLimiter",
+    "LoadBalancer",
+    "get_load_balancer",
+    "ResponseCache",
+    "get_response_cache",
 ]
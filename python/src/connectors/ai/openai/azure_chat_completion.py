@@ -1,12 +1,25 @@
+import asyncio
 import logging
+from collections.abc import AsyncGenerator, AsyncIterator
 from typing import Any, Final
 
+import aiohttp
 import openai
+from pydantic import PrivateAttr
 from semantic_kernel.connectors.ai import ChatCompletionClientBase
 from semantic_kernel.sk_pydantic import SKBaseModel
 from semantic_kernel.skill_definition.parameter_view import ParameterView as Parameter
 
+from ....template_engine.rendered_prompt import RenderedPrompt
 from .openai_chat_history import OpenAIChatHistory
+from .rate_limiter import (
+    RateLimiter,
+    estimate_completion_tokens,
+    estimate_request_tokens,
+)
+from .response_cache import ResponseCache, get_response_cache, response_key
+from .single_flight import SingleFlight
+from .tracked_stream import TrackedStream
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,13 +32,79 @@ class AzureChatCompletion(SKBaseModel, ChatCompletionClientBase):
     endpoint: str
     api_version: str
     api_type: str = "azure"
+    connection_pool_size: int = 100
+    connection_pool_size_per_host: int = 0
+    keepalive_timeout: float = 30.0
+    response_cache: ResponseCache | None = None
+    # identical in-flight requests share one call, unless they are sampled
+    deduplicate_requests: bool = True
+    rate_limiter: RateLimiter | None = None
+    _session: aiohttp.ClientSession | None = PrivateAttr(default=None)
+    _session_loop: asyncio.AbstractEventLoop | None = PrivateAttr(default=None)
+    _sessions_created: int = PrivateAttr(default=0)
+    _requests: int = PrivateAttr(default=0)
+    _in_flight: int = PrivateAttr(default=0)
+    _peak_in_flight: int = PrivateAttr(default=0)
+    _single_flight: SingleFlight = PrivateAttr(default_factory=SingleFlight)
+
+    async def __aenter__(self) -> "AzureChatCompletion":
+        self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled HTTP session; a new one is created on the next request."""
+        session, self._session = self._session, None
+        self._session_loop = None
+        if session is not None and not session.closed:
+            await session.close()
+
+    @property
+    def pool_stats(self) -> dict[str, int]:
+        """Connection pool statistics of this service.
+
+        The pool is saturated when in_flight reaches connection_pool_size and
+        requests start waiting for a connection. A streamed request counts as in
+        flight until its stream is over.
+        """
+        session = self._session
+        return {
+            "limit": self.connection_pool_size,
+            "limit_per_host": self.connection_pool_size_per_host,
+            "session_open": int(session is not None and not session.closed),
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "requests": self._requests,
+            "sessions_created": self._sessions_created,
+            "coalesced": self._single_flight.coalesced,
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            # sessions are bound to the loop they were created on
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_pool_size,
+                limit_per_host=self.connection_pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+            self._sessions_created += 1
+        return self._session
 
     def create_new_chat(self):
         return OpenAIChatHistory()
 
     async def complete_chat_async(
         self,
-        rendered_template: str,
+        rendered_template: str | RenderedPrompt,
         *,
         request_settings: dict,
         output_variables: list[Parameter] = None,
@@ -34,9 +113,14 @@ class AzureChatCompletion(SKBaseModel, ChatCompletionClientBase):
     ) -> dict:
         if "service" in kwargs:
             del kwargs["service"]
-        chat_history = OpenAIChatHistory.from_rendered_template(rendered_template)
+        if isinstance(rendered_template, RenderedPrompt):
+            messages = rendered_template.messages
+        else:
+            # only raw prompt text is parsed; templates render to a RenderedPrompt
+            chat_history = OpenAIChatHistory.from_rendered_template(rendered_template)
+            messages = [message.as_dict() for message in chat_history]
         response = await self._send_chat_request(
-            chat_history, request_settings, functions=functions, **kwargs
+            messages, request_settings, functions=functions, **kwargs
         )
 
         if request_settings.get("stream", False):
@@ -62,13 +146,11 @@ class AzureChatCompletion(SKBaseModel, ChatCompletionClientBase):
 
     async def _send_chat_request(
         self,
-        chat_history: OpenAIChatHistory,
+        messages: list[dict],
         request_settings: dict,
         functions: list[dict] = None,
         **kwargs,
     ):
-        messages = [message.as_dict() for message in chat_history]
-
         model_args = {
             "api_key": self.api_key,
             "api_type": self.api_type,
@@ -92,10 +174,111 @@ class AzureChatCompletion(SKBaseModel, ChatCompletionClientBase):
         if kwargs:
             model_args.update(kwargs)
 
-        response: Any = await openai.ChatCompletion.acreate(**model_args)
+        stream = model_args["stream"]
+        # sampled requests ask for independent completions, so they are not shared
+        deduplicate = self.deduplicate_requests and _is_deterministic(model_args)
+        cache = None
+        if request_settings.get("cache", False):
+            # responses are cached only for functions that opt in through their
+            # execution settings; a cache_path there selects a persistent cache
+            cache_path = request_settings.get("cache_path")
+            if cache_path is not None:
+                cache = get_response_cache(cache_path)
+            else:
+                cache = self.response_cache
+                if cache is None:
+                    cache = get_response_cache()
+        if cache is None and not deduplicate:
+            return await self._create_completion(model_args)
+
+        key = response_key(model_args)
+        if cache is not None:
+            payload = await cache.get_async(key)
+            if payload is not None:
+                return self._from_payload(payload, stream)
+
+        async def create() -> Any:
+            response = await self._create_completion(model_args)
+            if cache is None:
+                return response
+            ttl = request_settings.get("cache_ttl")
+            if stream:
+                return self._record_stream(response, cache, key, ttl)
+            await cache.set_async(key, response.to_dict_recursive(), ttl)
+            return response
+
+        if not deduplicate:
+            return await create()
+        return await self._single_flight.do(key, create, stream=stream)
+
+    async def _create_completion(self, model_args: dict) -> Any:
+        if self.rate_limiter is None:
+            return await self._send_completion(model_args)
+        return await self.rate_limiter.run(
+            lambda: self._send_completion(model_args),
+            estimate_request_tokens(model_args),
+            completion_tokens=estimate_completion_tokens(model_args),
+        )
+
+    async def _send_completion(self, model_args: dict) -> Any:
+        # openai uses the session from this context variable instead of opening
+        # a new session (and connection) per request
+        token = openai.aiosession.set(self._get_session())
+        self._requests += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            response = await openai.ChatCompletion.acreate(**model_args)
+        except BaseException:
+            self._in_flight -= 1
+            raise
+        finally:
+            openai.aiosession.reset(token)
+        if isinstance(response, AsyncIterator):
+            # a stream holds its pooled connection until it is over
+            return TrackedStream(response, self._end_request)
+        self._in_flight -= 1
         return response
 
+    def _end_request(self, error: BaseException | None = None):
+        self._in_flight -= 1
+
+    async def _record_stream(
+        self,
+        stream: AsyncGenerator,
+        cache: ResponseCache,
+        key: str,
+        ttl: float | None,
+    ) -> AsyncGenerator:
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk.to_dict_recursive())
+            yield chunk
+        # only completely consumed streams are cached
+        await cache.set_async(key, chunks, ttl)
+
+    def _from_payload(self, payload: Any, stream: bool) -> Any:
+        if stream:
+            return self._replay_stream(payload)
+        return self._to_openai_object(payload)
+
+    async def _replay_stream(self, chunks: list[dict]) -> AsyncGenerator:
+        for chunk in chunks:
+            yield self._to_openai_object(chunk)
+
+    def _to_openai_object(self, data: dict) -> Any:
+        return openai.util.convert_to_openai_object(
+            data,
+            api_key=self.api_key,
+            api_version=self.api_version,
+            engine=self.deployment_name,
+        )
+
     @property
     def name(self):
         # TODO: replace with name that can be initiated and matched to yaml model names
         return self.deployment_name
+
+
+def _is_deterministic(model_args: dict) -> bool:
+    return model_args["temperature"] == 0 and model_args["n"] == 1
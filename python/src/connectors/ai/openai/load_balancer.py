@@ -0,0 +1,287 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    Iterator,
+    Sequence,
+)
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+import openai
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from .azure_chat_completion import RESPONSE_OBJECT_KEY
+from .rate_limiter import _retry_after
+from .tracked_stream import TrackedStream
+
+_LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DeploymentHealth:
+    """What the balancer knows about one deployment.
+
+    The circuit opens after failure_threshold failures in a row, or when the
+    error rate reaches error_rate_threshold; after open_seconds one probe
+    request is let through, which closes it again if it succeeds.
+    """
+
+    def __init__(self, service: Any):
+        self.service = service
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.throttled_until = 0.0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    def throttled(self, now: float) -> bool:
+        if now < self.throttled_until:
+            return True
+        limiter = getattr(self.service, "rate_limiter", None)
+        return bool(limiter is not None and limiter.paused_for > 0)
+
+    def available(self, now: float, open_seconds: float) -> bool:
+        if self.throttled(now):
+            return False
+        if self.state == OPEN and now - self.opened_at >= open_seconds:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return not self.probing
+        return self.state == CLOSED
+
+    def cost(self) -> float:
+        # deployments without samples yet cost nothing, so they get tried
+        return (self.latency or 0.0) * (self.in_flight + 1)
+
+
+class LoadBalancer(SKBaseModel):
+    """Spreads requests over equivalent deployments by their recent health.
+
+    Each pick samples two available deployments and takes the cheaper one, by
+    EWMA latency times in-flight requests. Deployments that are throttled, or
+    whose circuit is open after failures, are skipped until they recover.
+    Requests with a session key stay on the deployment the session used before
+    while it is available, so the service can reuse its prompt cache.
+    """
+
+    latency_alpha: float = 0.2
+    error_alpha: float = 0.1
+    error_rate_threshold: float = 0.5
+    min_requests: int = 10
+    failure_threshold: int = 5
+    open_seconds: float = 30.0
+    throttle_seconds: float = 10.0
+    max_sessions: int = 10000
+    _health: dict[int, DeploymentHealth] = PrivateAttr(default_factory=dict)
+    _sessions: OrderedDict[Hashable, int] = PrivateAttr(default_factory=OrderedDict)
+    _random: random.Random = PrivateAttr(default_factory=random.Random)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def choose(self, services: Sequence[T], session: Hashable | None = None) -> T:
+        """Pick the deployment for a request from equivalent services."""
+        if len(services) == 1:
+            return services[0]
+        now = time.monotonic()
+        with self._lock:
+            health = [self._health_of(service) for service in services]
+            if session is not None:
+                sticky = self._sessions.get(session)
+                for entry in health:
+                    if id(entry.service) == sticky and entry.available(
+                        now, self.open_seconds
+                    ):
+                        self._sessions.move_to_end(session)
+                        return entry.service
+            available = [
+                entry for entry in health if entry.available(now, self.open_seconds)
+            ]
+            if not available:
+                # everything is failing; use the one that should recover first
+                chosen = min(
+                    health,
+                    key=lambda entry: max(
+                        entry.throttled_until,
+                        (
+                            entry.opened_at + self.open_seconds
+                            if entry.state != CLOSED
+                            else 0.0
+                        ),
+                    ),
+                )
+            elif len(available) == 1:
+                chosen = available[0]
+            else:
+                first, second = self._random.sample(available, 2)
+                chosen = first if first.cost() <= second.cost() else second
+            if session is not None:
+                self._sessions[session] = id(chosen.service)
+                self._sessions.move_to_end(session)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            return chosen.service
+
+    async def call(self, service: Any, send: Callable[[], Awaitable[dict]]) -> dict:
+        """Send a request to service with send() and record how it went.
+
+        A streamed response is only accounted for once its stream is over, so its
+        latency covers the whole stream and errors while reading it count. A
+        stream that is closed or dropped early tells nothing about the
+        deployment, but still ends the request.
+        """
+        request = self._begin(service)
+        try:
+            result = await send()
+        except BaseException as exc:
+            self._finish(request, exc)
+            raise
+        response = result.get(RESPONSE_OBJECT_KEY) if isinstance(result, dict) else None
+        if isinstance(response, AsyncIterator):
+            # the request is finished when the stream is over, including when it is
+            # dropped without being read
+            stream = TrackedStream(response, lambda error: self._finish(request, error))
+            return {**result, RESPONSE_OBJECT_KEY: stream}
+        self._finish(request)
+        return result
+
+    @contextmanager
+    def track(self, service: Any) -> Iterator[None]:
+        """Record the latency and outcome of a request to service that is not streamed."""
+        request = self._begin(service)
+        try:
+            yield
+        except BaseException as exc:
+            self._finish(request, exc)
+            raise
+        self._finish(request)
+
+    def _begin(self, service: Any) -> "_Request":
+        with self._lock:
+            health = self._health_of(service)
+            health.in_flight += 1
+            # the first request after the cooldown probes the deployment
+            probe = health.state == HALF_OPEN and not health.probing
+            if probe:
+                health.probing = True
+        return _Request(health, time.monotonic(), probe)
+
+    def _finish(self, request: "_Request", error: BaseException | None = None):
+        health = request.health
+        with self._lock:
+            health.in_flight -= 1
+            if request.probe:
+                health.probing = False
+            if isinstance(error, openai.error.RateLimitError):
+                retry_after = _retry_after(getattr(error, "headers", None))
+                health.throttled_until = time.monotonic() + (
+                    retry_after if retry_after is not None else self.throttle_seconds
+                )
+            elif isinstance(error, Exception):
+                self._on_failure(health)
+            elif error is None:
+                self._on_success(health, time.monotonic() - request.started)
+            # cancelled requests and closed streams tell nothing about the deployment
+
+    def mark_throttled(self, service: Any, seconds: float | None = None):
+        """Take a deployment out of rotation for seconds, or throttle_seconds."""
+        with self._lock:
+            self._health_of(service).throttled_until = time.monotonic() + (
+                self.throttle_seconds if seconds is None else seconds
+            )
+
+    @property
+    def stats(self) -> dict[str, dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                _name(health.service): {
+                    "latency": health.latency,
+                    "in_flight": health.in_flight,
+                    "error_rate": health.error_rate,
+                    "requests": health.requests,
+                    "failures": health.failures,
+                    "state": health.state,
+                    "throttled": health.throttled(now),
+                }
+                for health in self._health.values()
+            }
+
+    def _health_of(self, service: Any) -> DeploymentHealth:
+        health = self._health.get(id(service))
+        if health is None or health.service is not service:
+            health = self._health[id(service)] = DeploymentHealth(service)
+        return health
+
+    def _on_success(self, health: DeploymentHealth, latency: float):
+        health.requests += 1
+        health.latency = (
+            latency
+            if health.latency is None
+            else health.latency + self.latency_alpha * (latency - health.latency)
+        )
+        health.error_rate -= self.error_alpha * health.error_rate
+        health.consecutive_failures = 0
+        if health.state != CLOSED:
+            _LOGGER.info("Closing the circuit of %s", _name(health.service))
+            health.state = CLOSED
+            health.error_rate = 0.0
+
+    def _on_failure(self, health: DeploymentHealth):
+        health.requests += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.error_rate += self.error_alpha * (1.0 - health.error_rate)
+        if health.state == HALF_OPEN or (
+            health.state == CLOSED
+            and (
+                health.consecutive_failures >= self.failure_threshold
+                or (
+                    health.requests >= self.min_requests
+                    and health.error_rate >= self.error_rate_threshold
+                )
+            )
+        ):
+            _LOGGER.warning("Opening the circuit of %s", _name(health.service))
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+
+
+class _Request:
+    __slots__ = ("health", "probe", "started")
+
+    def __init__(self, health: DeploymentHealth, started: float, probe: bool):
+        self.health = health
+        self.started = started
+        self.probe = probe
+
+
+def _name(service: Any) -> str:
+    # equivalent deployments often share a name, but not an endpoint
+    name = getattr(service, "name", None) or repr(service)
+    endpoint = getattr(service, "endpoint", None)
+    return f"{name}@{endpoint}" if endpoint else name
+
+
+_load_balancer = LoadBalancer()
+
+
+def get_load_balancer() -> LoadBalancer:
+    """Return the process-wide load balancer."""
+    return _load_balancer
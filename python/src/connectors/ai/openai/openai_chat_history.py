@@ -1,10 +1,13 @@
 import re
+from collections.abc import Iterable, Iterator
 from typing import Any, Final
 
+from pydantic import PrivateAttr
 from semantic_kernel.connectors.ai.open_ai.models.chat.function_call import FunctionCall
 from semantic_kernel.sk_pydantic import SKBaseModel
 
-from .openai_chat_message import OpenAIChatMessage
+from ....models.chat.history_window import window_messages
+from .openai_chat_message import ChatMessageRecord
 
 RESPONSE_OBJECT_KEY: Final = "response_object"
 
@@ -16,11 +19,132 @@ TOOL_ROLE: Final = "tool"
 ALL_ROLES = [USER_ROLE, ASSISTANT_ROLE, SYSTEM_ROLE, FUNCTION_CALL_ROLE, TOOL_ROLE]
 
 
+# forks and snapshots add a segment; longer chains are copied into one segment
+_MAX_SEGMENT_DEPTH = 32
+
+
+class _Segment:
+    """Messages appended after start; frozen once a snapshot or fork shares it."""
+
+    __slots__ = ("depth", "parent", "records", "start")
+
+    def __init__(self, parent: "_Segment | None", start: int):
+        self.parent = parent
+        self.start = start
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.records: list[ChatMessageRecord] = []
+
+
+def _chain(tail: _Segment) -> list[_Segment]:
+    segments = []
+    segment = tail
+    while segment is not None:
+        segments.append(segment)
+        segment = segment.parent
+    segments.reverse()
+    return segments
+
+
+def _iter_records(tail: _Segment, length: int) -> Iterator[ChatMessageRecord]:
+    for segment in _chain(tail):
+        records = segment.records
+        yield from records[: length - segment.start]
+
+
+def _get_record(tail: _Segment, length: int, index: int) -> ChatMessageRecord:
+    if index < 0:
+        index += length
+    if not 0 <= index < length:
+        raise IndexError("chat history index out of range")
+    segment = tail
+    while index < segment.start:
+        segment = segment.parent
+    return segment.records[index - segment.start]
+
+
+class ChatHistorySnapshot:
+    """An immutable view of a chat history at one point in time."""
+
+    __slots__ = ("_length", "_tail")
+
+    def __init__(self, tail: _Segment, length: int):
+        self._tail = tail
+        self._length = length
+
+    def fork(self) -> "OpenAIChatHistory":
+        """Return a new history continuing from this snapshot."""
+        return OpenAIChatHistory._from_segment(self._tail, self._length)
+
+    @property
+    def messages(self) -> tuple[ChatMessageRecord, ...]:
+        return tuple(self)
+
+    def __iter__(self) -> Iterator[ChatMessageRecord]:
+        return _iter_records(self._tail, self._length)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> ChatMessageRecord:
+        return _get_record(self._tail, self._length, index)
+
+
 class OpenAIChatHistory(SKBaseModel):
-    messages: list[OpenAIChatMessage] = []
+    """Append-only chat history.
 
-    def add_user_message(self, message: str):
-        self.add_message(role=USER_ROLE, content=message)
+    Messages are stored as ChatMessageRecords in segments. snapshot() and fork()
+    take O(1): they share the segments so far, which are never changed again, and
+    later messages go to a new segment of their own.
+    """
+
+    _tail: _Segment = PrivateAttr(default_factory=lambda: _Segment(None, 0))
+    _length: int = PrivateAttr(default=0)
+    _shared: bool = PrivateAttr(default=False)
+
+    class Config:
+        # a history passed around, e.g. to hooks, must stay the same object
+        copy_on_model_validation = "none"
+
+    def __init__(self, messages: Iterable[Any] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        for message in messages or ():
+            if isinstance(message, dict):
+                self.add_message(**message)
+            else:
+                self.add_message(
+                    role=message.role,
+                    content=message.content,
+                    name=message.name,
+                    function_call=message.function_call,
+                    tool_calls=message.tool_calls,
+                    pinned=getattr(message, "pinned", False),
+                )
+
+    @classmethod
+    def _from_segment(cls, tail: _Segment, length: int) -> "OpenAIChatHistory":
+        history = cls()
+        history._tail = tail
+        history._length = length
+        history._shared = True
+        return history
+
+    @property
+    def messages(self) -> tuple[ChatMessageRecord, ...]:
+        """The messages so far; a tuple, as messages are only added with add_message."""
+        return tuple(self)
+
+    def snapshot(self) -> ChatHistorySnapshot:
+        """Return an immutable view of the messages so far."""
+        self._shared = True
+        return ChatHistorySnapshot(self._tail, self._length)
+
+    def fork(self) -> "OpenAIChatHistory":
+        """Return a new history sharing the messages so far with this one."""
+        self._shared = True
+        return OpenAIChatHistory._from_segment(self._tail, self._length)
+
+    def add_user_message(self, message: str, pinned: bool = False):
+        self.add_message(role=USER_ROLE, content=message, pinned=pinned)
 
     def add_assistant_message(
         self, message: str | None = None, function_call: FunctionCall | None = None
@@ -29,8 +153,8 @@ class OpenAIChatHistory(SKBaseModel):
             role=ASSISTANT_ROLE, content=message, function_call=function_call
         )
 
-    def add_system_message(self, message: str):
-        self.add_message(role=SYSTEM_ROLE, content=message)
+    def add_system_message(self, message: str, pinned: bool = False):
+        self.add_message(role=SYSTEM_ROLE, content=message, pinned=pinned)
 
     def add_function_call_response(self, function_name: str, result: str):
         self.add_message(role=FUNCTION_CALL_ROLE, content=result, name=function_name)
@@ -42,23 +166,44 @@ class OpenAIChatHistory(SKBaseModel):
         name: str | None = None,
         function_call: FunctionCall | None = None,
         tool_calls: list[FunctionCall] | None = None,
+        pinned: bool = False,
     ):
+        """Add a message; pinned messages are kept by history windows that keep system messages."""
         if role not in ALL_ROLES:
             raise ValueError(f"Invalid role: {role}")
         if (function_call or tool_calls) and not role == "assistant":
             raise ValueError("Only assistant messages can have function or tool calls")
         if name and not role not in (FUNCTION_CALL_ROLE, TOOL_ROLE):
             raise ValueError("Only function calls and tools can have names")
-        self.messages.append(
-            OpenAIChatMessage(
+        self._append(
+            ChatMessageRecord(
                 role=role,
                 content=content,
                 name=name,
                 function_call=function_call,
                 tool_calls=tool_calls,
+                pinned=pinned,
             )
         )
 
+    def window(
+        self, max_tokens: int, policy: str = "last_tokens", **options
+    ) -> list[ChatMessageRecord]:
+        """Return the messages the given window policy keeps within max_tokens."""
+        return window_messages(self, max_tokens, policy, **options)
+
+    def _append(self, record: ChatMessageRecord):
+        if self._shared:
+            if self._tail.depth >= _MAX_SEGMENT_DEPTH:
+                tail = _Segment(None, 0)
+                tail.records.extend(_iter_records(self._tail, self._length))
+            else:
+                tail = _Segment(self._tail, self._length)
+            self._tail = tail
+            self._shared = False
+        self._tail.records.append(record)
+        self._length += 1
+
     def add_openai_response(self, response: Any):
         if "choices" in response:
             message = response.choices[0].message
@@ -66,11 +211,14 @@ class OpenAIChatHistory(SKBaseModel):
         else:
             self.add_message(**response)
 
-    def __iter__(self) -> iter:
-        return self.messages.__iter__()
+    def __iter__(self) -> Iterator[ChatMessageRecord]:
+        return _iter_records(self._tail, self._length)
 
     def __len__(self) -> int:
-        return len(self.messages)
+        return self._length
+
+    def __getitem__(self, index: int) -> ChatMessageRecord:
+        return _get_record(self._tail, self._length, index)
 
     @classmethod
     def from_rendered_template(cls, rendered_template: str):
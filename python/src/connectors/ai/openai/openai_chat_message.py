@@ -1,11 +1,14 @@
 """Class to hold chat messages."""
-from typing import Optional
+
+import sys
+from typing import Any, Optional
 
 from semantic_kernel.connectors.ai.open_ai.models.chat.function_call import (
     FunctionCall,
 )
 
 from ....models.chat.chat_message import ChatMessage
+from ....models.chat.tokenizer import count_message_tokens
 
 
 class OpenAIChatMessage(ChatMessage):
@@ -26,3 +29,105 @@ class OpenAIChatMessage(ChatMessage):
     @property
     def ToolCalls(self) -> list[FunctionCall]:
         return self.tool_calls
+
+
+class ChatMessageRecord:
+    """Compact, immutable chat message as stored in an OpenAIChatHistory.
+
+    Has the fields and accessors of OpenAIChatMessage without pydantic validation
+    or a per-instance dict; roles are interned so every message shares one string.
+    """
+
+    # lets templates reuse the output rendered for the message
+    __template_immutable__ = True
+
+    __slots__ = (
+        "_token_count",
+        "content",
+        "function_call",
+        "name",
+        "pinned",
+        "role",
+        "tool_calls",
+    )
+
+    def __init__(
+        self,
+        role: str,
+        content: str | None = None,
+        name: str | None = None,
+        function_call: FunctionCall | None = None,
+        tool_calls: list[FunctionCall] | None = None,
+        pinned: bool = False,
+    ):
+        set_field = object.__setattr__
+        set_field(self, "role", sys.intern(role))
+        set_field(self, "content", content)
+        set_field(self, "name", name)
+        set_field(self, "function_call", function_call)
+        set_field(self, "tool_calls", tool_calls)
+        set_field(self, "pinned", pinned)
+        set_field(self, "_token_count", None)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Chat messages are immutable")
+
+    @property
+    def token_count(self) -> int:
+        """Estimated tokens of the message, counted once and kept with the record."""
+        if self._token_count is None:
+            object.__setattr__(
+                self,
+                "_token_count",
+                count_message_tokens(self.role, self.content, self.name),
+            )
+        return self._token_count
+
+    def as_dict(self) -> dict[str, str]:
+        """Return the role and content of the message as a dict, like ChatMessage.as_dict."""
+        if self.content is None:
+            return {"role": self.role}
+        return {"role": self.role, "content": self.content}
+
+    def to_message(self) -> OpenAIChatMessage:
+        return OpenAIChatMessage(
+            role=self.role,
+            content=self.content,
+            name=self.name,
+            function_call=self.function_call,
+            tool_calls=self.tool_calls,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ChatMessageRecord):
+            return NotImplemented
+        return all(
+            getattr(self, field) == getattr(other, field)
+            for field in self.__slots__
+            if field != "_token_count"
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ChatMessageRecord(role={self.role!r}, content={self.content!r})"
+
+    @property
+    def Role(self) -> str:
+        return self.role
+
+    @property
+    def Content(self) -> str:
+        return self.content
+
+    @property
+    def Name(self) -> str:
+        return self.name
+
+    @property
+    def FunctionCall(self) -> FunctionCall:
+        return self.function_call
+
+    @property
+    def ToolCalls(self) -> list[FunctionCall]:
+        return self.tool_calls
@@ -1,11 +1,10 @@
 import sys
 from typing import Any, AsyncGenerator
 
-from openai.openai_object import OpenAIObject
-
 from python.src.connectors.ai.openai.openai_chat_history import OpenAIChatHistory
 from python.src.plugins.semantic_function import SemanticFunction
 from python.src.plugins.sk_function import SKFunction
+from python.src.streaming import StreamChunk
 
 from ....hooks import HookBase
 from .azure_chat_completion import RESPONSE_OBJECT_KEY
@@ -25,7 +24,7 @@ class StreamingResultToStdOutHook(HookBase):
         :param result: The result to print.
         :return: The result to use.
         """
-        full_content = ""
+        parts = []
         async for res in openai_oject:
             for choice in res.choices:
                 if "delta" not in choice:
@@ -33,10 +32,19 @@ class StreamingResultToStdOutHook(HookBase):
                 if "role" in choice.delta:
                     sys.stdout.write(self.line_prefix)
                 if "content" in choice.delta:
-                    full_content += str(choice.delta.content)
+                    parts.append(str(choice.delta.content))
                     sys.stdout.write(str(choice.delta.content))
         sys.stdout.write("\n")
-        return full_content
+        return "".join(parts)
+
+    async def on_stream_chunk(self, chunk: StreamChunk) -> StreamChunk:
+        if chunk.index != 0:
+            return chunk
+        if chunk.role:
+            sys.stdout.write(self.line_prefix)
+        sys.stdout.write(chunk.content)
+        sys.stdout.flush()
+        return chunk
 
     async def on_invoke_end(
         self,
@@ -53,14 +61,18 @@ class StreamingResultToStdOutHook(HookBase):
         dict | None,
     ]:
         for result in results:
-            if RESPONSE_OBJECT_KEY in result:
-                if not isinstance(result[RESPONSE_OBJECT_KEY], AsyncGenerator):
-                    return results, functions, variables, request_settings, kwargs
-            if isinstance(result[RESPONSE_OBJECT_KEY], OpenAIObject):
+            if isinstance(result, dict) and isinstance(
+                result.get(RESPONSE_OBJECT_KEY), AsyncGenerator
+            ):
                 completion = await self.output_openai_object(
                     result[RESPONSE_OBJECT_KEY]
                 )
                 result[self.result_key] = completion
+            elif isinstance(result, dict) and isinstance(
+                result.get(RESPONSE_OBJECT_KEY), list
+            ):
+                # already written chunk by chunk by run_stream_async
+                sys.stdout.write("\n")
         return results, functions, variables, request_settings, kwargs
 
 
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import openai
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from ....models.chat.tokenizer import count_prompt_tokens, count_tokens
+from .tracked_stream import TrackedStream
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def estimate_request_tokens(model_args: dict) -> int:
+    """Estimate the tokens a chat request counts against a tokens-per-minute quota."""
+    return count_prompt_tokens(
+        model_args.get("messages", [])
+    ) + estimate_completion_tokens(model_args)
+
+
+def estimate_completion_tokens(model_args: dict) -> int:
+    """The most tokens the completions of a chat request can use."""
+    return (model_args.get("max_tokens") or 0) * (model_args.get("n") or 1)
+
+
+class TokenBucket:
+    """A bucket holding up to capacity units, refilled continuously over a minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken; requests above capacity wait for a full bucket."""
+        needed = min(amount, self.capacity) - self.level
+        return max(needed, 0.0) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter(SKBaseModel):
+    """Admits requests to one deployment within its token and request quotas.
+
+    Requests wait for their estimated tokens and a request slot in token buckets
+    refilled at the per-minute quotas, and for a concurrency slot. The
+    concurrency limit grows additively while requests succeed and shrinks
+    multiplicatively, at most once per decrease_interval, on 429s or when
+    latency exceeds latency_target. Throttled
+    requests are retried with jittered exponential backoff, or after the
+    Retry-After delay when the service sends one, pausing every request to the
+    deployment in the meantime.
+    """
+
+    tokens_per_minute: int | None = None
+    requests_per_minute: int | None = None
+    max_concurrency: int = 32
+    min_concurrency: int = 1
+    initial_concurrency: int | None = None
+    latency_target: float | None = None
+    decrease_factor: float = 0.5
+    decrease_interval: float = 1.0
+    max_retries: int = 6
+    base_backoff: float = 0.5
+    max_backoff: float = 60.0
+    throttled: int = 0
+    retries: int = 0
+    _tokens: TokenBucket | None = PrivateAttr(default=None)
+    _requests: TokenBucket | None = PrivateAttr(default=None)
+    _limit: float = PrivateAttr(default=1.0)
+    _active: int = PrivateAttr(default=0)
+    _paused_until: float = PrivateAttr(default=0.0)
+    _last_decrease: float = PrivateAttr(default=0.0)
+    _admission: asyncio.Lock | None = PrivateAttr(default=None)
+    _released: asyncio.Event | None = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.tokens_per_minute:
+            self._tokens = TokenBucket(self.tokens_per_minute)
+        if self.requests_per_minute:
+            self._requests = TokenBucket(self.requests_per_minute)
+        self._limit = float(self.initial_concurrency or self.max_concurrency)
+
+    @property
+    def concurrency_limit(self) -> int:
+        return max(int(self._limit), self.min_concurrency)
+
+    @property
+    def paused_for(self) -> float:
+        """Seconds until requests are sent again after a 429 paused them."""
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "paused_for": self.paused_for,
+            "active": self._active,
+            "available_tokens": self._tokens.level if self._tokens else None,
+            "available_requests": self._requests.level if self._requests else None,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[Any]],
+        tokens: int,
+        completion_tokens: int = 0,
+    ) -> Any:
+        """Send a request estimated at tokens within the quotas, retrying on 429s.
+
+        completion_tokens is the part of tokens reserved for the completion. A
+        streamed response keeps its concurrency slot until the stream ends, is
+        closed or is garbage collected; its latency and token usage are
+        accounted for when it ends.
+        """
+        attempt = 0
+        while True:
+            await self._acquire(tokens)
+            started = time.monotonic()
+            try:
+                response = await send()
+            except openai.error.RateLimitError as exc:
+                self._release()
+                self._on_throttled()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(exc, attempt)
+                _LOGGER.info(
+                    "Throttled, retrying in %.2fs (attempt %d)", delay, attempt + 1
+                )
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                attempt += 1
+                self.retries += 1
+                continue
+            except BaseException:
+                self._release()
+                raise
+            if isinstance(response, AsyncIterator):
+                return self._hold(response, started, tokens, completion_tokens)
+            self._release()
+            usage = getattr(response, "usage", None)
+            self._on_success(
+                time.monotonic() - started,
+                usage.total_tokens if usage is not None else None,
+                tokens,
+            )
+            return response
+
+    def _hold(
+        self,
+        stream: AsyncIterator,
+        started: float,
+        tokens: int,
+        completion_tokens: int,
+    ) -> TrackedStream:
+        usage = None
+        parts = []
+
+        def on_chunk(chunk: Any):
+            nonlocal usage
+            usage = getattr(chunk, "usage", None) or usage
+            for choice in getattr(chunk, "choices", None) or ():
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    parts.append(content)
+
+        def done(error: BaseException | None):
+            self._release()
+            if isinstance(error, openai.error.RateLimitError):
+                self._on_throttled()
+            elif error is None:
+                if usage is not None:
+                    used = usage.total_tokens
+                else:
+                    used = tokens - completion_tokens + count_tokens("".join(parts))
+                self._on_success(time.monotonic() - started, used, tokens)
+
+        # the slot is released when the stream is over, including when it is
+        # dropped without being read
+        return TrackedStream(stream, done, on_chunk)
+
+    async def _acquire(self, tokens: int):
+        if self._admission is None:
+            self._admission = asyncio.Lock()
+            self._released = asyncio.Event()
+        # admission is first come, first served so large requests are not starved
+        async with self._admission:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                for bucket, amount in ((self._tokens, tokens), (self._requests, 1)):
+                    if bucket is not None:
+                        bucket.refill(now)
+                        delay = max(delay, bucket.wait_time(amount))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                if self._active >= self.concurrency_limit:
+                    self._released.clear()
+                    await self._released.wait()
+                    continue
+                break
+            if self._tokens is not None:
+                self._tokens.take(tokens)
+            if self._requests is not None:
+                self._requests.take(1)
+            self._active += 1
+
+    def _release(self):
+        self._active -= 1
+        self._released.set()
+
+    def _on_success(
+        self, latency: float, used_tokens: int | None, estimated_tokens: int
+    ):
+        if self.latency_target is not None and latency > self.latency_target:
+            self._decrease()
+        else:
+            # additive increase of about one slot per window of limit requests
+            self._limit = min(
+                float(self.max_concurrency), self._limit + 1.0 / max(self._limit, 1.0)
+            )
+        if self._tokens is not None and used_tokens is not None:
+            # give back what the estimate overshot the real usage
+            self._tokens.give(max(estimated_tokens - used_tokens, 0))
+
+    def _on_throttled(self):
+        self.throttled += 1
+        self._decrease()
+
+    def _decrease(self):
+        # requests in flight when the limit is hit fail together; back off once
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self._limit = max(
+            float(self.min_concurrency), self._limit * self.decrease_factor
+        )
+
+    def _backoff(self, exc: Exception, attempt: int) -> float:
+        retry_after = _retry_after(getattr(exc, "headers", None))
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_backoff)
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2**attempt))
+
+
+def _retry_after(headers: Any) -> float | None:
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name) or headers.get(name.title())
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except (TypeError, ValueError):
+            continue
+    return None
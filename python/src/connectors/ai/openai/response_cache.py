@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+# request arguments that do not change the response
+_UNKEYED_ARGS = ("api_key", "organization", "timeout", "request_timeout")
+
+
+def response_key(model_args: dict[str, Any]) -> str:
+    """Return the cache key of a completion request.
+
+    The key is a hash of the canonical JSON form of the request: the rendered
+    messages, the request settings and the deployment it is sent to.
+    """
+    keyed = {
+        name: value for name, value in model_args.items() if name not in _UNKEYED_ARGS
+    }
+    canonical = json.dumps(keyed, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(SKBaseModel):
+    """Two-tier cache of completion responses.
+
+    Entries are JSON-compatible payloads kept in an in-memory LRU tier and, when
+    path is set, in a SQLite database that outlives the process. Entries expire
+    after their TTL in both tiers; a TTL of None never expires. Code running on
+    an event loop uses get_async and set_async, which do the SQLite I/O on a
+    worker thread.
+    """
+
+    max_size: int = 1024
+    ttl: float | None = 3600.0
+    path: str | None = None
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    _entries: OrderedDict[str, tuple[float | None, Any]] = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _db: sqlite3.Connection | None = PrivateAttr(default=None)
+
+    def get(self, key: str) -> Any | None:
+        payload = self._get_memory(key)
+        if payload is None:
+            payload = self._get_stored(key)
+        return payload
+
+    async def get_async(self, key: str) -> Any | None:
+        """Like get, but reads the SQLite tier on a worker thread."""
+        payload = self._get_memory(key)
+        if payload is None:
+            payload = await self._off_loop(self._get_stored, key)
+        return payload
+
+    def set(self, key: str, payload: Any, ttl: float | None = None):
+        """Store a JSON-compatible payload; ttl defaults to the cache TTL."""
+        expires_at = self._set_memory(key, payload, ttl)
+        self._store(key, payload, expires_at)
+
+    async def set_async(self, key: str, payload: Any, ttl: float | None = None):
+        """Like set, but writes the SQLite tier on a worker thread."""
+        expires_at = self._set_memory(key, payload, ttl)
+        await self._off_loop(self._store, key, payload, expires_at)
+
+    def invalidate(self, key: str) -> bool:
+        """Drop an entry from both tiers; return True if there was one."""
+        with self._lock:
+            found = self._entries.pop(key, None) is not None
+            db = self._connection()
+            if db is not None:
+                found = (
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+                    > 0
+                    or found
+                )
+                db.commit()
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def purge_expired(self) -> int:
+        """Remove expired entries from both tiers and return how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                key
+                for key, (expires_at, _) in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for key in expired:
+                del self._entries[key]
+            removed = len(expired)
+            db = self._connection()
+            if db is not None:
+                removed += db.execute(
+                    "DELETE FROM responses WHERE expires_at IS NOT NULL "
+                    "AND expires_at <= ?",
+                    (now,),
+                ).rowcount
+                db.commit()
+            return removed
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _off_loop(self, function: Callable[..., Any], *args: Any) -> Any:
+        # SQLite connects, reads and writes block, so they run on a worker thread
+        # instead of the event loop
+        if self.path is None:
+            return function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    def _get_memory(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def _get_stored(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            entry = self._load(key, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self._evict()
+            self.disk_hits += 1
+            return entry[1]
+
+    def _set_memory(self, key: str, payload: Any, ttl: float | None) -> float | None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            self._evict()
+        return expires_at
+
+    def _store(self, key: str, payload: Any, expires_at: float | None):
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, json.dumps(payload), expires_at),
+            )
+            db.commit()
+
+    def _load(self, key: str, now: float) -> tuple[float | None, Any] | None:
+        db = self._connection()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            db.commit()
+            return None
+        return expires_at, json.loads(value)
+
+    def _connection(self) -> sqlite3.Connection | None:
+        if self.path is None:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+_response_cache = ResponseCache()
+_persistent_caches: dict[str, ResponseCache] = {}
+_persistent_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: str | None = None) -> ResponseCache:
+    """Return the process-wide response cache.
+
+    Without a path this is the in-memory cache; with one it is the cache
+    persisted in the SQLite database at that path, shared by every caller
+    that names the same file.
+    """
+    if path is None:
+        return _response_cache
+    path = os.path.abspath(path)
+    with _persistent_caches_lock:
+        cache = _persistent_caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path=path)
+            _persistent_caches[path] = cache
+        return cache
@@ -0,0 +1,254 @@
+import asyncio
+import weakref
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+
+class SingleFlight(SKBaseModel):
+    """Coalesces identical concurrent requests into one upstream call.
+
+    Every caller with the same key while a call is in flight shares its result.
+    Streamed results are read once and fanned out to every consumer, including
+    callers that join before the first chunk was dropped. A chunk is read only
+    when a consumer asks for it, and not while any consumer is
+    stream_buffer_size chunks behind, so a stream is read at the pace of its
+    slowest consumer and at most stream_buffer_size chunks are kept. The shared
+    call is cancelled only when no caller needs it anymore.
+    """
+
+    stream_buffer_size: int = 16
+    calls: int = 0
+    coalesced: int = 0
+    _calls: dict[str, "_Call"] = PrivateAttr(default_factory=dict)
+
+    async def do(
+        self,
+        key: str,
+        create: Callable[[], Awaitable[Any]],
+        stream: bool = False,
+    ) -> Any:
+        """Return the result of create(), shared with identical in-flight calls.
+
+        With stream set, create() must return an async iterator and each caller
+        gets its own async iterator over the shared chunks.
+        """
+        call = self._calls.get(key)
+        if call is None or not call.joinable():
+            self.calls += 1
+            call = _Call(create, stream, self.stream_buffer_size)
+            self._calls[key] = call
+            call.on_finished(lambda: self._forget(key, call))
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            value = await asyncio.shield(call.task)
+        except BaseException:
+            call.release()
+            raise
+        if not stream:
+            call.release()
+            return value
+        # the waiter stays registered until it stops consuming the stream, or
+        # its stream is collected without being consumed
+        return _Subscription(value, call.release)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: str, call: "_Call"):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class _Call:
+    def __init__(
+        self, create: Callable[[], Awaitable[Any]], stream: bool, buffer_size: int
+    ):
+        self.waiters = 0
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.task = asyncio.ensure_future(self._run(create))
+
+    async def _run(self, create: Callable[[], Awaitable[Any]]) -> Any:
+        value = await create()
+        if not self.stream:
+            return value
+        return _Broadcast(value, self.buffer_size, lambda: self.waiters)
+
+    def joinable(self) -> bool:
+        # a late consumer needs every chunk, so it cannot join a stream that
+        # already dropped some
+        if not self.stream or not self.task.done():
+            return True
+        if self.task.cancelled() or self.task.exception() is not None:
+            return True
+        return self.task.result().offset == 0
+
+    def on_finished(self, callback: Callable[[], None]):
+        def task_done(task: asyncio.Task):
+            if self.stream and not task.cancelled() and task.exception() is None:
+                task.result().pump.add_done_callback(lambda _: callback())
+            else:
+                callback()
+
+        self.task.add_done_callback(task_done)
+
+    def release(self):
+        self.waiters -= 1
+        if self.waiters > 0:
+            return
+        if not self.task.done():
+            self.task.cancel()
+        elif self.stream and not self.task.cancelled() and not self.task.exception():
+            pump = self.task.result().pump
+            if not pump.done():
+                pump.cancel()
+
+
+class _Broadcast:
+    """Reads a stream once and hands its chunks to any number of consumers.
+
+    chunks holds the chunks from position offset on; chunks every consumer has
+    read are dropped.
+    """
+
+    def __init__(
+        self, stream: AsyncIterator, buffer_size: int, waiters: Callable[[], int]
+    ):
+        self.buffer_size = max(buffer_size, 1)
+        self._waiters = waiters
+        self.chunks: list[Any] = []
+        self.offset = 0
+        self.positions: dict[int, int] = {}
+        # the number of chunks some consumer has asked for
+        self.demand = 0
+        self.error: BaseException | None = None
+        self.finished = False
+        self._next_consumer = 0
+        self._changed = asyncio.Event()
+        self.pump = asyncio.ensure_future(self._pump(stream))
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.chunks)
+
+    def join(self) -> int:
+        consumer = self._next_consumer
+        self._next_consumer += 1
+        self.positions[consumer] = self.offset
+        self.notify()
+        return consumer
+
+    def leave(self, consumer: int):
+        if self.positions.pop(consumer, None) is not None:
+            self._drop_read()
+            self.notify()
+
+    def advance(self, consumer: int, position: int):
+        self.positions[consumer] = position
+        self._drop_read()
+        self.notify()
+
+    def want(self, position: int):
+        if position > self.demand:
+            self.demand = position
+            self.notify()
+
+    def notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def changed(self):
+        await self._changed.wait()
+
+    def _wanted(self) -> bool:
+        # a consumer is waiting for the next chunk and none is too far behind
+        return self.demand > self.end and self.end - self._slowest() < self.buffer_size
+
+    def _slowest(self) -> int:
+        # callers that are still joining have not read anything yet
+        if len(self.positions) < self._waiters():
+            return self.offset
+        return min(self.positions.values(), default=self.offset)
+
+    def _drop_read(self):
+        read = self._slowest() - self.offset
+        if read > 0:
+            del self.chunks[:read]
+            self.offset += read
+
+    async def _pump(self, stream: AsyncIterator):
+        try:
+            while True:
+                while not self._wanted():
+                    await self.changed()
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+                self.chunks.append(chunk)
+                self.notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.finished = True
+            self.notify()
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+
+
+class _Subscription:
+    """One consumer of a broadcast; it leaves and releases its call once.
+
+    That is when the stream ends, fails or is closed, or when the subscription is
+    garbage collected, which also covers streams that were never iterated.
+    """
+
+    def __init__(self, broadcast: _Broadcast, release: Callable[[], None]):
+        self._broadcast = broadcast
+        self._consumer = broadcast.join()
+        self._position = broadcast.offset
+        self._release = weakref.finalize(
+            self, _leave_quietly, broadcast, self._consumer, release
+        )
+
+    def __aiter__(self) -> "_Subscription":
+        return self
+
+    async def __anext__(self) -> Any:
+        broadcast = self._broadcast
+        while True:
+            if not self._release.alive:
+                raise StopAsyncIteration
+            if self._position < broadcast.end:
+                chunk = broadcast.chunks[self._position - broadcast.offset]
+                self._position += 1
+                broadcast.advance(self._consumer, self._position)
+                return chunk
+            if broadcast.finished:
+                self._release()
+                if broadcast.error is not None:
+                    raise broadcast.error
+                raise StopAsyncIteration
+            broadcast.want(self._position + 1)
+            await broadcast.changed()
+
+    async def aclose(self):
+        self._release()
+
+
+def _leave_quietly(broadcast: _Broadcast, consumer: int, release: Callable[[], None]):
+    # a subscription may be collected after its event loop was closed
+    try:
+        broadcast.leave(consumer)
+        release()
+    except RuntimeError:
+        pass
@@ -0,0 +1,60 @@
+import weakref
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+
+class TrackedStream:
+    """An async iterator over a stream that reports once when it is over.
+
+    on_chunk is called with every chunk read. done is called exactly once: with
+    None when the stream ends, with the exception when reading it fails, and
+    with GeneratorExit when it is closed, or garbage collected, before its end.
+    The last case covers streams that were never iterated.
+    """
+
+    def __init__(
+        self,
+        stream: AsyncIterator,
+        done: Callable[[BaseException | None], None],
+        on_chunk: Callable[[Any], None] | None = None,
+    ):
+        self._stream = stream
+        self._on_chunk = on_chunk
+        self._done = weakref.finalize(self, _done_quietly, done)
+
+    def __aiter__(self) -> "TrackedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if not self._done.alive:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._finish(None)
+            raise
+        except BaseException as exc:
+            self._finish(exc)
+            raise
+        if self._on_chunk is not None:
+            self._on_chunk(chunk)
+        return chunk
+
+    async def aclose(self):
+        self._finish(GeneratorExit())
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+    def _finish(self, error: BaseException | None):
+        details = self._done.detach()
+        if details is not None:
+            _, _, (done,), _ = details
+            done(error)
+
+
+def _done_quietly(done: Callable[[BaseException | None], None]):
+    # a stream may be collected after its event loop was closed
+    try:
+        done(GeneratorExit())
+    except RuntimeError:
+        pass
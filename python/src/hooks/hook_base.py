@@ -3,6 +3,7 @@ from typing import Any
 from semantic_kernel.sk_pydantic import SKBaseModel
 
 from python.src.plugins.sk_function import SKFunction
+from python.src.streaming import StreamChunk
 
 
 class HookBase(SKBaseModel):
@@ -37,3 +38,7 @@ class HookBase(SKBaseModel):
         dict | None,
     ]:
         return results, functions, variables, request_settings, kwargs
+
+    async def on_stream_chunk(self, chunk: StreamChunk) -> StreamChunk:
+        """Called for each chunk yielded by run_stream_async, in arrival order."""
+        return chunk
@@ -1,4 +1,6 @@
+import asyncio
 import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable, Mapping
 from typing import Any
 
 from semantic_kernel import Kernel
@@ -10,7 +12,10 @@ from semantic_kernel.connectors.ai import (
 
 from python.src.hooks.hook_base import HookBase
 
-from .plugins import SKFunction, SKPlugin
+from .connectors import RESPONSE_OBJECT_KEY
+from .plugins import FunctionRegistry, SKFunction, SKPlugin
+from .scheduling import FunctionScheduler
+from .streaming import StreamChunk, StreamEvent, StreamResult, chunks_from_response
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,6 +28,8 @@ class newKernel(Kernel):
     prompt_template_engine: Any = None
     pre_hooks: list["HookBase"] = []
     post_hooks: list["HookBase"] = []
+    scheduler: FunctionScheduler | None = None
+    function_registry: FunctionRegistry | None = None
 
     def __init__(
         self,
@@ -30,49 +37,128 @@ class newKernel(Kernel):
         plugins: list | None = None,
         prompt_template_engine: Any = None,
         hooks: list["HookBase"] | None = None,
+        max_concurrency: int | None = None,
         *args,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
-        self.plugins = plugins
-        self.services.extend(ai_services)
+        self.plugins = list(plugins or [])
+        self.function_registry = FunctionRegistry(self.plugins)
+        # a list per kernel, the class attribute is shared by every kernel
+        self.services = list(ai_services)
         self.prompt_template_engine = prompt_template_engine
         self.hooks = hooks or []
+        self.scheduler = FunctionScheduler(max_concurrency=max_concurrency)
 
     async def run_async(
         self,
         functions: list[SKFunction] | SKFunction,
         variables: dict[str, Any] | None = None,
         request_settings: dict[str, Any] | None = None,
+        max_concurrency: int | None = None,
         **kwargs: dict,
     ) -> dict:
         """
         Run the specified functions with the given arguments and return the results.
 
+        Functions that do not depend on each other's output variables run concurrently.
+
         :param functions: The functions to run.
+        :param max_concurrency: The maximum number of functions to run at once.
         :param kwargs: The arguments to pass to the functions.
         :return: A dictionary of the results.
         """
+        return await self._run(
+            functions, variables, request_settings, max_concurrency, None, kwargs
+        )
+
+    async def run_stream_async(
+        self,
+        functions: list[SKFunction] | SKFunction,
+        variables: dict[str, Any] | None = None,
+        request_settings: dict[str, Any] | None = None,
+        max_concurrency: int | None = None,
+        buffer_size: int = 16,
+        **kwargs: dict,
+    ) -> AsyncGenerator[StreamEvent, None]:
+        """
+        Run the specified functions, streaming the completions of semantic functions.
+
+        Yields a StreamChunk for every piece of a completion as it arrives and ends
+        with a StreamResult holding what run_async would have returned. At most
+        buffer_size chunks are buffered; reading from the service pauses until a
+        slow consumer catches up.
+
+        :param functions: The functions to run.
+        :param max_concurrency: The maximum number of functions to run at once.
+        :param buffer_size: The number of chunks buffered for the consumer.
+        :param kwargs: The arguments to pass to the functions.
+        """
+        request_settings = {**(request_settings or {}), "stream": True}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+        async def produce():
+            try:
+                result = await self._run(
+                    functions,
+                    variables,
+                    request_settings,
+                    max_concurrency,
+                    queue.put,
+                    kwargs,
+                )
+            except Exception as exc:
+                await queue.put(exc)
+            else:
+                await queue.put(StreamResult(result=result))
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                event = await queue.get()
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+                if isinstance(event, StreamResult):
+                    break
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    async def _run(
+        self,
+        functions: list[SKFunction] | SKFunction,
+        variables: dict[str, Any] | None,
+        request_settings: dict[str, Any] | None,
+        max_concurrency: int | None,
+        on_chunk: Callable[[StreamChunk], Awaitable[None]] | None,
+        kwargs: dict,
+    ) -> dict:
         for hook in self.hooks:
             _LOGGER.info("Running hook: %s", hook.name)
             functions, variables, request_settings, kwargs = await hook.on_invoke_start(
                 functions, variables, request_settings, kwargs
             )
-        results = []
         if not isinstance(functions, list):
             functions = [functions]
-        for function in functions:
-            if "plugin_functions" in kwargs:
-                kwargs.pop("plugin_functions")
-            results.append(
-                await function.run_async(
-                    variables,
-                    services=self.services,
-                    request_settings=request_settings,
-                    plugin_functions=self.fqn_functions,
-                    **kwargs,
-                )
+        kwargs.pop("plugin_functions", None)
+        plugin_functions = self.fqn_functions
+
+        async def invoke(function: SKFunction, function_variables: dict | None):
+            result = await function.run_async(
+                function_variables,
+                services=self.services,
+                request_settings=request_settings,
+                plugin_functions=plugin_functions,
+                **kwargs,
             )
+            if on_chunk is None:
+                return result
+            return await self._forward_stream(function, result, on_chunk)
+
+        results = await self.scheduler.run(
+            functions, variables, invoke, max_concurrency=max_concurrency
+        )
         for hook in self.hooks:
             _LOGGER.info("Running hook: %s", hook.name)
             results, variables, _, _, _ = await hook.on_invoke_end(
@@ -80,12 +166,45 @@ class newKernel(Kernel):
             )
         return results if len(results) > 1 else results[0]
 
+    async def _forward_stream(
+        self,
+        function: SKFunction,
+        result: Any,
+        on_chunk: Callable[[StreamChunk], Awaitable[None]],
+    ) -> Any:
+        """Pass the chunks of a streamed result on and return the assembled result.
+
+        The response object of the result is replaced by the list of received chunks.
+        """
+        if not isinstance(result, dict):
+            return result
+        response = result.get(RESPONSE_OBJECT_KEY)
+        if not isinstance(response, AsyncIterator):
+            return result
+        received = []
+        parts = []
+        async for raw in response:
+            received.append(raw)
+            for chunk in chunks_from_response(
+                function.fully_qualified_name, raw, len(received) - 1
+            ):
+                for hook in self.hooks:
+                    chunk = await hook.on_stream_chunk(chunk)
+                if chunk.index == 0:
+                    parts.append(chunk.content)
+                await on_chunk(chunk)
+        return {
+            **result,
+            function.output_variable_name: "".join(parts),
+            RESPONSE_OBJECT_KEY: received,
+        }
+
+    def add_plugin(self, plugin: SKPlugin):
+        self.plugins.append(plugin)
+        self.function_registry.add_plugin(plugin)
+
     @property
-    def fqn_functions(self) -> dict[str, Any] | None:
-        if not self.plugins:
+    def fqn_functions(self) -> Mapping[str, SKFunction] | None:
+        if not self.function_registry.functions:
             return None
-        all_fqn_functions = [plugin.fqn_functions for plugin in self.plugins]
-        all = {}
-        for funcs in all_fqn_functions:
-            all.update(funcs)
-        return all
+        return self.function_registry.functions
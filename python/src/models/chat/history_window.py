@@ -0,0 +1,118 @@
+"""Policies that select the part of a chat history that fits a token budget.
+
+Messages are counted with their cached token_count when they have one, so a
+growing history is not tokenized again every turn.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from .tokenizer import count_message_tokens
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def message_tokens(message: Any) -> int:
+    tokens = getattr(message, "token_count", None)
+    if tokens is None:
+        tokens = count_message_tokens(
+            message.role, message.content, getattr(message, "name", None)
+        )
+    return tokens
+
+
+def _recent(messages: list, max_tokens: int) -> tuple[list, int]:
+    """Return the most recent messages that together fit max_tokens, and their tokens."""
+    used = 0
+    start = len(messages)
+    while start > 0:
+        tokens = message_tokens(messages[start - 1])
+        if used + tokens > max_tokens:
+            break
+        used += tokens
+        start -= 1
+    return messages[start:], used
+
+
+def last_tokens(messages: list, max_tokens: int) -> list:
+    """Keep the most recent messages that fit the budget."""
+    return _recent(messages, max_tokens)[0]
+
+
+def keep_system(messages: list, max_tokens: int) -> list:
+    """Keep system and pinned messages, then the most recent others that fit."""
+    kept = {
+        index
+        for index, message in enumerate(messages)
+        if message.role == "system" or getattr(message, "pinned", False)
+    }
+    budget = max_tokens - sum(message_tokens(messages[index]) for index in kept)
+    if budget < 0:
+        _LOGGER.warning(
+            "System and pinned messages exceed the history budget of %d tokens",
+            max_tokens,
+        )
+    for index in range(len(messages) - 1, -1, -1):
+        if index in kept:
+            continue
+        tokens = message_tokens(messages[index])
+        if tokens > budget:
+            break
+        budget -= tokens
+        kept.add(index)
+    return [messages[index] for index in sorted(kept)]
+
+
+def drop_middle(messages: list, max_tokens: int, keep_first: int = 1) -> list:
+    """Keep the first keep_first messages and the most recent ones that fit."""
+    head, head_tokens = [], 0
+    for message in messages[:keep_first]:
+        tokens = message_tokens(message)
+        if head_tokens + tokens > max_tokens:
+            break
+        head.append(message)
+        head_tokens += tokens
+    tail = _recent(messages[len(head) :], max_tokens - head_tokens)[0]
+    return head + tail
+
+
+class HistoryWindow(list):
+    """The messages a window kept of a history, rendered in place of the history.
+
+    Functions a template calls as helpers get the whole history instead, and
+    window it by their own settings.
+    """
+
+    def __init__(self, messages: Iterable[Any], history: Any):
+        super().__init__(messages)
+        self.history = history
+
+
+def unwindowed(value: Any) -> Any:
+    """Return the whole history of a HistoryWindow, or any other value as is."""
+    return value.history if isinstance(value, HistoryWindow) else value
+
+
+WINDOW_POLICIES: dict[str, Callable[..., list]] = {
+    "last_tokens": last_tokens,
+    "keep_system": keep_system,
+    "drop_middle": drop_middle,
+}
+
+
+def window_messages(
+    messages: Iterable[Any],
+    max_tokens: int,
+    policy: str = "last_tokens",
+    **options,
+) -> list:
+    """Apply a window policy by name to messages with role and content fields."""
+    try:
+        select = WINDOW_POLICIES[policy]
+    except KeyError:
+        raise ValueError(
+            f"Unknown history window policy {policy!r}, "
+            f"expected one of {', '.join(WINDOW_POLICIES)}"
+        ) from None
+    return select(list(messages), int(max_tokens), **options)
@@ -1,9 +1,18 @@
-import re
+from collections.abc import Mapping
 
 from ..connectors.ai.openai.azure_chat_completion import RESPONSE_OBJECT_KEY
 from ..kernel import newKernel
 from ..plugins import Parameter, SKFunction
 from ..template_engine import HandleBarsPromptTemplateHandler
+from .plan_cache import PlanCache
+from .plan_graph import get_plan_graph_cache
+from .plan_validator import (
+    PlanDiagnostic,
+    PlanValidationError,
+    extract_plan_template,
+    has_errors,
+    validate_plan,
+)
 
 
 class HandleBarsPlan(SKFunction):
@@ -13,30 +22,72 @@ class HandleBarsPlan(SKFunction):
     output_variables: list[Parameter] = []
     kernel: newKernel
     template: str
+    # where the plan is admitted once it ran successfully, or evicted from if it
+    # came from there and failed
+    goal: str | None = None
+    catalog: str | None = None
+    plan_cache: PlanCache | None = None
+    from_cache: bool = False
 
-    def __init__(self, kernel: newKernel, template: str):
-        super().__init__(kernel=kernel, template=template)
+    def __init__(self, kernel: newKernel, template: str, **kwargs):
+        super().__init__(kernel=kernel, template=template, **kwargs)
 
     def __str__(self):
         return self.template
 
+    def validate(
+        self, functions: Mapping[str, SKFunction] | None = None
+    ) -> list[PlanDiagnostic]:
+        """Check the plan against functions, by default those of the kernel."""
+        if functions is None:
+            functions = self.kernel.function_registry.functions
+        return validate_plan(self.template, functions)
+
     async def run_async(self, variables, **kwargs) -> dict:
-        matches = re.match(
-            r".*(`{3}.?handlebars.?)(?P<template>.*)```.*",
-            self.template,
-            re.MULTILINE | re.S | re.IGNORECASE,
-        )
-        if matches:
-            template = matches.group("template")
-        else:
+        template = extract_plan_template(self.template)
+        if template is None:
+            self._report(succeeded=False)
             return {
                 self.output_variable_name: "Invalid HandleBars template",
                 RESPONSE_OBJECT_KEY: None,
             }
-        handle_bar_template = HandleBarsPromptTemplateHandler(template)
+        functions = kwargs.get("plugin_functions")
+        if functions is None:
+            # the plan calls the kernel's functions, whether compiled or rendered
+            functions = kwargs["plugin_functions"] = (
+                self.kernel.function_registry.functions
+            )
+        graphs = get_plan_graph_cache()
+        try:
+            # a compiled graph was validated against the same functions
+            graph = graphs.get(template, functions)
+            if graph is None:
+                # invalid plans fail here, before any helper of the plan has run
+                diagnostics = self.validate(functions)
+                if has_errors(diagnostics):
+                    raise PlanValidationError(diagnostics)
+                graph = await graphs.get_or_compile(template, functions)
+            if graph is not None:
+                response = graph
+                result = await graph.run(variables, **kwargs)
+            else:
+                response = HandleBarsPromptTemplateHandler(
+                    template, known_helpers=functions
+                )
+                result = await response.render(variables, **kwargs)
+        except Exception:
+            self._report(succeeded=False)
+            raise
+        self._report(succeeded=True)
         return {
-            self.output_variable_name: (
-                await handle_bar_template.render(variables, **kwargs)
-            ).strip(),
-            RESPONSE_OBJECT_KEY: handle_bar_template,
+            self.output_variable_name: result.strip(),
+            RESPONSE_OBJECT_KEY: response,
         }
+
+    def _report(self, succeeded: bool):
+        if self.plan_cache is None or self.goal is None or self.catalog is None:
+            return
+        if succeeded and not self.from_cache:
+            self.plan_cache.admit(self.goal, self.catalog, self.template)
+        elif not succeeded and self.from_cache:
+            self.plan_cache.evict(self.goal, self.catalog)
@@ -1,4 +1,5 @@
 import os
+from functools import cache
 from typing import Any
 
 from pydantic import Field
@@ -7,6 +8,17 @@ from semantic_kernel.sk_pydantic import SKBaseModel
 from ..kernel import newKernel
 from ..plugins.semantic_function import SemanticFunction
 from .handlebars_plan import HandleBarsPlan
+from .plan_cache import PlanCache, get_plan_cache
+from .planner_catalog import PlannerCatalog
+
+PLANNER_PROMPT_PATH = os.path.join(
+    os.path.dirname(__file__), "handlebar_planner.prompt.yaml"
+)
+
+
+@cache
+def _load_planner_function() -> SemanticFunction:
+    return SemanticFunction.from_path(path=PLANNER_PROMPT_PATH)
 
 
 class HandleBarsPlannerConfig(SKBaseModel):
@@ -16,6 +28,9 @@ class HandleBarsPlannerConfig(SKBaseModel):
     included_plugins: list[str] = []
     last_plan: str | None = None
     last_error: str | None = None
+    use_plan_cache: bool = True
+    # how many of the most relevant functions the plan may use; None for all
+    max_functions: int | None = 20
 
 
 class HandleBarsPlanner(SKBaseModel):
@@ -23,44 +38,59 @@ class HandleBarsPlanner(SKBaseModel):
     configuration: HandleBarsPlannerConfig = Field(
         default_factory=HandleBarsPlannerConfig
     )
+    # plans that ran successfully; defaults to the process-wide cache
+    plan_cache: PlanCache | None = None
 
     async def create_plan(
         self, goal: str, variables: dict[str, Any] | None = None
     ) -> HandleBarsPlan:
-        # read template
-        planner_function = SemanticFunction.from_path(
-            path=os.getcwd() + "/python/src/planners/handlebar_planner.prompt.yaml"
-        )
-        functions = [
-            function
-            for plugin in self.kernel.plugins
-            for func_name, function in plugin.fqn_functions.items()
-            if self._should_include_function(plugin.name, func_name)
-        ]
+        catalog = self.get_catalog()
+        plan_cache = None
+        if self.configuration.use_plan_cache:
+            plan_cache = (
+                get_plan_cache() if self.plan_cache is None else self.plan_cache
+            )
+            # a plan is being repaired after an error, so ask the model again
+            if self.configuration.last_error is None:
+                template = plan_cache.get(goal, catalog.fingerprint)
+                if template is not None:
+                    return HandleBarsPlan(
+                        kernel=self.kernel,
+                        template=template,
+                        goal=goal,
+                        catalog=catalog.fingerprint,
+                        plan_cache=plan_cache,
+                        from_cache=True,
+                    )
+        functions = catalog.select(goal, self.configuration.max_functions)
         plan = await self.kernel.run_async(
-            planner_function,
+            _load_planner_function(),
             variables={
-                "functions": functions,
+                "function_catalog": await catalog.render(functions),
                 "goal": goal,
                 "last_plan": self.configuration.last_plan,
                 "last_error": self.configuration.last_error,
             },
             request_settings={"stream": False},
         )
-        return HandleBarsPlan(kernel=self.kernel, template=plan["result"])
+        return HandleBarsPlan(
+            kernel=self.kernel,
+            template=plan["result"],
+            goal=goal,
+            catalog=catalog.fingerprint,
+            plan_cache=plan_cache,
+        )
 
-    def _should_include_function(self, plugin: str, function: str) -> bool:
-        """Return True if the function will be included."""
-        should_include = (
-            len(self.configuration.included_plugins) == 0
-            and len(self.configuration.included_functions) == 0
+    def get_catalog(self) -> PlannerCatalog:
+        """Return the catalog of the functions the configuration allows."""
+        key = (
+            frozenset(self.configuration.included_plugins),
+            frozenset(self.configuration.included_functions),
+            frozenset(self.configuration.excluded_plugins),
+            frozenset(self.configuration.excluded_functions),
+        )
+        registry = self.kernel.function_registry
+        return registry.derived(
+            ("planner_catalog", key),
+            lambda: PlannerCatalog(registry.filter(*key)),
         )
-        if plugin in self.configuration.included_plugins:
-            should_include = True
-        if function in self.configuration.included_functions:
-            should_include = True
-        if plugin in self.configuration.excluded_plugins:
-            should_include = False
-        if function in self.configuration.excluded_functions:
-            should_include = False
-        return should_include
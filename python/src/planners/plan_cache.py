@@ -0,0 +1,314 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from ..plugins.sk_function import SKFunction
+from ..template_engine.handlebars_parser import (
+    Block,
+    HandleBarsSyntaxError,
+    Literal,
+    Mustache,
+    SubExpression,
+)
+from .plan_validator import extract_plan_template, parse_plan
+
+_LOGGER = logging.getLogger(__name__)
+
+# numbers and quoted strings in a goal are the parameters of a plan
+_GOAL_LITERAL = re.compile(
+    r"\"([^\"]*)\"|'([^']*)'|(?<![\w.])(-?\d+(?:\.\d+)?)(?![\w]|\.\d)"
+)
+_SPACES = re.compile(r"\s+")
+# a placeholder is filled with the literal as is, or quoted when it ends in q
+_PLACEHOLDERS = re.compile("\x00(\\d+)(q?)\x00")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+# tokens inside a tag: quoted strings, the }} closing it, words, separators
+_TAG_TOKEN = re.compile(
+    r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|}}|[^\s\"'}()=]+|[\s()=]+|.", re.S
+)
+_RAW_BLOCK = re.compile(r"{{{{\s*([\w@-]+)")
+# stored plans from before literals were matched by their position in the tree
+_FORMAT = "2"
+
+
+def parameterize_goal(goal: str) -> tuple[str, list[str]]:
+    """Split a goal into its signature and literals.
+
+    The signature is the normalized goal with numbers replaced by # and quoted
+    strings by $, so goals that only differ in those values share a signature.
+    """
+    signature, literals, _ = _split_goal(goal)
+    return signature, literals
+
+
+def _split_goal(goal: str) -> tuple[str, list[str], list[bool]]:
+    literals: list[str] = []
+    numbers: list[bool] = []
+
+    def replace(match: re.Match) -> str:
+        double_quoted, single_quoted, number = match.groups()
+        numbers.append(number is not None)
+        if number is not None:
+            literals.append(number)
+            return "#"
+        literals.append(double_quoted if double_quoted is not None else single_quoted)
+        return "$"
+
+    signature = _GOAL_LITERAL.sub(replace, goal)
+    return _SPACES.sub(" ", signature).strip().lower(), literals, numbers
+
+
+def catalog_fingerprint(functions: Iterable[SKFunction]) -> str:
+    """Return a hash of the names, descriptions and parameters of functions.
+
+    Unlike the registry version it is the same in every process, so plans stored
+    on disk are only reused with the functions they were made for.
+    """
+    entries = sorted(
+        (
+            function.fully_qualified_name,
+            function.description,
+            tuple(
+                (parameter.name, getattr(parameter, "type_", None))
+                for parameter in (*function.input_variables, *function.output_variables)
+            ),
+        )
+        for function in functions
+    )
+    return hashlib.sha256(repr(entries).encode("utf-8")).hexdigest()
+
+
+def plan_literals(template: str) -> list[tuple[int, int, str, bool]] | None:
+    """Find the literal arguments of the helpers of a plan template.
+
+    Returns the start, end, value and whether it is quoted of each string or
+    number passed to a helper or block, in order, or None if the template does
+    not parse or its literals cannot be told apart from the rest.
+    """
+    try:
+        tree = parse_plan(template)
+    except HandleBarsSyntaxError:
+        return None
+    found: list[tuple[int, int, str, bool]] = []
+    pos = template.find("{{")
+    while pos != -1:
+        if template.startswith("{{!--", pos):
+            end = template.find("--}}", pos)
+            end = -1 if end == -1 else end + 4
+        elif template.startswith("{{!", pos):
+            end = template.find("}}", pos)
+            end = -1 if end == -1 else end + 2
+        elif template.startswith("{{{{", pos):
+            raw = _RAW_BLOCK.match(template, pos)
+            closing = "{{{{/" + raw.group(1) + "}}}}" if raw else "}}}}"
+            end = template.find(closing, pos)
+            end = -1 if end == -1 else end + len(closing)
+        else:
+            end = _tag_literals(template, pos + 2, found)
+        if end == -1:
+            return None
+        pos = template.find("{{", end)
+    # the scan must agree with the parser on every literal argument
+    expected = [
+        value
+        for value in _tree_literals(tree.body)
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool)
+    ]
+    if [value for _, _, value, _ in found] != [str(value) for value in expected]:
+        return None
+    return found
+
+
+def _tag_literals(template: str, pos: int, found: list) -> int:
+    # the first word of a tag or of a sub-expression is a helper or path
+    first = True
+    for match in _TAG_TOKEN.finditer(template, pos):
+        token = match.group(0)
+        if token == "}}":
+            return match.end()
+        if token[0] in "\"'":
+            found.append((match.start(), match.end(), ast.literal_eval(token), True))
+        elif token[0].isspace() or token[0] in "()=":
+            first = first or "(" in token
+            continue
+        elif not first and _NUMBER.fullmatch(token):
+            found.append((match.start(), match.end(), token, False))
+        first = False
+    return -1
+
+
+def _tree_literals(nodes) -> Iterator[Any]:
+    for node in nodes:
+        if isinstance(node, (Mustache, Block)):
+            yield from _argument_literals(node)
+        if isinstance(node, Block):
+            yield from _tree_literals(node.program)
+            yield from _tree_literals(node.inverse or ())
+
+
+def _argument_literals(node: Mustache | Block | SubExpression) -> Iterator[Any]:
+    for argument in (*node.params, *(value for _, value in node.hash)):
+        if isinstance(argument, Literal):
+            yield argument.value
+        elif isinstance(argument, SubExpression):
+            yield from _argument_literals(argument)
+
+
+class PlanCache(SKBaseModel):
+    """Library of plans that ran successfully, keyed by goal signature and catalog.
+
+    Literals of the goal are replaced by placeholders in the stored plan and
+    filled in with the literals of a new goal with the same signature. When path
+    is set, plans are also written to a JSON file and loaded from it.
+    """
+
+    path: str | None = None
+    max_size: int = 512
+    hits: int = 0
+    misses: int = 0
+    _entries: OrderedDict[str, str] = PrivateAttr(default_factory=OrderedDict)
+    _loaded: bool = PrivateAttr(default=False)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    class Config:
+        # plans share one library rather than a copy each
+        copy_on_model_validation = "none"
+
+    @staticmethod
+    def key(goal: str, catalog: str) -> tuple[str, list[str]]:
+        signature, literals = parameterize_goal(goal)
+        return f"{_FORMAT}:{catalog}:{signature}", literals
+
+    def get(self, goal: str, catalog: str) -> str | None:
+        """Return the stored plan for the goal with its literals filled in."""
+        key, literals = self.key(goal, catalog)
+        # backslashes would change the meaning of the quoted literals
+        if any("\\" in literal for literal in literals):
+            return None
+        with self._lock:
+            self._load()
+            template = self._entries.get(key)
+            if template is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _PLACEHOLDERS.sub(
+            lambda match: _fill(literals[int(match.group(1))], match.group(2)),
+            template,
+        )
+
+    def admit(self, goal: str, catalog: str, plan: str) -> bool:
+        """Store a plan that ran successfully for the goal; return True if it was stored.
+
+        Only literal arguments of helpers in the handlebars block are replaced
+        by placeholders, and each literal of the goal must be passed exactly
+        once: a goal literal that is not used, that is also used as a constant,
+        or that is repeated in the goal, would not tell what to substitute where.
+        """
+        key, literals = self.key(goal, catalog)
+        _, _, numbers = _split_goal(goal)
+        if len(set(literals)) != len(literals):
+            return False
+        plan = plan.replace("\x00", "")
+        block = extract_plan_template(plan)
+        if block is None:
+            return False
+        found = plan_literals(block)
+        if found is None:
+            return False
+        positions = {}
+        for index, (literal, number) in enumerate(zip(literals, numbers)):
+            matches = [
+                entry for entry in found if entry[2] == literal and (entry[3] or number)
+            ]
+            if len(matches) != 1:
+                _LOGGER.debug(
+                    "Not caching the plan of %r: %r is ambiguous", goal, literal
+                )
+                return False
+            positions[matches[0][0]] = (matches[0][1], index, matches[0][3])
+        parts = []
+        last = 0
+        for start in sorted(positions):
+            end, index, quoted = positions[start]
+            parts.append(block[last:start])
+            parts.append(f"\x00{index}{'q' if quoted else ''}\x00")
+            last = end
+        parts.append(block[last:])
+        offset = plan.rfind(block)
+        template = plan[:offset] + "".join(parts) + plan[offset + len(block) :]
+        with self._lock:
+            self._load()
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(self.max_size, 0):
+                self._entries.popitem(last=False)
+            self._save()
+        return True
+
+    def evict(self, goal: str, catalog: str) -> bool:
+        key, _ = self.key(goal, catalog)
+        with self._lock:
+            self._load()
+            found = self._entries.pop(key, None) is not None
+            if found:
+                self._save()
+            return found
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._loaded = True
+            self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError) as exc:
+            _LOGGER.warning("Could not load plans from %s: %s", self.path, exc)
+            return
+        self._entries.update(
+            (key, template)
+            for key, template in entries.items()
+            if key.startswith(f"{_FORMAT}:")
+        )
+
+    def _save(self):
+        if self.path is None:
+            return
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self._entries, file)
+        os.replace(temporary, self.path)
+
+
+def _fill(literal: str, quoted: str) -> str:
+    return json.dumps(literal) if quoted else literal
+
+
+_plan_cache = PlanCache()
+
+
+def get_plan_cache() -> PlanCache:
+    """Return the process-wide in-memory plan cache."""
+    return _plan_cache
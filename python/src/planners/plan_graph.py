@@ -0,0 +1,481 @@
+"""HandleBars plans compiled into a graph of function calls.
+
+Most plans are a list of set statements and outputs over helper calls, which
+do not need a template renderer. Their calls become steps of a graph with an
+edge wherever a step reads, through get, what another step set or returned.
+Steps of pure functions over constant inputs are run once when the plan is
+compiled; the remaining steps run concurrently as soon as their inputs are
+ready. An each block over a range or array is a single step that calls each
+function of its body for all items at once, as one vectorized call where the
+function has a batch implementation. Plans with anything else, like other
+blocks or variable paths, are not compiled and are rendered as templates.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from inspect import isawaitable
+from typing import Any
+
+from ..plugins.sk_function import SKFunction
+from ..template_engine.handlebars_parser import (
+    Block,
+    Expression,
+    Literal,
+    Mustache,
+    Node,
+    PathExpression,
+    SubExpression,
+    Text,
+)
+from ..template_engine.handlebars_prompt_template_handler import builtin_helpers
+from ..template_engine.handlebars_runtime import is_pure, prepare
+from .plan_validator import parse_plan
+
+_LOGGER = logging.getLogger(__name__)
+
+# built-in helpers a step may call; the others need a render context
+_STEP_HELPERS = {
+    name: helper
+    for name, helper in builtin_helpers().items()
+    if is_pure(helper)
+    and name not in ("if", "unless", "each", "with", "message", "window")
+}
+# helpers whose result an each block can loop over
+_LIST_HELPERS = frozenset({"range", "array"})
+
+
+@dataclass(frozen=True, slots=True)
+class Constant:
+    value: Any
+
+
+@dataclass(frozen=True, slots=True)
+class StepOutput:
+    step: int
+
+
+@dataclass(frozen=True, slots=True)
+class InputVariable:
+    """A variable read with get before the plan sets it, from the run's variables."""
+
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class Item:
+    """The current item in the body of an each block."""
+
+
+Source = Constant | StepOutput | InputVariable | Item
+
+
+@dataclass(frozen=True, slots=True)
+class PlanStep:
+    index: int
+    name: str
+    function: SKFunction | None
+    helper: Callable | None
+    params: tuple[Source, ...]
+    hash: tuple[tuple[str, Source], ...]
+    loop: "PlanLoop | None" = None
+
+    @property
+    def pure(self) -> bool:
+        if self.loop is not None:
+            return self.loop.pure
+        return self.helper is not None or self.function.pure
+
+    @property
+    def dependencies(self) -> tuple[int, ...]:
+        sources = (*self.params, *(source for _, source in self.hash))
+        return tuple(
+            {source.step: None for source in sources if isinstance(source, StepOutput)}
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PlanLoop:
+    """The body of an each block; its steps' StepOutputs index steps."""
+
+    steps: tuple[PlanStep, ...]
+    output: tuple[str | Source, ...]
+
+    @property
+    def pure(self) -> bool:
+        return all(step.pure for step in self.steps)
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class PlanGraph:
+    """A compiled plan; run it any number of times with different variables."""
+
+    def __init__(
+        self,
+        steps: list[PlanStep],
+        output: list[str | Source],
+        assignments: dict[str, Source],
+        functions: dict[str, SKFunction],
+    ):
+        self.steps = steps
+        self.output = output
+        self.assignments = assignments
+        # the functions the graph was compiled against
+        self.functions = functions
+        self.folded: dict[int, Any] = {}
+
+    def matches(self, functions: Mapping[str, SKFunction]) -> bool:
+        """Whether the graph was compiled against these functions."""
+        return all(
+            functions.get(name) is function for name, function in self.functions.items()
+        )
+
+    async def fold(self):
+        """Run the steps of pure functions whose inputs are all constant."""
+        for step in self.steps:
+            if not step.pure:
+                continue
+            if not all(
+                self._is_constant(source)
+                for source in (*step.params, *(source for _, source in step.hash))
+            ):
+                continue
+            try:
+                value = await self._call(
+                    step, self.folded.get, {"called_by_template": True}
+                )
+            except Exception as exc:
+                # leave the error to surface when the plan runs
+                _LOGGER.debug("Not folding %s: %s", step.name, exc)
+                continue
+            self.folded[step.index] = value
+        self.steps = [step for step in self.steps if step.index not in self.folded]
+        _LOGGER.debug(
+            "Plan graph with %d steps, %d folded", len(self.steps), len(self.folded)
+        )
+
+    async def run(self, variables: dict | None, **kwargs) -> str:
+        """Run the steps and return the text the plan outputs."""
+        variables = variables if variables is not None else {}
+        kwargs["called_by_template"] = True
+        values = dict(self.folded)
+        tasks: dict[int, asyncio.Future] = {}
+
+        async def run_step(step: PlanStep) -> Any:
+            dependencies = [
+                tasks[index] for index in step.dependencies if index in tasks
+            ]
+            if dependencies:
+                await asyncio.gather(*dependencies)
+            value = await self._call(step, values.get, kwargs, variables)
+            values[step.index] = value
+            return value
+
+        if len(self.steps) == 1:
+            await run_step(self.steps[0])
+        elif self.steps:
+            for step in self.steps:
+                tasks[step.index] = asyncio.ensure_future(run_step(step))
+            try:
+                await asyncio.gather(*tasks.values())
+            finally:
+                for task in tasks.values():
+                    if not task.done():
+                        task.cancel()
+        for name, source in self.assignments.items():
+            variables[name] = self._resolve(source, values.get, variables)
+        return "".join(
+            (
+                part
+                if isinstance(part, str)
+                else str(prepare(self._resolve(part, values.get, variables)))
+            )
+            for part in self.output
+        )
+
+    async def _call(
+        self,
+        step: PlanStep,
+        value_of: Callable[[int], Any],
+        kwargs: dict,
+        variables: dict | None = None,
+    ) -> Any:
+        params, hash = self._arguments(step, value_of, variables)
+        if step.loop is not None:
+            return await self._run_loop(step.loop, params[0], kwargs)
+        return await self._invoke(step, params, hash, kwargs)
+
+    def _arguments(
+        self, step: PlanStep, value_of: Callable[[int], Any], variables: dict | None
+    ) -> tuple[list, dict]:
+        params = [self._resolve(source, value_of, variables) for source in step.params]
+        hash = {
+            key: self._resolve(source, value_of, variables) for key, source in step.hash
+        }
+        return params, hash
+
+    @staticmethod
+    async def _invoke(step: PlanStep, params: list, hash: dict, kwargs: dict) -> Any:
+        if step.function is not None:
+            return await step.function.run_async(**kwargs, variables=hash)
+        value = step.helper(None, *params, **hash)
+        if isawaitable(value):
+            value = await value
+        return value
+
+    async def _run_loop(self, loop: PlanLoop, items: list, kwargs: dict) -> str:
+        """Render an each block like the template does, a step at a time.
+
+        Like the template, items whose body raises a TypeError render nothing.
+        Pure bodies run column by column, so each function is called once for
+        all items; otherwise the items run one after the other.
+        """
+        columns: dict[int, dict[int, Any]] = {}
+        alive = list(range(len(items)))
+
+        def resolve(source: str | Source, position: int) -> Any:
+            if isinstance(source, Item):
+                return items[position]
+            if isinstance(source, StepOutput):
+                return columns[source.step][position]
+            return source.value
+
+        def arguments(step: PlanStep, position: int) -> tuple[list, dict]:
+            params = [resolve(source, position) for source in step.params]
+            hash = {key: resolve(source, position) for key, source in step.hash}
+            return params, hash
+
+        if loop.pure:
+            for step in loop.steps:
+                calls = [(position, *arguments(step, position)) for position in alive]
+                column = columns[step.index] = {}
+                function = step.function
+                hashes = [hash for _, _, hash in calls]
+                if getattr(function, "supports_batch", False) and function.can_batch(
+                    hashes
+                ):
+                    results = await function.run_batch_async(hashes, **kwargs)
+                    column.update(zip(alive, results))
+                    continue
+                for position, params, hash in calls:
+                    try:
+                        column[position] = await self._invoke(
+                            step, params, hash, kwargs
+                        )
+                    except TypeError:
+                        alive.remove(position)
+        else:
+            for position in list(alive):
+                try:
+                    for step in loop.steps:
+                        params, hash = arguments(step, position)
+                        columns.setdefault(step.index, {})[position] = (
+                            await self._invoke(step, params, hash, kwargs)
+                        )
+                except TypeError:
+                    alive.remove(position)
+        return "".join(
+            part if isinstance(part, str) else str(prepare(resolve(part, position)))
+            for position in alive
+            for part in loop.output
+        )
+
+    def _is_constant(self, source: Source) -> bool:
+        return isinstance(source, Constant) or (
+            isinstance(source, StepOutput) and source.step in self.folded
+        )
+
+    @staticmethod
+    def _resolve(
+        source: Source, value_of: Callable[[int], Any], variables: dict | None
+    ) -> Any:
+        if isinstance(source, Constant):
+            return source.value
+        if isinstance(source, StepOutput):
+            return value_of(source.step)
+        return (variables or {}).get(source.name, "")
+
+
+class _GraphBuilder:
+    def __init__(
+        self,
+        functions: Mapping[str, SKFunction],
+        used: dict[str, SKFunction] | None = None,
+        in_loop: bool = False,
+    ):
+        self.functions = functions
+        self.used: dict[str, SKFunction] = {} if used is None else used
+        # in an each block the context is the item, which has no variables
+        self.in_loop = in_loop
+        self.steps: list[PlanStep] = []
+        self.output: list[str | Source] = []
+        self.assignments: dict[str, Source] = {}
+
+    def nodes(self, nodes: tuple[Node, ...]):
+        for node in nodes:
+            if isinstance(node, Text):
+                self.output.append(node.value)
+            elif isinstance(node, Block) and node.name == "each" and not self.in_loop:
+                self.output.append(self.each(node))
+            elif isinstance(node, Mustache) and self.in_loop and _is_this(node.path):
+                if node.params or node.hash:
+                    raise _Unsupported("this with arguments")
+                self.output.append(Item())
+            elif isinstance(node, Mustache) and node.path.is_simple:
+                name = node.path.name
+                if name in ("set", "get") and self.in_loop:
+                    raise _Unsupported(f"{name} in an each block")
+                if name == "set":
+                    self.set(node.params, node.hash)
+                elif node.params or node.hash or name in self.functions:
+                    self.output.append(self.call(name, node.params, node.hash))
+                else:
+                    raise _Unsupported(f"variable {name!r}")
+            else:
+                raise _Unsupported(type(node).__name__)
+
+    def set(self, params: tuple, hash: tuple):
+        if len(params) == 2:
+            name, value = params
+        else:
+            arguments = dict(hash)
+            name, value = arguments.get("name"), arguments.get("value")
+        if not (isinstance(name, Literal) and isinstance(name.value, str)) or (
+            value is None
+        ):
+            raise _Unsupported("set")
+        self.assignments[name.value] = self.expression(value)
+
+    def each(self, node: Block) -> Source:
+        items = node.params[0] if len(node.params) == 1 else None
+        if (
+            node.hash
+            or node.inverse is not None
+            or not isinstance(items, SubExpression)
+            or items.path.name not in _LIST_HELPERS
+        ):
+            raise _Unsupported("each block other than over a range or array")
+        source = self.expression(items)
+        body = _GraphBuilder(self.functions, self.used, in_loop=True)
+        body.nodes(node.program)
+        step = PlanStep(
+            index=len(self.steps),
+            name="each",
+            function=None,
+            helper=None,
+            params=(source,),
+            hash=(),
+            loop=PlanLoop(tuple(body.steps), tuple(body.output)),
+        )
+        self.steps.append(step)
+        return StepOutput(step.index)
+
+    def expression(self, expression: Expression) -> Source:
+        if isinstance(expression, Literal):
+            return Constant(expression.value)
+        if isinstance(expression, PathExpression) and self.in_loop:
+            if _is_this(expression):
+                return Item()
+            raise _Unsupported("path in an each block")
+        if isinstance(expression, SubExpression) and expression.path.is_simple:
+            return self.call(expression.path.name, expression.params, expression.hash)
+        raise _Unsupported(type(expression).__name__)
+
+    def call(self, name: str, params: tuple, hash: tuple) -> Source:
+        if name in ("get", "set") and self.in_loop:
+            raise _Unsupported(f"{name} in an each block")
+        if name == "get":
+            if len(params) != 1 or hash or not isinstance(params[0], Literal):
+                raise _Unsupported("get")
+            variable = params[0].value
+            return self.assignments.get(variable, InputVariable(variable))
+        function = self.functions.get(name)
+        helper = None
+        if function is not None:
+            if params:
+                raise _Unsupported(f"positional arguments to {name}")
+            self.used[name] = function
+        else:
+            helper = _STEP_HELPERS.get(name)
+            if helper is None:
+                raise _Unsupported(name)
+        # the steps of the arguments come first, so they get the lower indexes
+        params = tuple(self.expression(param) for param in params)
+        hash = tuple((key, self.expression(value)) for key, value in hash)
+        step = PlanStep(
+            index=len(self.steps),
+            name=name,
+            function=function,
+            helper=helper,
+            params=params,
+            hash=hash,
+        )
+        self.steps.append(step)
+        return StepOutput(step.index)
+
+
+def _is_this(path: PathExpression) -> bool:
+    return path.lookup_segments == ("",)
+
+
+async def compile_plan(
+    template: str, functions: Mapping[str, SKFunction]
+) -> PlanGraph | None:
+    """Compile a plan's handlebars block, or return None if it needs a renderer."""
+    builder = _GraphBuilder(functions)
+    try:
+        builder.nodes(parse_plan(template).body)
+    except _Unsupported as exc:
+        _LOGGER.debug("Plan is rendered as a template, it uses %s", exc)
+        return None
+    graph = PlanGraph(builder.steps, builder.output, builder.assignments, builder.used)
+    await graph.fold()
+    return graph
+
+
+class PlanGraphCache:
+    """Compiled plans by template source, so repeated plans are compiled once.
+
+    Templates that cannot be compiled are remembered as None.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, PlanGraph | None] = OrderedDict()
+
+    def get(
+        self, template: str, functions: Mapping[str, SKFunction]
+    ) -> PlanGraph | None:
+        """Return the graph compiled for template against these functions, if any."""
+        graph = self._entries.get(template)
+        if graph is None or not graph.matches(functions):
+            return None
+        self._entries.move_to_end(template)
+        return graph
+
+    async def get_or_compile(
+        self, template: str, functions: Mapping[str, SKFunction]
+    ) -> PlanGraph | None:
+        if template in self._entries:
+            graph = self._entries[template]
+            if graph is None or graph.matches(functions):
+                self._entries.move_to_end(template)
+                return graph
+        graph = await compile_plan(template, functions)
+        self._entries[template] = graph
+        self._entries.move_to_end(template)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return graph
+
+
+_plan_graph_cache = PlanGraphCache()
+
+
+def get_plan_graph_cache() -> PlanGraphCache:
+    return _plan_graph_cache
@@ -0,0 +1,283 @@
+"""Static checks of HandleBars plans against the functions they may call.
+
+Plans are parsed, not rendered, so problems are found before any helper runs:
+syntax errors such as unbalanced blocks, unknown helpers, arguments a helper
+does not take, missing required parameters and literals of the wrong type.
+"""
+
+import re
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+
+from ..plugins.sk_function import SKFunction
+from ..template_engine import HandleBarsTemplateError
+from ..template_engine.handlebars_parser import (
+    Block,
+    Expression,
+    HandleBarsSyntaxError,
+    Literal,
+    Mustache,
+    Node,
+    RawBlock,
+    SubExpression,
+    Template,
+    parse,
+)
+
+_PLAN_TEMPLATE = re.compile(
+    r".*(`{3}.?handlebars.?)(?P<template>.*)```.*",
+    re.MULTILINE | re.S | re.IGNORECASE,
+)
+
+# positional arguments the built-in helpers take, as (minimum, maximum)
+_BUILTIN_ARITY: dict[str, tuple[int, int | None]] = {
+    "if": (1, 1),
+    "unless": (1, 1),
+    "each": (1, 1),
+    "with": (1, 1),
+    "lookup": (2, 2),
+    "log": (1, 1),
+    "message": (0, 0),
+    "set": (0, 2),
+    "get": (1, 1),
+    "array": (0, None),
+    "range": (1, 2),
+    "concat": (0, 0),
+    "equal": (2, 2),
+    "lessThan": (2, 2),
+    "greaterThan": (2, 2),
+    "lessThanOrEqual": (2, 2),
+    "greaterThanOrEqual": (2, 2),
+    "json": (1, 1),
+    "doubleOpen": (0, 0),
+    "doubleClose": (0, 0),
+    "camelCase": (1, 1),
+    "window": (0, 1),
+}
+# helpers whose result is a list, never a number or a string
+_LIST_HELPERS = frozenset({"array", "range", "window"})
+# parameters the kernel passes to functions itself
+_INJECTED_TYPES = frozenset({"kernel"})
+
+
+@dataclass(frozen=True, slots=True)
+class PlanDiagnostic:
+    """A problem found in a plan; errors make the plan fail when it runs.
+
+    line counts from the start of the handlebars block.
+    """
+
+    severity: str
+    code: str
+    message: str
+    line: int | None = None
+    helper: str | None = None
+
+    def __str__(self) -> str:
+        location = f"line {self.line}: " if self.line is not None else ""
+        return f"{self.severity}: {location}{self.message}"
+
+
+class PlanValidationError(HandleBarsTemplateError):
+    def __init__(self, diagnostics: list[PlanDiagnostic]):
+        super().__init__(
+            "Invalid plan:\n" + "\n".join(str(diagnostic) for diagnostic in diagnostics)
+        )
+        self.diagnostics = diagnostics
+
+
+@lru_cache(maxsize=256)
+def parse_plan(template: str) -> Template:
+    """Parse the handlebars block of a plan; trees are immutable and shared."""
+    return parse(template)
+
+
+def extract_plan_template(plan: str) -> str | None:
+    """Return the handlebars code block of a plan, or None if it has none."""
+    matches = _PLAN_TEMPLATE.match(plan)
+    return matches.group("template") if matches else None
+
+
+def validate_plan(
+    plan: str, functions: Mapping[str, SKFunction] | Iterable[SKFunction]
+) -> list[PlanDiagnostic]:
+    """Check a plan, or its handlebars block, against the functions it may call."""
+    if not isinstance(functions, Mapping):
+        functions = {function.fully_qualified_name: function for function in functions}
+    template = extract_plan_template(plan) if "```" in plan else plan
+    if template is None:
+        return [
+            PlanDiagnostic("error", "no_template", "The plan has no handlebars block")
+        ]
+    try:
+        tree = parse_plan(template)
+    except HandleBarsSyntaxError as exc:
+        return [PlanDiagnostic("error", "syntax", str(exc), line=exc.line)]
+    validator = _Validator(functions)
+    validator.nodes(tree.body)
+    validator.check_variables()
+    return validator.diagnostics
+
+
+def has_errors(diagnostics: Iterable[PlanDiagnostic]) -> bool:
+    return any(diagnostic.severity == "error" for diagnostic in diagnostics)
+
+
+def _parameter_type(parameter) -> str | None:
+    return getattr(parameter, "type_", None) or getattr(parameter, "type", None)
+
+
+class _Validator:
+    def __init__(self, functions: Mapping[str, SKFunction]):
+        self.functions = functions
+        self.diagnostics: list[PlanDiagnostic] = []
+        self.set_names: set[str] = set()
+        self.get_names: dict[str, int] = {}
+
+    def error(self, code: str, message: str, line: int, helper: str | None = None):
+        self.diagnostics.append(PlanDiagnostic("error", code, message, line, helper))
+
+    def warning(self, code: str, message: str, line: int, helper: str | None = None):
+        self.diagnostics.append(PlanDiagnostic("warning", code, message, line, helper))
+
+    def nodes(self, nodes: tuple[Node, ...]):
+        for node in nodes:
+            if isinstance(node, Mustache):
+                if node.params or node.hash or node.path.name in self.functions:
+                    self.call(node.path.name, node.params, node.hash, node.line)
+                else:
+                    self.arguments(node.params, node.hash, node.line)
+            elif isinstance(node, Block):
+                self.call(node.name, node.params, node.hash, node.line)
+                self.nodes(node.program)
+                self.nodes(node.inverse or ())
+            elif isinstance(node, RawBlock):
+                self.arguments(node.params, node.hash, node.line)
+
+    def arguments(self, params: tuple, hash: tuple, line: int):
+        for expression in (*params, *(value for _, value in hash)):
+            if isinstance(expression, SubExpression):
+                self.call(
+                    ".".join(expression.path.segments),
+                    expression.params,
+                    expression.hash,
+                    expression.line,
+                )
+
+    def call(self, name: str, params: tuple, hash: tuple, line: int):
+        self.arguments(params, hash, line)
+        function = self.functions.get(name)
+        if function is not None:
+            self.function_call(function, name, params, hash, line)
+        elif name in _BUILTIN_ARITY:
+            self.builtin_call(name, params, hash, line)
+        else:
+            self.error("unknown_helper", f"Unknown helper {name!r}", line, name)
+
+    def builtin_call(self, name: str, params: tuple, hash: tuple, line: int):
+        minimum, maximum = _BUILTIN_ARITY[name]
+        if name == "set":
+            keys = {key for key, _ in hash}
+            if len(params) != 2 and not {"name", "value"} <= keys:
+                self.error(
+                    "arity",
+                    "set takes a name and a value, as two arguments or as name= and value=",
+                    line,
+                    name,
+                )
+            variable = params[0] if params else dict(hash).get("name")
+            if isinstance(variable, Literal) and isinstance(variable.value, str):
+                self.set_names.add(variable.value)
+            return
+        if len(params) < minimum or (maximum is not None and len(params) > maximum):
+            expected = (
+                f"{minimum}"
+                if minimum == maximum
+                else f"{minimum} to {maximum or 'any'}"
+            )
+            self.error(
+                "arity",
+                f"{name} takes {expected} positional arguments, got {len(params)}",
+                line,
+                name,
+            )
+        if name == "get" and params:
+            variable = params[0]
+            if isinstance(variable, Literal) and isinstance(variable.value, str):
+                self.get_names.setdefault(variable.value, line)
+
+    def function_call(
+        self, function: SKFunction, name: str, params: tuple, hash: tuple, line: int
+    ):
+        if params:
+            self.error(
+                "positional_arguments",
+                f"{name} takes its parameters by name, like {name} "
+                f"{' '.join(f'{p.name}=...' for p in function.input_variables) or '...'}",
+                line,
+                name,
+            )
+        parameters = {
+            parameter.name: parameter for parameter in function.input_variables
+        }
+        arguments = dict(hash)
+        for key, value in arguments.items():
+            parameter = parameters.get(key)
+            if parameter is None:
+                self.error(
+                    "unknown_parameter",
+                    f"{name} has no parameter {key!r}; it takes "
+                    f"{', '.join(parameters) or 'no parameters'}",
+                    line,
+                    name,
+                )
+                continue
+            self.check_type(name, parameter, value, line)
+        for parameter in function.input_variables:
+            if (
+                parameter.required
+                and parameter.name not in arguments
+                and _parameter_type(parameter) not in _INJECTED_TYPES
+                and not parameter.default_value
+            ):
+                self.error(
+                    "missing_parameter",
+                    f"{name} is missing the required parameter {parameter.name!r}",
+                    line,
+                    name,
+                )
+
+    def check_type(self, name: str, parameter, value: Expression, line: int):
+        expected = _parameter_type(parameter)
+        if expected != "number":
+            return
+        problem = None
+        if isinstance(value, Literal):
+            literal = value.value
+            if isinstance(literal, bool) or literal is None:
+                problem = repr(literal)
+            elif isinstance(literal, str):
+                try:
+                    float(literal)
+                except ValueError:
+                    problem = repr(literal)
+        elif isinstance(value, SubExpression) and value.path.name in _LIST_HELPERS:
+            problem = f"the list from {value.path.name}"
+        if problem is not None:
+            self.error(
+                "type_mismatch",
+                f"{name} expects a number for {parameter.name!r}, got {problem}",
+                line,
+                name,
+            )
+
+    def check_variables(self):
+        for variable, line in self.get_names.items():
+            if variable not in self.set_names:
+                self.warning(
+                    "undefined_variable",
+                    f"Variable {variable!r} is read but never set",
+                    line,
+                    "get",
+                )
@@ -0,0 +1,148 @@
+import math
+import re
+from collections import Counter
+from collections.abc import Iterable
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from ..plugins.sk_function import SKFunction
+from ..template_engine import HandleBarsPromptTemplateHandler
+from .plan_cache import catalog_fingerprint
+
+# how a function is described to the planner, rendered once per function; the
+# first line break goes with the standalone each tag
+FUNCTION_SNIPPET_TEMPLATE = (
+    "{{#each functions}}\n\n\n"
+    "### {{doubleOpen}}{{fully_qualified_name}}{{doubleClose}}`\n"
+    "Description: {{description}}\n"
+    "Inputs:\n"
+    "{{#each Parameters}}\n"
+    "  - {{name}}: {{type_}} - {{description}} "
+    "{{#if required}}(required){{else}}(optional){{/if}}\n"
+    "{{/each}}\n"
+    "Output: string - The result of the helper.{{/each}}"
+)
+
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from given how i in is it me my of on or "
+    "please that the this to use using what with you your".split()
+)
+
+
+def index_terms(text: str | None) -> list[str]:
+    """Split text, including camelCase and snake_case names, into index terms."""
+    terms = []
+    for word in _WORDS.findall(text or ""):
+        word = word.lower()
+        if word in _STOP_WORDS:
+            continue
+        # a crude plural stemmer, so "numbers" matches "number"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _function_terms(function: SKFunction) -> list[str]:
+    # the name counts twice, it is the most telling part of a function
+    terms = index_terms(function.fully_qualified_name) * 2
+    terms += index_terms(function.description)
+    for parameter in function.input_variables:
+        terms += index_terms(parameter.name)
+        terms += index_terms(parameter.description)
+    return terms
+
+
+class FunctionIndex:
+    """BM25 index over the names, descriptions and parameters of functions."""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, functions: Iterable[SKFunction]):
+        self.functions = tuple(functions)
+        self._documents = [Counter(_function_terms(f)) for f in self.functions]
+        lengths = [sum(document.values()) for document in self._documents]
+        self._lengths = lengths
+        self._average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        frequencies = Counter(term for document in self._documents for term in document)
+        count = len(self._documents)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in frequencies.items()
+        }
+
+    def scores(self, query: str) -> list[float]:
+        terms = [term for term in set(index_terms(query)) if term in self._idf]
+        scores = []
+        for document, length in zip(self._documents, self._lengths):
+            score = 0.0
+            norm = self.k1 * (
+                1 - self.b + self.b * length / (self._average_length or 1)
+            )
+            for term in terms:
+                frequency = document.get(term)
+                if frequency:
+                    score += (
+                        self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+                    )
+            scores.append(score)
+        return scores
+
+    def top(self, query: str, k: int) -> tuple[SKFunction, ...]:
+        """Return the k functions most relevant to query, in index order."""
+        if k >= len(self.functions):
+            return self.functions
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda position: -scores[position])
+        return tuple(self.functions[position] for position in sorted(ranked[:k]))
+
+
+class PlannerCatalog(SKBaseModel):
+    """The functions a planner may use, with what it needs to present them.
+
+    A catalog is built once per registry version and filter; it holds the
+    fingerprint plans are cached under, a lexical index to select the functions
+    relevant to a goal, and each function's prompt snippet once rendered.
+    """
+
+    fingerprint: str
+    _functions: tuple[SKFunction, ...] = PrivateAttr()
+    _index: FunctionIndex = PrivateAttr()
+    _snippets: dict[str, str] = PrivateAttr(default_factory=dict)
+    _snippet_template: HandleBarsPromptTemplateHandler = PrivateAttr()
+
+    class Config:
+        copy_on_model_validation = "none"
+
+    def __init__(self, functions: Iterable[SKFunction]):
+        functions = tuple(functions)
+        super().__init__(fingerprint=catalog_fingerprint(functions))
+        self._functions = functions
+        self._index = FunctionIndex(functions)
+        self._snippet_template = HandleBarsPromptTemplateHandler(
+            FUNCTION_SNIPPET_TEMPLATE
+        )
+
+    @property
+    def functions(self) -> tuple[SKFunction, ...]:
+        return self._functions
+
+    def select(self, goal: str, max_functions: int | None) -> tuple[SKFunction, ...]:
+        """Return the functions relevant to the goal, or all of them without a limit."""
+        if max_functions is None:
+            return self.functions
+        return self._index.top(goal, max_functions)
+
+    async def render(self, functions: Iterable[SKFunction]) -> str:
+        """Return the prompt text describing functions."""
+        parts = []
+        for function in functions:
+            snippet = self._snippets.get(function.fully_qualified_name)
+            if snippet is None:
+                snippet = await self._snippet_template.render({"functions": [function]})
+                self._snippets[function.fully_qualified_name] = snippet
+            parts.append(snippet)
+        return "".join(parts)
@@ -1,4 +1,8 @@
+from .function_registry import FunctionRegistry
+from .lazy_function import LazyFunction
 from .native_function import NativeFunction
+from .plugin_directory import PluginDirectory
+from .prompt_bundle import PromptBundle, build_prompt_bundle
 from .semantic_function import SemanticFunction
 from .sk_function import Parameter, SKFunction
 from .sk_function_decorator import sk_function
@@ -8,7 +12,12 @@ from .sk_plugin import SKPlugin
 __all__ = [
     "SKFunction",
     "SKPlugin",
+    "FunctionRegistry",
     "NativeFunction",
+    "LazyFunction",
+    "PluginDirectory",
+    "PromptBundle",
+    "build_prompt_bundle",
     "SemanticFunction",
     "sk_function",
     "sk_function_parameter",
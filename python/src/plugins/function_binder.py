@@ -0,0 +1,160 @@
+"""Binding of call arguments to the Python parameters of native functions.
+
+A binder is built once per function from its sk_function_parameter metadata and
+its signature; a call then only looks up, defaults and converts each argument.
+"""
+
+import inspect
+import json
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+_TRUE = frozenset({"true", "yes", "1"})
+_FALSE = frozenset({"false", "no", "0", ""})
+
+
+def _to_boolean(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+        return value.strip().lower() in _TRUE
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    raise ValueError(value)
+
+
+def _to_array(value: Any) -> list:
+    # templates pass lists as they are and models pass them as JSON
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, Mapping) or not isinstance(value, Iterable):
+        raise ValueError(value)
+    return list(value)
+
+
+# how values of a declared parameter type are converted before the call; values
+# of other types, like kernel or ChatHistory, are passed as they are
+CONVERTERS: dict[str, Callable[[Any], Any]] = {
+    "number": float,
+    "string": str,
+    "boolean": _to_boolean,
+    "array": _to_array,
+}
+
+# defaults for arguments left to the function and for required ones
+_MISSING = object()
+_REQUIRED = object()
+
+
+class FunctionBinder:
+    """Maps the variables of a call onto the parameters of a Python function.
+
+    Functions that take a variables parameter get the call's arguments as they
+    are; the others get each parameter by name, from positional arguments,
+    keyword arguments, the variables or the declared default, in that order.
+    """
+
+    def __init__(self, function: Callable, name: str, parameters: list[dict]):
+        self.name = name
+        signature = inspect.signature(function)
+        self.passthrough = "variables" in signature.parameters
+        declared = {
+            parameter["name"]: parameter
+            for parameter in parameters
+            if parameter["direction"] == "input"
+        }
+        self.var_keyword = any(
+            parameter.kind is inspect.Parameter.VAR_KEYWORD
+            for parameter in signature.parameters.values()
+        )
+        names = [
+            parameter.name
+            for parameter in signature.parameters.values()
+            if parameter.kind
+            not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+        ]
+        if self.var_keyword:
+            names += [name for name in declared if name not in names]
+        # (name, positional, type, converter, default) for each argument
+        self.slots: list[tuple[str, bool, str | None, Callable | None, Any]] = []
+        for name in names:
+            parameter = signature.parameters.get(name)
+            metadata = declared.get(name, {})
+            type_ = metadata.get("type")
+            converter = CONVERTERS.get(type_)
+            positional = (
+                parameter is not None
+                and parameter.kind is inspect.Parameter.POSITIONAL_ONLY
+            )
+            python_default = (
+                parameter.default if parameter is not None else inspect.Parameter.empty
+            )
+            default = metadata.get("default_value", "")
+            if default not in ("", None):
+                default = self._convert(name, type_, converter, default)
+            elif python_default is not inspect.Parameter.empty:
+                default = python_default if positional else _MISSING
+            elif metadata.get("required"):
+                default = _REQUIRED
+            else:
+                default = None
+            self.slots.append((name, positional, type_, converter, default))
+        self.names = frozenset(names)
+
+    def bind(self, args: tuple, kwargs: dict) -> tuple[tuple, dict]:
+        """Return the positional and keyword arguments to call the function with."""
+        if self.passthrough:
+            return args, kwargs
+        variables = kwargs.pop("variables", None)
+        if (
+            variables is None
+            and args
+            and (args[0] is None or isinstance(args[0], Mapping))
+        ):
+            variables, args = args[0], args[1:]
+        if len(args) > len(self.slots):
+            raise TypeError(
+                f"{self.name} takes {len(self.slots)} positional arguments "
+                f"but {len(args)} were given"
+            )
+        given = dict(zip((slot[0] for slot in self.slots), args))
+        variables = variables or {}
+        call_args = []
+        call_kwargs = (
+            {key: value for key, value in kwargs.items() if key not in self.names}
+            if self.var_keyword
+            else {}
+        )
+        for name, positional, type_, converter, default in self.slots:
+            value = given.get(name)
+            if value is None:
+                value = kwargs.get(name)
+            if value is None:
+                value = variables.get(name)
+            if value is None:
+                if default is _MISSING:
+                    continue
+                if default is _REQUIRED:
+                    raise ValueError(
+                        f"{self.name} is missing the required parameter {name!r}"
+                    )
+                value = default
+            elif converter is not None:
+                value = self._convert(name, type_, converter, value)
+            if positional:
+                call_args.append(value)
+            else:
+                call_kwargs[name] = value
+        return tuple(call_args), call_kwargs
+
+    def _convert(
+        self, name: str, type_: str | None, converter: Callable | None, value: Any
+    ) -> Any:
+        if converter is None:
+            return value
+        try:
+            return converter(value)
+        except (TypeError, ValueError):
+            raise ValueError(
+                f"{self.name} expects a {type_} for {name!r}, got {value!r}"
+            ) from None
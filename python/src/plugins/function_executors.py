@@ -0,0 +1,93 @@
+"""Where synchronous native functions run, so slow ones do not block the loop.
+
+"inline" calls the function on the event loop, which suits cheap functions;
+"thread" runs it on a shared thread pool, for blocking I/O or code that
+releases the GIL; "process" runs it on a shared process pool, for CPU-bound
+Python code. Process pool functions and their arguments must be picklable.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+EXECUTION_POLICIES = (INLINE, THREAD, PROCESS)
+
+_pool_sizes: dict[str, int | None] = {THREAD: None, PROCESS: None}
+_pools: dict[str, Executor] = {}
+_lock = threading.Lock()
+
+
+def check_execution_policy(policy: str) -> str:
+    if policy not in EXECUTION_POLICIES:
+        raise ValueError(
+            f"Unknown execution policy {policy!r}, expected one of "
+            f"{', '.join(EXECUTION_POLICIES)}"
+        )
+    return policy
+
+
+def set_pool_size(policy: str, max_workers: int | None):
+    """Size the shared pool of a policy; None uses the concurrent.futures default.
+
+    A pool that is already running is shut down once its pending calls finish,
+    and the next call starts a pool of the new size.
+    """
+    if check_execution_policy(policy) == INLINE:
+        raise ValueError("Inline functions do not run on a pool")
+    with _lock:
+        _pool_sizes[policy] = max_workers
+        pool = _pools.pop(policy, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def get_executor(policy: str) -> Executor:
+    """Return the shared pool of a policy, starting it on first use."""
+    with _lock:
+        pool = _pools.get(policy)
+        if pool is None:
+            max_workers = _pool_sizes[policy]
+            if policy == THREAD:
+                pool = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="sk-native"
+                )
+            else:
+                pool = ProcessPoolExecutor(max_workers=max_workers)
+            _LOGGER.debug("Started the %s pool for native functions", policy)
+            _pools[policy] = pool
+        return pool
+
+
+def shutdown_executors(wait: bool = True):
+    """Shut the shared pools down; they start again when next needed."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+
+async def run_with_policy(
+    policy: str, function: Callable, *args: Any, **kwargs: Any
+) -> Any:
+    """Call a synchronous function as its policy says and return its result.
+
+    Exceptions raised by the function are raised here. Cancelling the caller
+    cancels the call if it has not started yet; a call that is already running
+    on a pool finishes, and its result is dropped.
+    """
+    if policy == INLINE:
+        return function(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(policy), functools.partial(function, *args, **kwargs)
+    )
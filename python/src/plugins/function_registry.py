@@ -0,0 +1,144 @@
+from collections.abc import Callable, Iterable, Mapping
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from .sk_function import SKFunction
+
+if TYPE_CHECKING:
+    from .sk_plugin import SKPlugin
+
+FunctionFilter = tuple[frozenset, frozenset, frozenset, frozenset]
+T = TypeVar("T")
+
+
+class FunctionRegistry(SKBaseModel):
+    """Index of the functions of all plugins registered with a kernel.
+
+    The registry is updated incrementally when plugins are added or removed and when
+    functions are added to a registered plugin. Every change bumps version, so
+    anything derived from the registry can tell when it is stale.
+    """
+
+    version: int = 0
+    _functions: dict[str, SKFunction] = PrivateAttr(default_factory=dict)
+    _functions_view: Mapping[str, SKFunction] = PrivateAttr()
+    _plugins: dict[str, "SKPlugin"] = PrivateAttr(default_factory=dict)
+    _filter_cache: dict[FunctionFilter, tuple[SKFunction, ...]] = PrivateAttr(
+        default_factory=dict
+    )
+    _derived: dict[Any, Any] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, plugins: Iterable["SKPlugin"] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self._functions_view = MappingProxyType(self._functions)
+        for plugin in plugins or []:
+            self.add_plugin(plugin)
+
+    @property
+    def functions(self) -> Mapping[str, SKFunction]:
+        """Read-only view of all functions by fully qualified name."""
+        return self._functions_view
+
+    @property
+    def plugins(self) -> Mapping[str, "SKPlugin"]:
+        return MappingProxyType(self._plugins)
+
+    def add_plugin(self, plugin: "SKPlugin"):
+        if plugin.name in self._plugins:
+            self.remove_plugin(plugin.name)
+        self._plugins[plugin.name] = plugin
+        self._functions.update(plugin.fqn_functions)
+        plugin.subscribe(self)
+        self._bump()
+
+    def remove_plugin(self, name: str):
+        plugin = self._plugins.pop(name, None)
+        if plugin is None:
+            return
+        plugin.unsubscribe(self)
+        for fqn in plugin.fqn_functions:
+            self._functions.pop(fqn, None)
+        self._bump()
+
+    def on_function_added(self, plugin: "SKPlugin", function: SKFunction):
+        """Called by a registered plugin whenever a function is added to it."""
+        if self._plugins.get(plugin.name) is not plugin:
+            return
+        self._functions[function.fully_qualified_name] = function
+        self._bump()
+
+    def get_function(self, fully_qualified_name: str) -> SKFunction | None:
+        return self._functions.get(fully_qualified_name)
+
+    def get_plugin_functions(self, plugin_name: str) -> Mapping[str, SKFunction]:
+        plugin = self._plugins.get(plugin_name)
+        if plugin is None:
+            return MappingProxyType({})
+        return plugin.fqn_functions
+
+    def filter(
+        self,
+        included_plugins: Iterable[str] = (),
+        included_functions: Iterable[str] = (),
+        excluded_plugins: Iterable[str] = (),
+        excluded_functions: Iterable[str] = (),
+    ) -> tuple[SKFunction, ...]:
+        """Return the functions selected by the include/exclude sets.
+
+        With no include sets everything is included; exclusions always win. Results
+        are cached per filter until the registry changes.
+        """
+        key = (
+            frozenset(included_plugins),
+            frozenset(included_functions),
+            frozenset(excluded_plugins),
+            frozenset(excluded_functions),
+        )
+        functions = self._filter_cache.get(key)
+        if functions is None:
+            functions = tuple(
+                function
+                for plugin_name, plugin in self._plugins.items()
+                for fqn, function in plugin.fqn_functions.items()
+                if _should_include_function(key, plugin_name, fqn)
+            )
+            self._filter_cache[key] = functions
+        return functions
+
+    def derived(self, key: Any, build: Callable[[], T]) -> T:
+        """Return build() for key, built once per registry version.
+
+        For state computed from the registered functions, like planner catalogs.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = build()
+            return value
+
+    def _bump(self):
+        self.version += 1
+        self._filter_cache.clear()
+        self._derived.clear()
+
+
+def _should_include_function(
+    function_filter: FunctionFilter, plugin: str, function: str
+) -> bool:
+    """Return True if the function will be included."""
+    included_plugins, included_functions, excluded_plugins, excluded_functions = (
+        function_filter
+    )
+    should_include = len(included_plugins) == 0 and len(included_functions) == 0
+    if plugin in included_plugins:
+        should_include = True
+    if function in included_functions:
+        should_include = True
+    if plugin in excluded_plugins:
+        should_include = False
+    if function in excluded_functions:
+        should_include = False
+    return should_include
@@ -0,0 +1,48 @@
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import PrivateAttr
+
+from .sk_function import SKFunction
+
+
+class LazyFunction(SKFunction):
+    """A function described by a manifest and loaded when it is first needed.
+
+    Its name, description, parameters and purity come from the manifest, so
+    listing or planning with it loads nothing. Running it, or reading anything
+    only the real function has, like a template, loads it once.
+    """
+
+    _loader: Callable[[], SKFunction] = PrivateAttr()
+    _function: SKFunction | None = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, loader: Callable[[], SKFunction], **fields: Any):
+        super().__init__(**fields)
+        self._loader = loader
+
+    @property
+    def loaded(self) -> bool:
+        return self._function is not None
+
+    def load(self) -> SKFunction:
+        """Return the real function, loading it on first use."""
+        function = self._function
+        if function is None:
+            with self._lock:
+                if self._function is None:
+                    function = self._loader()
+                    function.plugin_name = self.plugin_name
+                    self._function = function
+                function = self._function
+        return function
+
+    async def run_async(self, *args, **kwargs) -> dict:
+        return await self.load().run_async(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
@@ -1,16 +1,31 @@
 import asyncio
 import logging
+from collections.abc import Callable
+from inspect import isawaitable
 from typing import Any
 
+from pydantic import PrivateAttr
 from semantic_kernel.skill_definition.parameter_view import ParameterView as Parameter
 
+from .function_binder import FunctionBinder
+from .function_executors import INLINE, check_execution_policy, run_with_policy
 from .sk_function import SKFunction
 
 _LOGGER = logging.getLogger(__name__)
 
+# exact types a batch implementation takes; bool and numeric strings are scalar
+_NUMBER_TYPES = frozenset({int, float})
+
 
 class NativeFunction(SKFunction):
     function: Any
+    # where a synchronous function runs, see function_executors
+    execution_policy: str = INLINE
+    _binder: FunctionBinder = PrivateAttr()
+    _is_async: bool = PrivateAttr(default=False)
+    _batch: Callable | None = PrivateAttr(default=None)
+    _number_inputs: frozenset[str] = PrivateAttr(default=frozenset())
+    _number_defaults: dict[str, float] = PrivateAttr(default_factory=dict)
 
     def __init__(self, function):
         input_variables = []
@@ -51,10 +66,121 @@ class NativeFunction(SKFunction):
             description=function.__sk_function_description__,
             input_variables=input_variables,
             output_variables=output_variables,
+            pure=getattr(function, "__sk_function_pure__", False),
+            execution_policy=check_execution_policy(
+                getattr(function, "__sk_function_executor__", INLINE)
+            ),
         )
+        if asyncio.iscoroutinefunction(function) and self.execution_policy != INLINE:
+            raise ValueError(
+                f"{self.name} is a coroutine function and runs on the event loop; "
+                f"it cannot use the {self.execution_policy!r} execution policy"
+            )
         self.function = function
+        self._binder = FunctionBinder(
+            function, self.name, function.__sk_function_context_parameters__
+        )
+        self._is_async = asyncio.iscoroutinefunction(function)
+        self._batch = _resolve_batch(function)
+        self._number_inputs = frozenset(
+            parameter.name
+            for parameter in input_variables
+            if parameter.type_ == "number"
+        )
+        self._number_defaults = {
+            parameter.name: float(parameter.default_value)
+            for parameter in input_variables
+            if parameter.name in self._number_inputs
+            and parameter.default_value not in ("", None)
+        }
+
+    @property
+    def supports_batch(self) -> bool:
+        return self._batch is not None
+
+    def can_batch(self, variables_list: list[dict]) -> bool:
+        """Whether the calls can run as one vectorized call.
+
+        They can when the function has a batch implementation and every call
+        passes the same number inputs, each a plain int or float. Number inputs
+        the calls leave out must have a declared default.
+        """
+        if self._batch is None or not variables_list:
+            return False
+        names = variables_list[0].keys()
+        if not names <= self._number_inputs:
+            return False
+        if not self._number_inputs - names <= self._number_defaults.keys():
+            return False
+        if not all(variables.keys() == names for variables in variables_list):
+            return False
+        types = {
+            type(value) for variables in variables_list for value in variables.values()
+        }
+        return types <= _NUMBER_TYPES
+
+    async def run_batch_async(self, variables_list: list[dict], **kwargs) -> list:
+        """Return the results of calling the function with each of the variables.
+
+        Homogeneous number inputs go to the batch implementation in one call;
+        anything else falls back to a call per variables.
+        """
+        if not self.can_batch(variables_list):
+            return [
+                await self.run_async(variables=variables, **kwargs)
+                for variables in variables_list
+            ]
+        # only batch implementations need numpy, so the core does not import it
+        import numpy as np
+
+        arrays = {
+            name: np.fromiter(
+                (variables[name] for variables in variables_list),
+                dtype=np.float64,
+                count=len(variables_list),
+            )
+            for name in variables_list[0]
+        }
+        for name, default in self._number_defaults.items():
+            if name not in arrays:
+                arrays[name] = np.full(len(variables_list), default)
+        if asyncio.iscoroutinefunction(self._batch):
+            results = await self._batch(**arrays)
+        else:
+            results = await run_with_policy(
+                self.execution_policy, self._batch, **arrays
+            )
+        if isawaitable(results):
+            results = await results
+        results = np.asarray(results)
+        if results.shape != (len(variables_list),):
+            raise ValueError(
+                f"Batch implementation of {self.fully_qualified_name} returned "
+                f"shape {results.shape} for {len(variables_list)} calls"
+            )
+        return results.tolist()
 
     async def run_async(self, *args, **kwargs) -> dict:
-        if asyncio.iscoroutinefunction(self.function):
+        args, kwargs = self._binder.bind(args, kwargs)
+        if self._is_async:
             return await self.function(*args, **kwargs)
-        return self.function(*args, **kwargs)
+        return await run_with_policy(
+            self.execution_policy, self.function, *args, **kwargs
+        )
+
+
+def _resolve_batch(function: Any) -> Callable | None:
+    batch = getattr(function, "__sk_function_batch__", None)
+    if batch is None:
+        return None
+    owner = getattr(function, "__self__", None)
+    if isinstance(batch, str):
+        if owner is None:
+            raise ValueError(
+                f"Batch method {batch!r} needs {function.__name__} to be a bound method"
+            )
+        return getattr(owner, batch)
+    # a function defined in the class body binds like the scalar method
+    if owner is not None and hasattr(batch, "__get__"):
+        return batch.__get__(owner)
+    return batch
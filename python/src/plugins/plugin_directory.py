@@ -0,0 +1,541 @@
+"""Plugins loaded from a directory tree only as their functions are used.
+
+Every subdirectory of the root is a plugin, named after the directory without
+a Plugin suffix, so MathPlugin holds the Math plugin. Its *.prompt.yaml files
+are semantic functions and the sk_function methods of the classes in its
+Python modules are native functions.
+
+Scanning builds a manifest of the functions' names, descriptions and
+parameters: only the keys describing a prompt are parsed, so its template is
+neither parsed nor compiled, and modules are read with ast instead of being
+imported. The manifest can be kept
+on disk, so unchanged files are not even read on the next start.
+"""
+
+import ast
+import dataclasses
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import yaml
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+from semantic_kernel.skill_definition.parameter_view import ParameterView as Parameter
+
+from .lazy_function import LazyFunction
+from .native_function import NativeFunction
+from .prompt_bundle import PromptBundle
+from .semantic_function import SemanticFunction
+from .sk_function import SKFunction
+from .sk_plugin import SKPlugin
+
+_LOGGER = logging.getLogger(__name__)
+
+PROMPT_SUFFIX = ".prompt.yaml"
+MANIFEST_VERSION = 1
+
+# the defaults of sk_function_parameter, for parameters read with ast
+_PARAMETER_DEFAULTS = {
+    "direction": "input",
+    "default_value": "",
+    "type": "string",
+    "required": False,
+}
+# keys of a prompt file read when scanning; the template is only read on load
+_MANIFEST_KEYS = frozenset(
+    {"name", "description", "input_variables", "output_variable"}
+)
+_TOP_LEVEL_KEY = re.compile(r"([A-Za-z_][\w-]*)[ \t]*:(?=\s|$)")
+_RESULT_PARAMETER = {
+    "name": "result",
+    "description": "result of the function",
+    "default_value": "",
+    "type": "string",
+    "required": True,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class FunctionManifest:
+    """What a plugin directory knows about a function before loading it.
+
+    path is relative to the root; class_name and attribute locate the method
+    of a native function. Parameters are dicts of the sk_function_parameter
+    arguments.
+    """
+
+    plugin: str
+    name: str
+    description: str
+    kind: str
+    path: str
+    input_variables: tuple[dict, ...]
+    output_variables: tuple[dict, ...]
+    pure: bool = False
+    class_name: str | None = None
+    attribute: str | None = None
+
+
+class _NotStatic(Exception):
+    pass
+
+
+def plugin_name(directory: str) -> str:
+    name = os.path.basename(directory)
+    return (
+        name[: -len("Plugin")] if name.endswith("Plugin") and name != "Plugin" else name
+    )
+
+
+def read_prompt_manifest(
+    plugin: str, path: str, relative: str
+) -> list[FunctionManifest]:
+    """Describe a prompt file without parsing its template or execution settings.
+
+    Only the top-level keys the manifest needs are parsed as YAML; the whole
+    file is parsed once, when the function is loaded.
+    """
+    with open(path, encoding="utf-8") as file:
+        source = file.read()
+    data = _prompt_header(source)
+    if data is None:
+        data = yaml.load(source, Loader=yaml.FullLoader)
+    output = data.get("output_variable") or {}
+    return [
+        FunctionManifest(
+            plugin=plugin,
+            name=data["name"],
+            description=data.get("description") or "",
+            kind="prompt",
+            path=relative,
+            input_variables=tuple(
+                {
+                    "name": variable.get("name"),
+                    "description": variable.get("description"),
+                    "default_value": "",
+                    "type": variable.get("type"),
+                    "required": variable.get("is_required", False),
+                }
+                for variable in data.get("input_variables") or []
+            ),
+            output_variables=(
+                {
+                    "name": output.get("name", "result"),
+                    "description": output.get("description"),
+                    "default_value": "",
+                    "type": output.get("type", "string"),
+                    "required": output.get("is_required", False),
+                },
+            ),
+        )
+    ]
+
+
+def _prompt_header(source: str) -> dict | None:
+    """Parse the top-level keys of a prompt file that describe its function.
+
+    Returns None for files not laid out as a plain top-level mapping, which are
+    parsed completely instead.
+    """
+    sections: dict[str, list[str]] = {}
+    lines = None
+    for line in source.splitlines(keepends=True):
+        match = _TOP_LEVEL_KEY.match(line)
+        if match:
+            if match.group(1) in sections:
+                return None
+            lines = sections[match.group(1)] = []
+        elif line.startswith("---") or line.startswith("..."):
+            return None
+        elif line[:1] not in ("", " ", "\t", "\r", "\n", "#", "-"):
+            return None
+        if lines is not None:
+            lines.append(line)
+    if "name" not in sections:
+        return None
+    header = "".join(
+        "".join(lines) for key, lines in sections.items() if key in _MANIFEST_KEYS
+    )
+    try:
+        data = yaml.load(header, Loader=yaml.FullLoader)
+    except yaml.YAMLError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def read_module_manifest(
+    plugin: str, path: str, relative: str
+) -> list[FunctionManifest]:
+    """Describe the sk_function methods of a module by parsing, not importing, it.
+
+    Modules whose decorators take anything but literals are imported instead.
+    """
+    with open(path, encoding="utf-8") as file:
+        source = file.read()
+    if "sk_function" not in source:
+        return []
+    try:
+        return _static_module_manifest(plugin, ast.parse(source, path), relative)
+    except (_NotStatic, SyntaxError) as exc:
+        _LOGGER.debug("Importing %s to describe its functions: %s", relative, exc)
+    module = _import_module(path, relative)
+    manifests = []
+    for class_name, cls in vars(module).items():
+        if not isinstance(cls, type) or cls.__module__ != module.__name__:
+            continue
+        for attribute, member in vars(cls).items():
+            if getattr(member, "__sk_function__", False):
+                manifests.append(
+                    _native_manifest(
+                        plugin,
+                        relative,
+                        class_name,
+                        attribute,
+                        {
+                            "name": member.__sk_function_name__,
+                            "description": member.__sk_function_description__,
+                            "pure": getattr(member, "__sk_function_pure__", False),
+                        },
+                        list(getattr(member, "__sk_function_context_parameters__", [])),
+                    )
+                )
+    return manifests
+
+
+def _static_module_manifest(
+    plugin: str, tree: ast.Module, relative: str
+) -> list[FunctionManifest]:
+    manifests = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for member in node.body:
+            if not isinstance(member, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            function_arguments = None
+            parameters = []
+            # decorators apply bottom up, which is the order parameters are listed in
+            for decorator in reversed(member.decorator_list):
+                name = _decorator_name(decorator)
+                if name == "sk_function":
+                    function_arguments = _literal_arguments(decorator)
+                elif name == "sk_function_parameter":
+                    parameters.append(
+                        {**_PARAMETER_DEFAULTS, **_literal_arguments(decorator)}
+                    )
+            if function_arguments is None:
+                continue
+            manifests.append(
+                _native_manifest(
+                    plugin,
+                    relative,
+                    node.name,
+                    member.name,
+                    function_arguments,
+                    parameters,
+                )
+            )
+    return manifests
+
+
+def _decorator_name(decorator: ast.expr) -> str | None:
+    function = decorator.func if isinstance(decorator, ast.Call) else decorator
+    if isinstance(function, ast.Name):
+        return function.id
+    if isinstance(function, ast.Attribute):
+        return function.attr
+    return None
+
+
+def _literal_arguments(decorator: ast.expr) -> dict:
+    if (
+        not isinstance(decorator, ast.Call)
+        or decorator.args
+        or any(keyword.arg is None for keyword in decorator.keywords)
+    ):
+        raise _NotStatic("decorator without keyword arguments")
+    try:
+        return {
+            keyword.arg: ast.literal_eval(keyword.value)
+            for keyword in decorator.keywords
+        }
+    except ValueError as exc:
+        raise _NotStatic(str(exc)) from exc
+
+
+def _native_manifest(
+    plugin: str,
+    relative: str,
+    class_name: str,
+    attribute: str,
+    function_arguments: dict,
+    parameters: list[dict],
+) -> FunctionManifest:
+    inputs = tuple(
+        {key: value for key, value in parameter.items() if key != "direction"}
+        for parameter in parameters
+        if parameter["direction"] == "input"
+    )
+    outputs = tuple(
+        {key: value for key, value in parameter.items() if key != "direction"}
+        for parameter in parameters
+        if parameter["direction"] != "input"
+    )
+    return FunctionManifest(
+        plugin=plugin,
+        name=function_arguments.get("name") or attribute,
+        description=function_arguments.get("description") or "",
+        kind="native",
+        path=relative,
+        input_variables=inputs,
+        output_variables=outputs or (_RESULT_PARAMETER,),
+        pure=bool(function_arguments.get("pure", False)),
+        class_name=class_name,
+        attribute=attribute,
+    )
+
+
+def _import_module(path: str, relative: str):
+    name = os.path.splitext(relative)[0].replace(os.sep, ".")
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    root = os.path.dirname(os.path.dirname(path))
+    if any(os.path.abspath(entry or ".") == root for entry in sys.path):
+        return importlib.import_module(name)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(name, None)
+        raise
+    return module
+
+
+def _parameter(parameter: dict) -> Parameter:
+    return Parameter(
+        name=parameter["name"],
+        description=parameter.get("description"),
+        default_value=parameter.get("default_value", ""),
+        type=parameter.get("type"),
+        required=parameter.get("required", False),
+    )
+
+
+class PluginDirectory(SKBaseModel):
+    """The plugins of a directory tree, with functions loaded on first use.
+
+    Native classes are created without arguments, or by the factory given for
+    their class name. warm_up loads everything ahead of time, optionally on a
+    background thread. With a bundle_path, prompts are loaded from a prompt
+    bundle that is kept up to date as they change.
+    """
+
+    root: str
+    manifest_path: str | None = None
+    bundle_path: str | None = None
+    _bundle: PromptBundle | None = PrivateAttr(default=None)
+    _factories: dict[str, Callable[[], Any]] = PrivateAttr(default_factory=dict)
+    _files: dict[str, dict] = PrivateAttr(default_factory=dict)
+    _plugins: dict[str, SKPlugin] = PrivateAttr(default_factory=dict)
+    _instances: dict[tuple[str, str], Any] = PrivateAttr(default_factory=dict)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    def __init__(
+        self,
+        root: str,
+        manifest_path: str | None = None,
+        factories: dict[str, Callable[[], Any]] | None = None,
+        bundle_path: str | None = None,
+    ):
+        super().__init__(
+            root=os.path.abspath(root),
+            manifest_path=manifest_path,
+            bundle_path=bundle_path,
+        )
+        self._factories = dict(factories or {})
+        self.scan()
+
+    @property
+    def functions(self) -> tuple[FunctionManifest, ...]:
+        return tuple(
+            manifest
+            for entry in self._files.values()
+            for manifest in entry["functions"]
+        )
+
+    @property
+    def plugin_names(self) -> list[str]:
+        return sorted({manifest.plugin for manifest in self.functions})
+
+    def scan(self):
+        """Update the manifest from the files that changed since the last scan."""
+        previous = self._files or self._load_manifest()
+        files = {}
+        for directory in sorted(os.scandir(self.root), key=lambda entry: entry.name):
+            if not directory.is_dir() or directory.name.startswith((".", "_")):
+                continue
+            plugin = plugin_name(directory.name)
+            for file in sorted(
+                os.scandir(directory.path), key=lambda entry: entry.name
+            ):
+                if not file.is_file() or file.name.startswith((".", "_")):
+                    continue
+                if file.name.endswith(PROMPT_SUFFIX):
+                    read = read_prompt_manifest
+                elif file.name.endswith(".py"):
+                    read = read_module_manifest
+                else:
+                    continue
+                relative = os.path.relpath(file.path, self.root)
+                stat = file.stat()
+                entry = previous.get(relative)
+                if (
+                    entry is None
+                    or entry["mtime_ns"] != stat.st_mtime_ns
+                    or entry["size"] != stat.st_size
+                ):
+                    entry = {
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "functions": read(plugin, file.path, relative),
+                    }
+                files[relative] = entry
+        changed = files.keys() != previous.keys() or any(
+            files[relative] is not previous.get(relative) for relative in files
+        )
+        self._files = files
+        self._plugins.clear()
+        if changed:
+            self._save_manifest()
+
+    def plugins(self) -> list[SKPlugin]:
+        return [self.plugin(name) for name in self.plugin_names]
+
+    def plugin(self, name: str) -> SKPlugin:
+        """Return the plugin with its functions not loaded yet."""
+        plugin = self._plugins.get(name)
+        if plugin is None:
+            functions = [
+                self._lazy_function(manifest)
+                for manifest in self.functions
+                if manifest.plugin == name
+            ]
+            if not functions:
+                raise KeyError(f"No plugin {name!r} in {self.root}")
+            plugin = self._plugins[name] = SKPlugin(name, functions)
+        return plugin
+
+    def warm_up(self, background: bool = False) -> threading.Thread | None:
+        """Load every function now, or on a daemon thread that is returned."""
+
+        def load_all():
+            for plugin in self.plugins():
+                for function in plugin.functions.values():
+                    try:
+                        function.load()
+                    except Exception:
+                        _LOGGER.exception(
+                            "Could not load %s", function.fully_qualified_name
+                        )
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(
+            target=load_all, name="sk-plugin-warm-up", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _lazy_function(self, manifest: FunctionManifest) -> LazyFunction:
+        return LazyFunction(
+            lambda: self._load(manifest),
+            name=manifest.name,
+            description=manifest.description,
+            input_variables=[_parameter(p) for p in manifest.input_variables],
+            output_variables=[_parameter(p) for p in manifest.output_variables],
+            pure=manifest.pure,
+        )
+
+    def _load(self, manifest: FunctionManifest) -> SKFunction:
+        _LOGGER.debug("Loading %s_%s", manifest.plugin, manifest.name)
+        path = os.path.join(self.root, manifest.path)
+        if manifest.kind == "prompt":
+            if self.bundle_path is None:
+                return SemanticFunction.from_path(path)
+            with self._lock:
+                if self._bundle is None:
+                    self._bundle = PromptBundle(self.bundle_path)
+            return self._bundle.function(path)
+        key = (manifest.path, manifest.class_name)
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                module = _import_module(path, manifest.path)
+                cls = getattr(module, manifest.class_name)
+                instance = self._factories.get(manifest.class_name, cls)()
+                self._instances[key] = instance
+        return NativeFunction(getattr(instance, manifest.attribute))
+
+    def _load_manifest(self) -> dict[str, dict]:
+        if self.manifest_path is None or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") != MANIFEST_VERSION or data.get("root") != self.root:
+                return {}
+            return {
+                relative: {
+                    **entry,
+                    "functions": [
+                        FunctionManifest(
+                            **{
+                                **manifest,
+                                "input_variables": tuple(manifest["input_variables"]),
+                                "output_variables": tuple(manifest["output_variables"]),
+                            }
+                        )
+                        for manifest in entry["functions"]
+                    ],
+                }
+                for relative, entry in data["files"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            _LOGGER.warning(
+                "Could not load the plugin manifest %s: %s", self.manifest_path, exc
+            )
+            return {}
+
+    def _save_manifest(self):
+        if self.manifest_path is None:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "root": self.root,
+            "files": {
+                relative: {
+                    **entry,
+                    "functions": [
+                        dataclasses.asdict(manifest) for manifest in entry["functions"]
+                    ],
+                }
+                for relative, entry in self._files.items()
+            },
+        }
+        temporary = f"{self.manifest_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.manifest_path)
@@ -0,0 +1,207 @@
+"""Prompts parsed and compiled ahead of time, for a fast cold start.
+
+A bundle file holds, per prompt file content hash, the parsed YAML of the
+prompt and the compiled code of its template. Loading a function from a bundle
+reads the prompt file only to hash it: the YAML is not parsed and the template
+is not compiled again. Prompts whose content changed, or that are not in the
+bundle yet, are compiled from source and written back to the bundle.
+
+Bundles are marshal files, so they are only used by the Python version and
+template compiler that wrote them; anything else starts an empty bundle.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import marshal
+import mmap
+import os
+import threading
+from functools import cache
+
+import yaml
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from ..template_engine import (
+    CompiledTemplate,
+    get_template_cache,
+    handlebars_analysis,
+    handlebars_compiler,
+    handlebars_parser,
+    handlebars_runtime,
+)
+from ..template_engine.handlebars_analysis import TemplateAnalysis
+from .semantic_function import SemanticFunction
+
+_LOGGER = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+PROMPT_SUFFIX = ".prompt.yaml"
+
+
+@cache
+def compiler_fingerprint() -> str:
+    """Hash of the template compiler; bundled code is only valid for the same one."""
+    digest = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+    for module in (
+        handlebars_parser,
+        handlebars_analysis,
+        handlebars_compiler,
+        handlebars_runtime,
+    ):
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def _compile_entry(content: bytes) -> dict:
+    data = yaml.load(content, Loader=yaml.FullLoader)
+    entry = {"data": data, "template": None}
+    if data["template_format"].lower() == "handlebars":
+        compiled = get_template_cache().get_or_compile(data["template"].strip())
+        analysis = compiled.analysis
+        entry["template"] = (
+            compiled.source,
+            compiled.code,
+            analysis.helper_calls,
+            analysis.names,
+            analysis.variables,
+        )
+    return entry
+
+
+def _function_from_entry(entry: dict) -> SemanticFunction:
+    data = entry["data"]
+    if entry["template"] is not None:
+        template = data["template"].strip()
+        cache = get_template_cache()
+        if template not in cache:
+            source, code, helper_calls, names, variables = entry["template"]
+            cache.put(
+                template,
+                CompiledTemplate(
+                    None,
+                    source,
+                    code,
+                    TemplateAnalysis(helper_calls, names, variables),
+                ),
+            )
+    return SemanticFunction.from_dict(data)
+
+
+class PromptBundle(SKBaseModel):
+    """Compiled prompts by content hash, kept in a marshal file at path."""
+
+    path: str
+    hits: int = 0
+    misses: int = 0
+    _entries: dict[str, dict] = PrivateAttr(default_factory=dict)
+    _dirty: bool = PrivateAttr(default=False)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, path: str):
+        super().__init__(path=path)
+        self._entries = self._read()
+
+    def function(self, prompt_path: str, save: bool = True) -> SemanticFunction:
+        """Return the function of a prompt file, compiling it if it changed.
+
+        A newly compiled prompt is written to the bundle file unless save is False.
+        """
+        with open(prompt_path, "rb") as file:
+            content = file.read()
+        key = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return _function_from_entry(entry)
+        self.misses += 1
+        _LOGGER.debug("Compiling %s into the prompt bundle", prompt_path)
+        entry = _compile_entry(content)
+        try:
+            marshal.dumps(entry)
+        except ValueError as exc:
+            _LOGGER.warning("Cannot bundle %s: %s", prompt_path, exc)
+            return _function_from_entry(entry)
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty = True
+        if save:
+            self.save()
+        return _function_from_entry(entry)
+
+    def keys(self) -> frozenset[str]:
+        with self._lock:
+            return frozenset(self._entries)
+
+    def prune(self, keep: set[str]):
+        """Drop the entries of prompts that are not in keep, by content hash."""
+        with self._lock:
+            for key in list(self._entries):
+                if key not in keep:
+                    del self._entries[key]
+                    self._dirty = True
+
+    def save(self):
+        """Write the bundle file if entries were added or removed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = marshal.dumps(
+                {
+                    "format": BUNDLE_FORMAT,
+                    "compiler": compiler_fingerprint(),
+                    "entries": self._entries,
+                }
+            )
+            self._dirty = False
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _read(self) -> dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as view:
+                data = marshal.loads(view)
+        except (OSError, ValueError, EOFError, TypeError) as exc:
+            _LOGGER.warning("Could not read the prompt bundle %s: %s", self.path, exc)
+            return {}
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != BUNDLE_FORMAT
+            or data.get("compiler") != compiler_fingerprint()
+        ):
+            _LOGGER.info("Prompt bundle %s is outdated, recompiling", self.path)
+            return {}
+        return data["entries"]
+
+
+def build_prompt_bundle(root: str, path: str) -> PromptBundle:
+    """Compile the prompts under root into the bundle at path.
+
+    Prompts already in the bundle are kept, the others compiled, and entries of
+    prompts that are no longer there are removed.
+    """
+    bundle = PromptBundle(path)
+    keep = set()
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if not name.endswith(PROMPT_SUFFIX):
+                continue
+            prompt_path = os.path.join(directory, name)
+            bundle.function(prompt_path, save=False)
+            with open(prompt_path, "rb") as file:
+                keep.add(hashlib.sha256(file.read()).hexdigest())
+    bundle.prune(keep)
+    bundle.save()
+    return bundle
@@ -1,9 +1,13 @@
 import re
+from collections.abc import Awaitable, Mapping
+from types import MappingProxyType
 from typing import Any
 
 import yaml
+from pydantic import PrivateAttr
 from semantic_kernel.skill_definition.parameter_view import ParameterView as Parameter
 
+from python.src.models.chat.history_window import HistoryWindow, window_messages
 from python.src.template_engine.handlebars_prompt_template_handler import (
     HandleBarsPromptTemplateHandler,
 )
@@ -15,12 +19,21 @@ class SemanticFunction(SKFunction):
     template: HandleBarsPromptTemplateHandler | str
     template_format: str
     execution_settings: dict
+    # resolved from execution_settings on first use, which must not change after
+    _routes: dict[tuple[str, ...], tuple[tuple[int, Mapping], ...]] = PrivateAttr(
+        default_factory=dict
+    )
+    _settings_by_service: dict[str, Mapping | None] = PrivateAttr(default_factory=dict)
 
     @classmethod
     def from_path(cls, path: str) -> "SemanticFunction":
         with open(path) as file:
             yaml_data = yaml.load(file, Loader=yaml.FullLoader)
-        # parse the yaml
+        return cls.from_dict(yaml_data)
+
+    @classmethod
+    def from_dict(cls, yaml_data: dict) -> "SemanticFunction":
+        """Create the function from the parsed YAML of a prompt; it is not modified."""
         template = yaml_data["template"]
         if yaml_data["template_format"].lower() == "handlebars":
             template = HandleBarsPromptTemplateHandler(template.strip())
@@ -50,7 +63,11 @@ class SemanticFunction(SKFunction):
         for settings_dict in yaml_data["execution_settings"]:
             if "model_id_pattern" in settings_dict:
                 model_pattern = re.compile(settings_dict["model_id_pattern"])
-                del settings_dict["model_id_pattern"]
+                settings_dict = {
+                    key: value
+                    for key, value in settings_dict.items()
+                    if key != "model_id_pattern"
+                }
                 settings.update({model_pattern: settings_dict})
         return cls(
             name=yaml_data["name"],
@@ -65,29 +82,95 @@ class SemanticFunction(SKFunction):
     def _get_service_settings(
         self, service: Any, request_settings: dict[str, Any] | None = None
     ) -> dict:
-        for model_id in self.execution_settings.keys():
-            if model_id.match(service.name):
-                settings = {
-                    "request_settings": self.execution_settings[model_id],
-                    "service": service,
-                }
-                if request_settings:
-                    settings["request_settings"].update(request_settings)
-                return settings
+        base = self._base_settings(service.name)
+        if base is None:
+            return None
+        return {
+            "request_settings": _merge_settings(base, request_settings),
+            "service": service,
+        }
 
     def _get_service_and_settings(
-        self, services: list, request_settings: dict[str, Any] | None = None
+        self,
+        services: list,
+        request_settings: dict[str, Any] | None = None,
+        load_balancer: Any = None,
+        session: Any = None,
     ) -> dict:
-        for svc in services:
-            for model_id in self.execution_settings.keys():
-                if model_id.match(svc.name):
-                    settings = {
-                        "request_settings": self.execution_settings[model_id],
-                        "service": svc,
-                    }
-                    if request_settings:
-                        settings["request_settings"].update(request_settings)
-                    return settings
+        route = self._route(services)
+        if not route:
+            return None
+        if len(route) == 1:
+            (index, base), balancer = route[0], None
+        else:
+            if load_balancer is None:
+                # imported here, the connectors import the plugins
+                from python.src.connectors.ai.openai.load_balancer import (
+                    get_load_balancer,
+                )
+
+                load_balancer = get_load_balancer()
+            chosen = load_balancer.choose(
+                [services[index] for index, _ in route], session=session
+            )
+            index, base = next(entry for entry in route if services[entry[0]] is chosen)
+            balancer = load_balancer
+        return {
+            "request_settings": _merge_settings(base, request_settings),
+            "service": services[index],
+            "load_balancer": balancer,
+        }
+
+    def _route(self, services: list) -> tuple[tuple[int, Mapping[str, Any]], ...]:
+        """Return the positions and base settings of the services to use.
+
+        These are the first service matching a model_id_pattern and the services
+        after it getting the same settings, which are equivalent deployments to
+        balance between. Routes are cached per list of service names, so they
+        are only resolved again when the services change.
+        """
+        key = tuple(service.name for service in services)
+        try:
+            return self._routes[key]
+        except KeyError:
+            pass
+        route = ()
+        for index, service in enumerate(services):
+            base = self._base_settings(service.name)
+            if base is not None and (not route or base == route[0][1]):
+                route += ((index, base),)
+        self._routes[key] = route
+        return route
+
+    def _base_settings(self, service_name: str) -> Mapping[str, Any] | None:
+        """The settings of the first model_id_pattern matching a service, read-only."""
+        try:
+            return self._settings_by_service[service_name]
+        except KeyError:
+            pass
+        base = None
+        for model_id, settings in self.execution_settings.items():
+            if model_id.match(service_name):
+                base = MappingProxyType(dict(settings))
+                break
+        self._settings_by_service[service_name] = base
+        return base
+
+    def _window_history(self, variables: dict, history_window: dict) -> dict:
+        # history_window: {max_tokens: 2000, policy: keep_system, variable: messages}
+        options = dict(history_window)
+        name = options.pop("variable", "messages")
+        if not variables or not variables.get(name):
+            return variables
+        max_tokens = options.pop("max_tokens")
+        policy = options.pop("policy", "last_tokens")
+        history = variables[name]
+        return {
+            **variables,
+            name: HistoryWindow(
+                window_messages(history, max_tokens, policy, **options), history
+            ),
+        }
 
     async def run_async(
         self,
@@ -99,23 +182,47 @@ class SemanticFunction(SKFunction):
     ) -> dict:
         if "service" not in kwargs:
             service_settings = self._get_service_and_settings(
-                services, request_settings
+                services,
+                request_settings,
+                load_balancer=kwargs.get("load_balancer"),
+                session=kwargs.get("session_id"),
             )
             kwargs["service"] = service_settings["service"]
         else:
             service_settings = self._get_service_settings(
                 kwargs["service"], request_settings
             )
-        rendered = await self.template.render(variables, **kwargs)
-        result = await service_settings["service"].complete_chat_async(
-            rendered,
-            request_settings=service_settings["request_settings"],
-            output_variables=self.output_variables,
-            **kwargs.get("service_kwargs", {}),
-        )
+        history_window = service_settings["request_settings"].get("history_window")
+        if history_window:
+            variables = self._window_history(variables, history_window)
+        rendered = await self.template.render_prompt(variables, **kwargs)
+        service = service_settings["service"]
+
+        def send() -> Awaitable[dict]:
+            return service.complete_chat_async(
+                rendered,
+                request_settings=service_settings["request_settings"],
+                output_variables=self.output_variables,
+                **kwargs.get("service_kwargs", {}),
+            )
+
+        balancer = service_settings.get("load_balancer")
+        if balancer is None:
+            result = await send()
+        else:
+            result = await balancer.call(service, send)
         if kwargs.get("called_by_template", False):
             return result[self.output_variable_name]
         return result
 
 
+def _merge_settings(
+    base: Mapping[str, Any], request_settings: dict[str, Any] | None
+) -> Mapping[str, Any]:
+    # a new dict per request; the base settings are shared by all requests
+    if not request_settings:
+        return base
+    return {**base, **request_settings}
+
+
 # '<message role="user">Can you help me write a Handlebars template that achieves the following goal?</message>\n<message role="user">Solve the following math problem: The problem is to find the sum of 23847 and 347.</message>\n<message role="system">## Instructions\nCreate a Handlebars template that describes the steps necessary to accomplish the user\'s goal in a numbered list.\n</message>\n<message role="system">## Tips and tricks\n- Use the `{{set name=\'var\' value=var}}` helper to save the results of a helper so that you can use it later in the template without wasting resources calling the same helper multiple times.\n- There are no initial variables available to you. You must create them yourself using the `{{set}}` helper.\n- Do not chain helpers since you have a tendency to create syntax errors when you do; use the `{{set}}`{{{{raw}}}} helper instead. For example, don\'t do this: {{{{raw}}}}`{{Helper_Function input=(array 1 2 3)}}` but instead create the variable and _then_ use it: `{{set name=\'var\' value=(array 1 2 3)}}{{Helper_Function input=var}}`\n- Use hash arguments when using custom helpers; this helps ensure the template renders correctly.\n- Be extremely careful about types. For example, if you pass an array to a helper that expects a number, the template will error out.\n- There is no need to check your results in the template.\n\n## Bonus\nIf you can correctly guess the output of the helpers before providing the template, you\'ll get extra credit.\nFor example, if you think that the output of the `{{random}}` helper is `42`, then provide a guess like this:\n</message>\n<message role="system">User: "Can you generate a random number?"\n\nAssistant: "1. Generate a random number (Guess: 42)"\n\n```\n{{set name="randomNumber" value=(random)}}\n1. Generate a random number: {{randomNumber}}.\n```</message>\n\n<message role="system">## Out of the box helpers\n- `{{#if}}{{/if}}`\n- `{{#unless}}{{/unless}}}`\n- `{{#each}}{{/each}}`\n- `{{#with}}{{/with}}`\n- `{{equal}}`\n- `{{lessThan}}`\n- `{{greaterThan}}`\n- `{{lessThanOrEqual}}`\n- `{{greaterThanOrEqual}}`\n\n## Custom helpers\nYou also have the following Handlebars helpers that you can use to accomplish the user\'s goal:\n\n### set\nDescription: Updates the Handlebars variable with the given name to the given value. It does not print anything to the screen.\nInputs:\n  - name: string - The name of the variable to set.\n  - value: any - The value to set the variable to.\nOutput: None - This helper does not print anything to the screen.\n\n### json\nDescription: Generates a JSON string from the given value.\nInputs:\n  - value: string - The value to generate JSON for.\nOutput: string - The JSON string.\n\n### _\nDescription: \nInputs:\nOutput: string - The result of the helper.### _\nDescription: \nInputs:\nOutput: string - The result of the helper.### _\nDescription: \nInputs:\nOutput: string - The result of the helper.### _\nDescription: \nInputs:\nOutput: string - The result of the helper.### _\nDescription: \nInputs:\nOutput: string - The result of the helper.### _\nDescription: \nInputs:\nOutput: string - The result of the helper.</message>\n\n<message role="system">Take a deep breath and accomplish the following:\n1. Describe the steps you\'ll take to accomplish the user\'s goal using as few words as possible\n2. Provide the user with an efficient Handlebars template that completes the steps; don\'t forget to use the tips and tricks otherwise the template will not work</message>\n\n<message role="assistant">I\'ll share the template with you in a bit! In the template, you\'ll see that I used the helpers you provided to render the results of each step.</message>\n\n<message role="assistant">But first, I\'ll succinctly explain the steps I took to achieve the user\'s goal before sharing the actual template in a wrapped ``` code block.\nI even provided guesses for each step to get extra credit!</message>\n'
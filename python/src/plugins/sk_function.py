@@ -10,6 +10,8 @@ class SKFunction(SKBaseModel):
     input_variables: list[Parameter]
     output_variables: list[Parameter]
     plugin_name: str = ""
+    # the result depends only on the inputs and running it has no side effects
+    pure: bool = False
 
     @abstractmethod
     async def run_async(self, variables, *args, **kwargs) -> dict:
@@ -1,10 +1,15 @@
 # Copyright (c) Microsoft. All rights reserved.
 
+from collections.abc import Callable
+
 
 def sk_function(
     *,
     description: str = "",
     name: str = "",
+    pure: bool = False,
+    batch: str | Callable | None = None,
+    executor: str = "inline",
 ):
     """
     Decorator for SK functions.
@@ -12,6 +17,12 @@ def sk_function(
     Args:
         description -- The description of the function
         name -- The name of the function
+        pure -- Whether the result depends only on the inputs, without side effects
+        batch -- A vectorized version of the function, or the name of the method that
+            is one; it takes each number input as a NumPy array of the values of many
+            calls and returns an array of their results
+        executor -- Where a synchronous function runs: "inline" on the event loop,
+            "thread" on a shared thread pool or "process" on a shared process pool
         input_description -- The description of the input
         input_default_value -- The default value of the input
     """
@@ -20,6 +31,9 @@ def sk_function(
         func.__sk_function__ = True
         func.__sk_function_description__ = description or ""
         func.__sk_function_name__ = name or func.__name__
+        func.__sk_function_pure__ = pure
+        func.__sk_function_batch__ = batch
+        func.__sk_function_executor__ = executor
         return func
 
     return decorator
@@ -1,14 +1,23 @@
-from typing import Any
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
 
+from pydantic import PrivateAttr
 from semantic_kernel.sk_pydantic import SKBaseModel
 
-from . import NativeFunction, SKFunction
+from .native_function import NativeFunction
+from .sk_function import SKFunction
+
+if TYPE_CHECKING:
+    from .function_registry import FunctionRegistry
 
 
 class SKPlugin(SKBaseModel):
     name: str
     description: str = ""
     functions: dict[str, SKFunction] = {}
+    _fqn_functions: dict[str, SKFunction] = PrivateAttr(default_factory=dict)
+    _registries: list["FunctionRegistry"] = PrivateAttr(default_factory=list)
 
     def __init__(self, name: str, functions: list["SKFunction"] | None = None):
         if functions:
@@ -16,38 +25,45 @@ class SKPlugin(SKBaseModel):
         else:
             functions_dict = {}
         super().__init__(name=name, functions=functions_dict)
-        for function in functions:
+        for function in self.functions.values():
             function.plugin_name = name
+            self._fqn_functions[function.fully_qualified_name] = function
 
     @classmethod
     def from_class(cls, name: str, class_object: Any) -> "SKPlugin":
-        functions = [
-            NativeFunction(getattr(class_object, function))
-            for function in dir(class_object)
-            if not function.startswith("__")
-            and hasattr(getattr(class_object, function), "__sk_function__")
-            and getattr(class_object, function).__sk_function__
-        ]
-        return cls(name, functions)
+        return cls(name, _native_functions_from_class(class_object))
 
     def add_function(self, function: SKFunction):
         function.plugin_name = self.name
         self.functions[function.name] = function
+        self._fqn_functions[function.fully_qualified_name] = function
+        for registry in self._registries:
+            registry.on_function_added(self, function)
 
     def add_function_from_class(self, class_object: Any):
-        functions = [
-            getattr(class_object, function)
-            for function in dir(class_object)
-            if not function.startswith("__")
-            and hasattr(function, "__sk_function__")
-            and function.__sk_function__
+        for function in _native_functions_from_class(class_object):
+            self.add_function(function)
+
+    def subscribe(self, registry: "FunctionRegistry"):
+        """Keep the registry up to date with functions added to this plugin."""
+        if not any(existing is registry for existing in self._registries):
+            self._registries.append(registry)
+
+    def unsubscribe(self, registry: "FunctionRegistry"):
+        self._registries = [
+            existing for existing in self._registries if existing is not registry
         ]
-        for function in functions:
-            function.plugin_name = self.name
-        self.functions.update(
-            {function.name: NativeFunction(function) for function in functions}
-        )
 
     @property
-    def fqn_functions(self) -> dict[str, Any]:
-        return {func.fully_qualified_name: func for func in self.functions.values()}
+    def fqn_functions(self) -> Mapping[str, SKFunction]:
+        return MappingProxyType(self._fqn_functions)
+
+
+def _native_functions_from_class(class_object: Any) -> list[NativeFunction]:
+    return [
+        NativeFunction(getattr(class_object, function))
+        for function in dir(class_object)
+        if not function.startswith("__")
+        and hasattr(getattr(class_object, function), "__sk_function__")
+        and getattr(class_object, function).__sk_function__
+    ]
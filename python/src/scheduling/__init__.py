@@ -0,0 +1,3 @@
+from .function_scheduler import FunctionScheduler
+
+__all__ = ["FunctionScheduler"]
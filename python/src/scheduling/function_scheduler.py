@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from ..plugins.sk_function import SKFunction
+
+_LOGGER = logging.getLogger(__name__)
+
+FunctionInvoker = Callable[[SKFunction, dict[str, Any] | None], Awaitable[Any]]
+
+
+class FunctionScheduler(SKBaseModel):
+    """Runs a list of functions concurrently where their variables allow it.
+
+    A function depends on an earlier function in the list when one of its input
+    variables is produced as an output variable by that earlier function. Functions
+    without pending dependencies run concurrently, capped by max_concurrency, and the
+    outputs of a dependency are passed on in the variables of its dependents.
+
+    Each function gets its own copy of the variables, so helpers like set cannot
+    race. The variables a function sets are seen by its dependents and, once all
+    functions ran, merged back into the variables in the order of the list.
+
+    The copy is shallow, so functions that take the same mutable variable, such
+    as a chat history, would share it; they run one after the other, in the order
+    of the list. Outputs passed on to several dependents are shared by them too,
+    so functions must not mutate their inputs.
+    """
+
+    max_concurrency: int | None = None
+
+    @staticmethod
+    def build_dependencies(functions: list[SKFunction]) -> list[dict[str, int]]:
+        """Return, per function, a map of input variable name to producing function index.
+
+        Only the last producer before a function is used, so the values a function
+        sees are the same as when the list is run in order.
+        """
+        producers: dict[str, int] = {}
+        dependencies = []
+        for idx, function in enumerate(functions):
+            dependencies.append(
+                {
+                    parameter.name: producers[parameter.name]
+                    for parameter in function.input_variables or []
+                    if parameter.name in producers
+                }
+            )
+            for parameter in function.output_variables or []:
+                producers[parameter.name] = idx
+        return dependencies
+
+    @staticmethod
+    def build_orderings(
+        functions: list[SKFunction], variables: dict[str, Any] | None
+    ) -> list[set[int]]:
+        """Return, per function, the earlier functions it has to run after.
+
+        A function runs after the last earlier function that takes the same
+        mutable variable from the given variables.
+        """
+        takers: dict[str, int] = {}
+        produced: set[str] = set()
+        orderings = []
+        for idx, function in enumerate(functions):
+            after = set()
+            for parameter in function.input_variables or []:
+                name = parameter.name
+                if name in produced or not _is_mutable((variables or {}).get(name)):
+                    continue
+                if name in takers:
+                    after.add(takers[name])
+                takers[name] = idx
+            orderings.append(after)
+            produced.update(
+                parameter.name for parameter in function.output_variables or []
+            )
+        return orderings
+
+    async def run(
+        self,
+        functions: list[SKFunction],
+        variables: dict[str, Any] | None,
+        invoke: FunctionInvoker,
+        max_concurrency: int | None = None,
+    ) -> list[Any]:
+        """Run the functions with invoke and return their results in the original order."""
+        if len(functions) == 1:
+            return [await invoke(functions[0], variables)]
+
+        limit = max_concurrency or self.max_concurrency
+        semaphore = asyncio.Semaphore(limit) if limit else None
+        dependencies = self.build_dependencies(functions)
+        orderings = self.build_orderings(functions, variables)
+        tasks: list[asyncio.Task] = []
+        changes: list[dict[str, Any]] = [{} for _ in functions]
+
+        async def run_function(idx: int) -> Any:
+            function_variables = None
+            waits_for = set(dependencies[idx].values()) | orderings[idx]
+            if waits_for:
+                await asyncio.gather(*(tasks[dep] for dep in waits_for))
+            if variables is not None or dependencies[idx]:
+                function_variables = dict(variables or {})
+                for dep in sorted(waits_for):
+                    function_variables.update(changes[dep])
+                for name, dep in dependencies[idx].items():
+                    function_variables[name] = _get_output(tasks[dep].result(), name)
+            before = dict(function_variables or {})
+            if semaphore is None:
+                result = await invoke(functions[idx], function_variables)
+            else:
+                async with semaphore:
+                    result = await invoke(functions[idx], function_variables)
+            changes[idx] = {
+                name: value
+                for name, value in (function_variables or {}).items()
+                if name not in before or before[name] is not value
+            }
+            return result
+
+        for idx in range(len(functions)):
+            tasks.append(asyncio.ensure_future(run_function(idx)))
+        _LOGGER.debug(
+            "Scheduled %d functions with %d dependency and %d ordering edges",
+            len(functions),
+            sum(len(deps) for deps in dependencies),
+            sum(len(after) for after in orderings),
+        )
+        try:
+            results = list(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if variables is not None:
+            for function_changes in changes:
+                variables.update(function_changes)
+        return results
+
+
+# values functions cannot change in place
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, tuple, frozenset)
+
+
+def _is_mutable(value: Any) -> bool:
+    return value is not None and not isinstance(value, _IMMUTABLE_TYPES)
+
+
+def _get_output(result: Any, name: str) -> Any:
+    if isinstance(result, dict):
+        return result.get(name)
+    # native functions may return the bare value of their single output
+    return result
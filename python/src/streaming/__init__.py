@@ -0,0 +1,3 @@
+from .stream_events import StreamChunk, StreamEvent, StreamResult, chunks_from_response
+
+__all__ = ["StreamChunk", "StreamEvent", "StreamResult", "chunks_from_response"]
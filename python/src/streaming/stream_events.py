@@ -0,0 +1,40 @@
+from collections.abc import Iterator
+from typing import Any
+
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+
+class StreamChunk(SKBaseModel):
+    """A piece of a streamed completion, as it arrives from the service."""
+
+    function_name: str
+    index: int = 0
+    role: str | None = None
+    content: str = ""
+    sequence: int = 0
+
+
+class StreamResult(SKBaseModel):
+    """The last event of a stream: the results run_async would have returned."""
+
+    result: Any = None
+
+
+StreamEvent = StreamChunk | StreamResult
+
+
+def chunks_from_response(
+    function_name: str, response: Any, sequence: int = 0
+) -> Iterator[StreamChunk]:
+    """Yield a chunk per choice delta of a streamed chat completion response."""
+    for choice in response.get("choices", ()):
+        delta = choice.get("delta")
+        if not delta:
+            continue
+        yield StreamChunk(
+            function_name=function_name,
+            index=choice.get("index", 0),
+            role=delta.get("role"),
+            content=delta.get("content") or "",
+            sequence=sequence,
+        )
@@ -1,3 +1,15 @@
+from .handlebars_compiler import CompiledTemplate, compile_template
 from .handlebars_prompt_template_handler import HandleBarsPromptTemplateHandler
+from .handlebars_runtime import HandleBarsTemplateError
+from .rendered_prompt import RenderedPrompt
+from .template_cache import TemplateCache, get_template_cache
 
-__all__ = ["HandleBarsPromptTemplateHandler"]
+__all__ = [
+    "CompiledTemplate",
+    "HandleBarsPromptTemplateHandler",
+    "HandleBarsTemplateError",
+    "RenderedPrompt",
+    "TemplateCache",
+    "compile_template",
+    "get_template_cache",
+]
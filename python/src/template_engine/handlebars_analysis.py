@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+
+from .handlebars_parser import (
+    Block,
+    Expression,
+    Literal,
+    Mustache,
+    Node,
+    PathExpression,
+    RawBlock,
+    SubExpression,
+    Template,
+    Text,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class TemplateAnalysis:
+    """Names a template refers to, collected once when it is compiled.
+
+    helper_calls are names that can only be helpers: sub-expressions and mustaches
+    with arguments. names holds every simple name the compiled template may look up
+    in its helpers, including block names and argument-less mustaches that are
+    either a helper or a variable. variables holds the root names of value paths.
+    """
+
+    helper_calls: frozenset[str]
+    names: frozenset[str]
+    variables: frozenset[str]
+
+
+def analyze(tree: Template) -> TemplateAnalysis:
+    collector = _Collector()
+    collector.nodes(tree.body)
+    return TemplateAnalysis(
+        helper_calls=frozenset(collector.helper_calls),
+        names=frozenset(collector.names),
+        variables=frozenset(collector.variables),
+    )
+
+
+class _Collector:
+    def __init__(self):
+        self.helper_calls: set[str] = set()
+        self.names: set[str] = set()
+        self.variables: set[str] = set()
+
+    def nodes(self, nodes: tuple[Node, ...]):
+        for node in nodes:
+            if isinstance(node, Mustache):
+                self.mustache(node)
+            elif isinstance(node, Block):
+                self.names.add(node.name)
+                self.arguments(node.params, node.hash)
+                self.nodes(node.program)
+                self.nodes(node.inverse or ())
+            elif isinstance(node, RawBlock):
+                self.names.add(node.name)
+                self.arguments(node.params, node.hash)
+
+    def mustache(self, node: Mustache):
+        path = node.path
+        if not path.is_simple:
+            self.path(path)
+        elif node.params or node.hash:
+            self.helper_calls.add(path.name)
+            self.names.add(path.name)
+        elif path.name:
+            self.names.add(path.name)
+            self.path(path)
+        self.arguments(node.params, node.hash)
+
+    def arguments(self, params: tuple, hash: tuple):
+        for param in params:
+            self.expression(param)
+        for _, value in hash:
+            self.expression(value)
+
+    def expression(self, expression: Expression):
+        if isinstance(expression, SubExpression):
+            name = ".".join(expression.path.segments)
+            self.helper_calls.add(name)
+            self.names.add(name)
+            self.arguments(expression.params, expression.hash)
+        elif isinstance(expression, PathExpression):
+            self.path(expression)
+
+    def path(self, path: PathExpression):
+        root = path.lookup_segments[0]
+        if root and not root.startswith("@"):
+            self.variables.add(root)
+
+
+def referenced_names(nodes: tuple[Node, ...]) -> frozenset[str]:
+    """Names the given nodes may look up in the helpers."""
+    collector = _Collector()
+    collector.nodes(nodes)
+    return frozenset(collector.names)
+
+
+def is_item_local(nodes: tuple[Node, ...]) -> bool:
+    """Whether the nodes only look at the current context.
+
+    Paths into parent or root contexts and @data such as @index make the output
+    depend on more than the item an each block is rendering.
+    """
+    return all(_node_is_local(node) for node in nodes)
+
+
+def is_constant(node: Block) -> bool:
+    """Whether a block has only literal arguments and text in its blocks."""
+    arguments = [*node.params, *(value for _, value in node.hash)]
+    return all(isinstance(argument, Literal) for argument in arguments) and all(
+        isinstance(child, Text) for child in (*node.program, *(node.inverse or ()))
+    )
+
+
+def _node_is_local(node: Node) -> bool:
+    if isinstance(node, Text):
+        return True
+    if isinstance(node, Mustache):
+        return _path_is_local(node.path) and _arguments_are_local(
+            node.params, node.hash
+        )
+    if isinstance(node, Block):
+        return (
+            _arguments_are_local(node.params, node.hash)
+            and is_item_local(node.program)
+            and is_item_local(node.inverse or ())
+        )
+    return _arguments_are_local(node.params, node.hash)
+
+
+def _arguments_are_local(params: tuple, hash: tuple) -> bool:
+    return all(_expression_is_local(param) for param in params) and all(
+        _expression_is_local(value) for _, value in hash
+    )
+
+
+def _expression_is_local(expression: Expression) -> bool:
+    if isinstance(expression, SubExpression):
+        return _arguments_are_local(expression.params, expression.hash)
+    if isinstance(expression, PathExpression):
+        return _path_is_local(expression)
+    return True
+
+
+def _path_is_local(path: PathExpression) -> bool:
+    return not any(segment.startswith("@") for segment in path.segments)
@@ -0,0 +1,304 @@
+"""Compiles Handlebars templates into async Python functions.
+
+Every helper call in the compiled code is awaited on the caller's event loop when
+the helper returns an awaitable, so plugin functions can be used as helpers
+without threads or nested event loops.
+
+Output that cannot change between renders is kept by the compiled template:
+blocks with only literal arguments and text are rendered once per pure block
+helper, and each blocks over immutable items whose body only uses the item and
+pure helpers reuse the output of items rendered before.
+"""
+
+from collections.abc import Callable, Mapping
+from functools import partial
+from inspect import isawaitable
+from keyword import iskeyword
+from typing import Any
+
+from . import handlebars_runtime as runtime
+from .handlebars_analysis import (
+    TemplateAnalysis,
+    analyze,
+    is_constant,
+    is_item_local,
+    referenced_names,
+)
+from .handlebars_parser import (
+    Block,
+    Expression,
+    Literal,
+    Mustache,
+    Node,
+    PathExpression,
+    RawBlock,
+    SubExpression,
+    Template,
+    Text,
+    parse,
+)
+
+_RUNTIME_GLOBALS = {
+    "StrList": runtime.StrList,
+    "Scope": runtime.Scope,
+    "ensure_scope": runtime.ensure_scope,
+    "resolve": runtime.resolve,
+    "resolve_subexpr": runtime.resolve_subexpr,
+    "prepare": runtime.prepare,
+    "missing_value_error": runtime.missing_value_error,
+    "no_block": runtime.no_block,
+    "raw_content": runtime.raw_content,
+    "isawaitable": isawaitable,
+    "partial": partial,
+    "is_pure": runtime.is_pure,
+    "helpers_are_pure": runtime.helpers_are_pure,
+    "each_memoized": runtime.each_memoized,
+    "default_each": runtime.DEFAULT_HELPERS["each"],
+}
+
+_FALLBACK_HELPERS = ("helperMissing", "blockHelperMissing")
+
+
+class CompiledTemplate:
+    """A template compiled to an async render function.
+
+    Templates restored from compiled code, like those of a prompt bundle, come
+    with their analysis and have no parse tree.
+    """
+
+    def __init__(
+        self,
+        template: Template | None,
+        source: str,
+        code: Any,
+        analysis: TemplateAnalysis | None = None,
+    ):
+        self.template = template
+        self.source = source
+        self.code = code
+        self.analysis: TemplateAnalysis = analysis or analyze(template)
+        namespace = dict(_RUNTIME_GLOBALS)
+        exec(code, namespace)
+        self._render: Callable = namespace["render"]
+
+    def bind_helpers(self, *tables: Mapping[str, Callable]) -> dict[str, Callable]:
+        """Select the helpers this template refers to from the given tables.
+
+        Later tables take precedence. The fallback helpers used by the compiled
+        code are always included.
+        """
+        helpers = {name: runtime.DEFAULT_HELPERS[name] for name in _FALLBACK_HELPERS}
+        for table in tables:
+            for name in self.analysis.names:
+                helper = table.get(name)
+                if helper is not None:
+                    helpers[name] = helper
+        return helpers
+
+    async def __call__(self, context: Any, helpers: dict | None = None) -> str:
+        """Render the template; helpers must include those chosen by bind_helpers."""
+        return str(await self.render_parts(context, helpers))
+
+    async def render_parts(
+        self, context: Any, helpers: dict | None = None
+    ) -> runtime.StrList:
+        """Render the template to its output parts, keeping the output parts helpers return."""
+        if helpers is None:
+            helpers = self.bind_helpers(runtime.DEFAULT_HELPERS)
+        return await self._render(context, helpers)
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """Parse and compile a template."""
+    tree = parse(template)
+    source = generate_source(tree)
+    code = compile(source, "<handlebars template>", "exec", dont_inherit=True)
+    return CompiledTemplate(tree, source, code)
+
+
+def generate_source(tree: Template) -> str:
+    """Generate the Python source of the async render function for a template."""
+    return _CodeBuilder().build(tree)
+
+
+class _CodeBuilder:
+    def __init__(self):
+        self.functions: list[list[str]] = []
+        self.counter = 0
+        self.memos = 0
+        self.constants = 0
+
+    def build(self, tree: Template) -> str:
+        body = self._function_body(tree.body)
+        lines = [
+            f"memos = [{{}} for _ in range({self.memos})]",
+            f"constants = [{{}} for _ in range({self.constants})]",
+            "async def render(context, helpers, root=None):",
+            "    if root is None:",
+            "        root = context",
+        ]
+        for function in self.functions:
+            lines.extend("    " + line for line in function)
+        lines.extend(body)
+        lines.append("    return result")
+        return "\n".join(lines) + "\n"
+
+    def _block_function(self, nodes: tuple[Node, ...]) -> str:
+        self.counter += 1
+        name = f"block_{self.counter}"
+        if all(isinstance(node, Text) for node in nodes):
+            text = "".join(node.value for node in nodes)
+            self.functions.append(
+                [f"async def {name}(context):", f"    return {text!r}"]
+            )
+            return name
+        body = self._function_body(nodes)
+        self.functions.append(
+            [f"async def {name}(context):", *body, "    return result"]
+        )
+        return name
+
+    def _function_body(self, nodes: tuple[Node, ...]) -> list[str]:
+        lines = [
+            "    problems = []",
+            "    result = StrList()",
+            "    context = ensure_scope(context, root)",
+        ]
+        for node in nodes:
+            if isinstance(node, Text):
+                lines.append(f"    result.append({node.value!r})")
+            elif isinstance(node, Mustache):
+                lines.extend(self._mustache(node))
+            elif isinstance(node, Block):
+                lines.extend(self._block(node))
+            elif isinstance(node, RawBlock):
+                lines.extend(self._raw_block(node))
+        return lines
+
+    def _mustache(self, node: Mustache) -> list[str]:
+        call = self._call_arguments(node.params, node.hash)
+        path = node.path
+        if path.is_simple:
+            name = path.name
+            return [
+                f"    value = helpers.get({name!r})",
+                "    if value is None:",
+                "        problems = []",
+                f"        value = resolve(context, problems, {name!r})",
+                "    if callable(value):",
+                f"        value = value(context{call})",
+                "        if isawaitable(value):",
+                "            value = await value",
+                "    elif value is None:",
+                f"        value = helpers['helperMissing'](context, {name!r}{call})",
+                "    if value is None and problems:",
+                "        raise missing_value_error(problems)",
+                "    result.grow(prepare(value))",
+            ]
+        return [
+            f"    value = {self._path(path)}",
+            "    if callable(value):",
+            f"        value = value(context{call})",
+            "        if isawaitable(value):",
+            "            value = await value",
+            "    if value is None and problems:",
+            "        raise missing_value_error(problems)",
+            "    result.grow(prepare(value))",
+        ]
+
+    def _block(self, node: Block) -> list[str]:
+        fn = self._block_function(node.program)
+        inverse = (
+            self._block_function(node.inverse)
+            if node.inverse is not None
+            else "no_block"
+        )
+        call = self._call_arguments(node.params, node.hash)
+        lines = [
+            f"    options = {{'fn': {fn}, 'inverse': {inverse}, "
+            "'helpers': helpers, 'root': root}",
+            f"    value = helper = helpers.get({node.name!r})",
+            "    if value is None:",
+            "        problems = []",
+            f"        value = resolve(context, problems, {node.name!r})",
+        ]
+        if (
+            node.name == "each"
+            and len(node.params) == 1
+            and not node.hash
+            and is_item_local(node.program)
+        ):
+            names = tuple(sorted(referenced_names(node.program) | {*_FALLBACK_HELPERS}))
+            lines += [
+                f"    if helper is default_each and helpers_are_pure(helpers, {names!r}):",
+                f"        value = each_memoized(memos[{self.memos}], context, options{call})",
+                "    elif helper and callable(helper):",
+            ]
+            self.memos += 1
+        else:
+            lines.append("    if helper and callable(helper):")
+        lines += [
+            f"        value = helper(context, options{call})",
+            "    else:",
+            "        value = helpers['blockHelperMissing'](context, options, value)",
+            "    if isawaitable(value):",
+            "        value = await value",
+        ]
+        if is_constant(node):
+            # rendered once per block helper; constant arguments and text only
+            lines = [
+                f"    constant = constants[{self.constants}]",
+                f"    helper = helpers.get({node.name!r})",
+                "    value = constant.get(helper) if is_pure(helper) else None",
+                "    if value is None:",
+                *("    " + line for line in lines),
+                "        if is_pure(helper):",
+                "            constant[helper] = value",
+            ]
+            self.constants += 1
+        lines.append("    result.grow(value or '')")
+        return lines
+
+    def _raw_block(self, node: RawBlock) -> list[str]:
+        call = self._call_arguments(node.params, node.hash)
+        return [
+            f"    options = {{'fn': partial(raw_content, {node.content!r}), "
+            "'inverse': no_block, 'helpers': helpers, 'root': root}",
+            f"    helper = helpers.get({node.name!r})",
+            "    if helper and callable(helper):",
+            f"        value = helper(context, options{call})",
+            "        if isawaitable(value):",
+            "            value = await value",
+            "    else:",
+            f"        value = {node.content!r}",
+            "    result.grow(value or '')",
+        ]
+
+    def _call_arguments(
+        self,
+        params: tuple[Expression, ...],
+        hash: tuple[tuple[str, Expression], ...],
+    ) -> str:
+        arguments = [self._expression(param) for param in params]
+        arguments.extend(
+            (
+                f"**{{{key!r}: {self._expression(value)}}}"
+                if iskeyword(key)
+                else f"{key}={self._expression(value)}"
+            )
+            for key, value in hash
+        )
+        return "".join(", " + argument for argument in arguments)
+
+    def _expression(self, expression: Expression) -> str:
+        if isinstance(expression, Literal):
+            return repr(expression.value)
+        if isinstance(expression, SubExpression):
+            call = self._call_arguments(expression.params, expression.hash)
+            name = ".".join(expression.path.segments)
+            return f"(await resolve_subexpr(helpers, {name!r}, context{call}))"
+        return self._path(expression)
+
+    def _path(self, path: PathExpression) -> str:
+        segments = ", ".join(repr(segment) for segment in path.lookup_segments)
+        return f"resolve(context, problems, {segments})"
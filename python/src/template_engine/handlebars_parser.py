@@ -0,0 +1,339 @@
+"""Parser for the Handlebars dialect used by SK prompt templates and plans.
+
+The grammar follows pybars: mustaches, blocks with an optional else, raw blocks,
+comments, sub-expressions, hash arguments and ~ whitespace control.
+"""
+
+import ast
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from .handlebars_runtime import HandleBarsTemplateError
+
+
+class HandleBarsSyntaxError(HandleBarsTemplateError):
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"{message} at character {column} of line {line}")
+        self.line = line
+        self.column = column
+
+
+@dataclass(frozen=True, slots=True)
+class PathExpression:
+    segments: tuple[str, ...]
+
+    @property
+    def is_simple(self) -> bool:
+        return len(self.segments) == 1
+
+    @property
+    def lookup_segments(self) -> tuple[str, ...]:
+        return tuple("" if segment == "this" else segment for segment in self.segments)
+
+    @property
+    def name(self) -> str:
+        """The helper name this path refers to when used as a call."""
+        if self.is_simple:
+            return self.lookup_segments[0]
+        return ".".join(self.segments)
+
+
+@dataclass(frozen=True, slots=True)
+class Literal:
+    value: Any
+
+
+@dataclass(frozen=True, slots=True)
+class SubExpression:
+    path: PathExpression
+    params: tuple["Expression", ...]
+    hash: tuple[tuple[str, "Expression"], ...]
+    line: int
+
+
+Expression = PathExpression | Literal | SubExpression
+
+
+@dataclass(frozen=True, slots=True)
+class Text:
+    value: str
+
+
+@dataclass(frozen=True, slots=True)
+class Mustache:
+    path: PathExpression
+    params: tuple[Expression, ...]
+    hash: tuple[tuple[str, Expression], ...]
+    escaped: bool
+    line: int
+
+
+@dataclass(frozen=True, slots=True)
+class Block:
+    name: str
+    params: tuple[Expression, ...]
+    hash: tuple[tuple[str, Expression], ...]
+    program: tuple["Node", ...]
+    inverse: tuple["Node", ...] | None
+    inverted: bool
+    line: int
+
+
+@dataclass(frozen=True, slots=True)
+class RawBlock:
+    name: str
+    params: tuple[Expression, ...]
+    hash: tuple[tuple[str, Expression], ...]
+    content: str
+    line: int
+
+
+Node = Text | Mustache | Block | RawBlock
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    body: tuple[Node, ...]
+
+
+_CLEANUP_SUB = re.compile(r"(?<={{)~|~(?=}})|(?<=}})[ \t]+(?={{)").sub
+_WHITESPACE_CONTROL = re.compile(
+    # whitespace control using the ~ mark
+    r"~}}\s*|\s*{{~|"
+    # whitespace around block tags that are alone on a line
+    r"(?<=\n)([ \t]*{{(#[^{}]+|/[^{}]+|![^{}]+|else|else if [^{}]+)}}[ \t]*)+\r?\n|"
+    # whitespace around block tags alone on the first line
+    r"^([ \t]*{{(#[^{}]+|![^{}]+)}}[ \t]*)+\r?\n|"
+    # whitespace around block tags alone on the last line
+    r"\r?\n([ \t]*{{(/[^{}]+|![^{}]+)}}[ \t]*)+$"
+)
+
+_ALT = re.compile(r"{{\s*(\^|else)\s*}}")
+_SPACES = re.compile(r"\s*")
+_SYMBOL = re.compile(r"\[?([\w@-]+)\]?")
+_PATH_SEGMENT = re.compile(r"\[([^\]]+)\]|(@\.\./)|\[?([\w@-]+)\]?|(/)|(\.\./)|(\.)")
+_HASH_KEY = re.compile(r"\[?([A-Za-z_]\w*)\]?=")
+_LITERAL = re.compile(
+    r"(\"(?:\\\"|[^\"])*\"|'(?:\\'|[^'])*'|-?\d+\.\d+|-?\d+|false|true|null|undefined)"
+    r"(?=[\s)}]|$)"
+)
+_KEYWORD_LITERALS = {"false": False, "true": True, "null": None, "undefined": None}
+
+
+def whitespace_control(source: str) -> str:
+    """Strip the whitespace removed by ~ marks and around standalone block tags."""
+    return _WHITESPACE_CONTROL.sub(
+        lambda match: _CLEANUP_SUB("", match.group(0).strip()), source
+    )
+
+
+def parse(source: str) -> Template:
+    """Parse a template into its syntax tree."""
+    return _Parser(whitespace_control(source)).parse()
+
+
+class _Parser:
+    def __init__(self, source: str):
+        self.source = source
+        self.pos = 0
+
+    def parse(self) -> Template:
+        body = self._program()
+        if self.pos < len(self.source):
+            self._fail("Unexpected tag")
+        return Template(body=body)
+
+    def _program(self) -> tuple[Node, ...]:
+        nodes: list[Node] = []
+        source = self.source
+        while self.pos < len(source):
+            start = source.find("{{", self.pos)
+            if start == -1:
+                nodes.append(Text(source[self.pos :]))
+                self.pos = len(source)
+                break
+            if start > self.pos:
+                nodes.append(Text(source[self.pos : start]))
+                self.pos = start
+            if source.startswith("{{/", start) or _ALT.match(source, start):
+                break
+            node = self._command()
+            if node is not None:
+                nodes.append(node)
+        return tuple(nodes)
+
+    def _command(self) -> Node | None:
+        source = self.source
+        pos = self.pos
+        line = self._line(pos)
+        if source.startswith("{{{{", pos):
+            return self._raw_block(line)
+        if source.startswith("{{!", pos):
+            end = source.find("}}", pos + 3)
+            if end == -1:
+                self._fail("Unclosed comment")
+            self.pos = end + 2
+            return None
+        if source.startswith("{{#", pos) or source.startswith("{{^", pos):
+            return self._block(line)
+        if source.startswith("{{{", pos):
+            self.pos = pos + 3
+            path, params, hash = self._expression_inner()
+            self._expect("}")
+            return Mustache(path, params, hash, escaped=False, line=line)
+        if source.startswith("{{&", pos):
+            self.pos = pos + 3
+            path, params, hash = self._expression_inner()
+            return Mustache(path, params, hash, escaped=False, line=line)
+        if source.startswith("{{>", pos):
+            self._fail("Partials are not supported")
+        self.pos = pos + 2
+        path, params, hash = self._expression_inner()
+        return Mustache(path, params, hash, escaped=True, line=line)
+
+    def _block(self, line: int) -> Block:
+        inverted = self.source[self.pos + 2] == "^"
+        self.pos += 3
+        name, params, hash = self._block_inner()
+        program = self._program()
+        inverse = None
+        alt = _ALT.match(self.source, self.pos)
+        if alt:
+            self.pos = alt.end()
+            inverse = self._program()
+        if not self.source.startswith("{{/", self.pos):
+            self._fail(f"Unclosed block {name!r}")
+        self.pos += 3
+        closing = self._match(_SYMBOL, group=1)
+        if closing != name or not self.source.startswith("}}", self.pos):
+            self._fail(f"Block {name!r} closed by {closing!r}")
+        self.pos += 2
+        if inverted:
+            return Block(name, params, hash, inverse or (), program, True, line)
+        return Block(name, params, hash, program, inverse, False, line)
+
+    def _raw_block(self, line: int) -> RawBlock:
+        self.pos += 4
+        name, params, hash = self._block_inner()
+        self._expect("}}")
+        closing = "{{{{/" + name + "}}}}"
+        end = self.source.find(closing, self.pos)
+        if end == -1:
+            self._fail(f"Unclosed raw block {name!r}")
+        content = self.source[self.pos : end]
+        self.pos = end + len(closing)
+        return RawBlock(name, params, hash, content, line)
+
+    def _block_inner(self):
+        self._match(_SPACES)
+        name = self._match(_SYMBOL, group=1)
+        if not name:
+            self._fail("Expected a block name")
+        params, hash = self._arguments()
+        self._match(_SPACES)
+        self._expect("}}")
+        return name, params, hash
+
+    def _expression_inner(self):
+        self._match(_SPACES)
+        path = self._path()
+        if path is None:
+            self._fail("Expected a path")
+        params, hash = self._arguments()
+        self._match(_SPACES)
+        self._expect("}}")
+        return path, params, hash
+
+    def _arguments(self):
+        params: list[Expression] = []
+        hash: list[tuple[str, Expression]] = []
+        while True:
+            start = self.pos
+            if not self._match(_SPACES) or self.pos >= len(self.source):
+                self.pos = start
+                break
+            key = self._match(_HASH_KEY, group=1)
+            argument = self._argument()
+            if argument is None:
+                self.pos = start
+                break
+            if key:
+                hash.append((key, argument))
+            else:
+                params.append(argument)
+        return tuple(params), tuple(hash)
+
+    def _argument(self) -> Expression | None:
+        literal = _LITERAL.match(self.source, self.pos)
+        if literal:
+            self.pos = literal.end()
+            return Literal(self._literal(literal.group(1)))
+        if self.source.startswith("(", self.pos):
+            return self._subexpression()
+        return self._path()
+
+    def _subexpression(self) -> SubExpression:
+        line = self._line(self.pos)
+        self.pos += 1
+        self._match(_SPACES)
+        path = self._path()
+        if path is None:
+            self._fail("Expected a helper name")
+        params, hash = self._arguments()
+        self._match(_SPACES)
+        self._expect(")")
+        return SubExpression(path, params, hash, line)
+
+    def _path(self) -> PathExpression | None:
+        if self.source.startswith("/", self.pos):
+            return None
+        segments = []
+        while True:
+            match = _PATH_SEGMENT.match(self.source, self.pos)
+            if not match or match.end() == self.pos:
+                break
+            self.pos = match.end()
+            bracketed, parent_data, symbol, _slash, parent, _dot = match.groups()
+            if bracketed is not None:
+                segments.append(bracketed)
+            elif parent_data:
+                segments.append("@@_parent")
+            elif symbol:
+                segments.append(symbol)
+            elif parent:
+                segments.append("@_parent")
+            else:
+                segments.append("")
+        if not segments:
+            return None
+        return PathExpression(tuple(segments))
+
+    def _literal(self, token: str) -> Any:
+        if token in _KEYWORD_LITERALS:
+            return _KEYWORD_LITERALS[token]
+        try:
+            return ast.literal_eval(token)
+        except (ValueError, SyntaxError):
+            self._fail(f"Invalid literal {token}")
+
+    def _match(self, pattern: re.Pattern, group: int = 0) -> str:
+        match = pattern.match(self.source, self.pos)
+        if not match:
+            return ""
+        self.pos = match.end()
+        return match.group(group) or ""
+
+    def _expect(self, token: str):
+        if not self.source.startswith(token, self.pos):
+            self._fail(f"Expected {token!r}")
+        self.pos += len(token)
+
+    def _line(self, pos: int) -> int:
+        return self.source.count("\n", 0, pos) + 1
+
+    def _fail(self, message: str):
+        line_start = self.source.rfind("\n", 0, self.pos) + 1
+        raise HandleBarsSyntaxError(
+            message, self._line(self.pos), self.pos - line_start + 1
+        )
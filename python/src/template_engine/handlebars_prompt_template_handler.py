@@ -1,21 +1,29 @@
-import asyncio
 import json
-import threading
+from collections.abc import Container, Mapping
+from types import MappingProxyType
 from typing import Any
 
-import pybars
-from pybars import Compiler
 from pydantic import PrivateAttr
 from semantic_kernel.sk_pydantic import SKBaseModel
 
+from ..models.chat.history_window import unwindowed, window_messages
+from .handlebars_compiler import CompiledTemplate
+from .handlebars_runtime import DEFAULT_HELPERS, HandleBarsTemplateError, pure
+from .rendered_prompt import MessagePart, RenderedPrompt
+from .template_cache import get_template_cache
 
-def _message(this, options, **kwargs):
+
+@pure
+async def _message(this, options, **kwargs):
     # single message call, scope is messages object as context
     # in messages loop, scope is ChatMessage object as context
     if "role" in kwargs or "Role" in kwargs:
         role = kwargs.get("role" or "Role")
         if role:
-            return f'<message role="{kwargs.get("role") or kwargs.get("Role")}">{options["fn"](this)}</message>'
+            return MessagePart(
+                kwargs.get("role") or kwargs.get("Role"),
+                str(await options["fn"](this)),
+            )
 
 
 def _set(this, *args, **kwargs):
@@ -32,10 +40,12 @@ def _get(this, *args, **kwargs):
     return this.context.get(args[0], "")
 
 
+@pure
 def _array(this, *args, **kwargs):
     return list(args)
 
 
+@pure
 def _range(this, *args, **kwargs):
     args = list(args)
     for idx in range(len(args)):
@@ -49,111 +59,158 @@ def _range(this, *args, **kwargs):
     return list(range(args[0], args[1]))
 
 
+@pure
 def _concat(this, *args, **kwargs):
     return "".join([str(value) for value in kwargs.values()])
 
 
+@pure
 def _equal(this, *args, **kwargs):
     return args[0] == args[1]
 
 
+@pure
 def _less_than(this, *args, **kwargs):
     return float(args[0]) < float(args[1])
 
 
+@pure
 def _greater_than(this, *args, **kwargs):
     return float(args[0]) > float(args[1])
 
 
+@pure
 def _less_than_or_equal(this, *args, **kwargs):
     return float(args[0]) <= float(args[1])
 
 
+@pure
 def _greater_than_or_equal(this, *args, **kwargs):
     return float(args[0]) >= float(args[1])
 
 
+@pure
 def _json(this, *args, **kwargs):
     if not args:
         return ""
     return json.dumps(args[0])
 
 
+@pure
 def _double_open(this, *args, **kwargs):
     return "{{"
 
 
+@pure
 def _double_close(this, *args, **kwargs):
     return "}}"
 
 
+@pure
 def _camel_case(this, *args, **kwargs):
     return "".join([word.capitalize() for word in args[0].split("_")])
 
 
-# TODO: render functions are helpers
+@pure
+def _window(this, *args, **kwargs):
+    # {{#each (window messages max_tokens=2000 policy="keep_system")}}
+    messages = args[0] if args else kwargs.pop("messages", None)
+    if not messages:
+        return []
+    return window_messages(
+        messages,
+        kwargs.pop("max_tokens"),
+        kwargs.pop("policy", "last_tokens"),
+        **kwargs,
+    )
 
 
-class RunThread(threading.Thread):
-    # TODO: replace with better solution and/or figure out why asyncio.run will not work, or move to handlebars implementation that van handle async
-    def __init__(self, func, args, kwargs):
-        self.func = func
-        self.args = args
-        self.kwargs = kwargs
-        self.result = None
-        super().__init__()
+def create_func(function, fixed_kwargs):
+    """Wrap a plugin function the template calls as a helper."""
 
-    def run(self):
-        self.result = asyncio.run(self.func(*self.args, **self.kwargs))
+    # the compiled template awaits the helper on the caller's event loop
+    async def func(context, *args, **kwargs):
+        # a history windowed for the calling prompt is passed on whole
+        args = [unwindowed(value) for value in args]
+        kwargs = {name: unwindowed(value) for name, value in kwargs.items()}
+        return await function.run_async(*args, **{**fixed_kwargs, "variables": kwargs})
 
+    return func
 
-def create_func(function, fixed_kwargs):
-    def func(context, *args, **kwargs):
-        fixed_kwargs["variables"] = kwargs
-        thread = RunThread(func=function.run_async, args=args, kwargs=fixed_kwargs)
-        thread.start()
-        thread.join()
-        return thread.result
 
-    return func
+_BUILTIN_HELPERS = {
+    **DEFAULT_HELPERS,
+    "message": _message,
+    "set": _set,
+    "get": _get,
+    "array": _array,
+    "range": _range,
+    "concat": _concat,
+    "equal": _equal,
+    "lessThan": _less_than,
+    "greaterThan": _greater_than,
+    "lessThanOrEqual": _less_than_or_equal,
+    "greaterThanOrEqual": _greater_than_or_equal,
+    "json": _json,
+    "doubleOpen": _double_open,
+    "doubleClose": _double_close,
+    "camelCase": _camel_case,
+    "window": _window,
+}
+
+
+def builtin_helpers() -> Mapping[str, Any]:
+    """The helpers every template can call, by name."""
+    return MappingProxyType(_BUILTIN_HELPERS)
 
 
 class HandleBarsPromptTemplateHandler(SKBaseModel):
     template: str
-    _template_compiler: Any = PrivateAttr()
+    _template_compiler: CompiledTemplate = PrivateAttr()
 
-    def __init__(self, template: str):
+    def __init__(self, template: str, known_helpers: Container[str] | None = None):
         super().__init__(template=template)
-        compiler = Compiler()
-        pybars.debug = True
-        self._template_compiler = compiler.compile(self.template)
+        self._template_compiler = get_template_cache().get_or_compile(self.template)
+        if known_helpers is not None:
+            self.validate_helpers(known_helpers)
+
+    @property
+    def referenced_variables(self) -> frozenset[str]:
+        return self._template_compiler.analysis.variables
+
+    @property
+    def external_helpers(self) -> frozenset[str]:
+        """Helpers the template calls that have to come from plugin functions."""
+        return self._template_compiler.analysis.helper_calls - _BUILTIN_HELPERS.keys()
+
+    def validate_helpers(self, available: Container[str]):
+        """Raise if the template calls helpers that are neither built in nor available."""
+        unknown = sorted(
+            name for name in self.external_helpers if name not in available
+        )
+        if unknown:
+            raise HandleBarsTemplateError(
+                f"Could not find helpers: {', '.join(unknown)}"
+            )
 
     async def render(self, variables: dict, **kwargs) -> str:
-        helpers = {
-            "message": _message,
-            "set": _set,
-            "get": _get,
-            "array": _array,
-            "range": _range,
-            "concat": _concat,
-            "equal": _equal,
-            "lessThan": _less_than,
-            "greaterThan": _greater_than,
-            "lessThanOrEqual": _less_than_or_equal,
-            "greaterThanOrEqual": _greater_than_or_equal,
-            "json": _json,
-            "doubleOpen": _double_open,
-            "doubleClose": _double_close,
-            "camelCase": _camel_case,
-        }
+        """Render the template to text, with message blocks as message tags."""
+        helpers = self._bind_helpers(kwargs)
+        return await self._template_compiler(variables, helpers=helpers)
+
+    async def render_prompt(self, variables: dict, **kwargs) -> RenderedPrompt:
+        """Render the template to the chat messages its message blocks emit."""
+        helpers = self._bind_helpers(kwargs)
+        parts = await self._template_compiler.render_parts(variables, helpers=helpers)
+        return RenderedPrompt.from_parts(parts)
+
+    def _bind_helpers(self, kwargs: dict) -> dict:
+        template = self._template_compiler
+        helpers = template.bind_helpers(_BUILTIN_HELPERS)
         kwargs["called_by_template"] = True
-        if "plugin_functions" in kwargs:
-            plugin_functions = kwargs.get("plugin_functions")
-            if plugin_functions:
-                helpers.update(
-                    {
-                        name: create_func(function, kwargs)
-                        for name, function in plugin_functions.items()
-                    }
-                )
-        return self._template_compiler(variables, helpers=helpers)
+        plugin_functions = kwargs.get("plugin_functions") or {}
+        for name in template.analysis.names:
+            function = plugin_functions.get(name)
+            if function is not None:
+                helpers[name] = create_func(function, kwargs)
+        return helpers
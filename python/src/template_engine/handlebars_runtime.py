@@ -0,0 +1,353 @@
+"""Runtime support for templates compiled by handlebars_compiler.
+
+The lookup rules mirror pybars so compiled templates render the same text.
+"""
+
+import logging
+from inspect import isawaitable
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HandleBarsTemplateError(Exception):
+    pass
+
+
+class OutputPart:
+    """Structured output a helper emits; str() gives its text form."""
+
+    __slots__ = ()
+
+
+class StrList(list):
+    """A list of rendered parts, joined when converted to a string."""
+
+    def __str__(self):
+        return "".join(map(str, self))
+
+    def grow(self, thing: Any):
+        # output parts such as rendered messages are kept as they are
+        if type(thing) is str or isinstance(thing, (str, OutputPart)):
+            self.append(thing)
+            return
+        for element in thing:
+            self.grow(element)
+
+
+_PURE_HELPERS: set = set()
+
+
+def pure(helper):
+    """Mark a helper as pure: its output depends only on its arguments and blocks.
+
+    Output of blocks that only use pure helpers and constant or per-item values
+    is reused across renders.
+    """
+    _PURE_HELPERS.add(helper)
+    return helper
+
+
+def is_pure(helper: Any) -> bool:
+    try:
+        return helper in _PURE_HELPERS
+    except TypeError:
+        return False
+
+
+def helpers_are_pure(helpers: dict, names: tuple[str, ...]) -> bool:
+    for name in names:
+        helper = helpers.get(name)
+        if helper is not None and not is_pure(helper):
+            return False
+    return True
+
+
+def pick(context: Any, name: str, default: Any = None) -> Any:
+    try:
+        return context[name]
+    except (KeyError, TypeError, AttributeError):
+        if isinstance(name, str) and hasattr(context, name):
+            return getattr(context, name)
+        if hasattr(context, "get"):
+            return context.get(name)
+        return default
+
+
+class Scope:
+    __slots__ = (
+        "context",
+        "first",
+        "index",
+        "key",
+        "last",
+        "overrides",
+        "parent",
+        "root",
+    )
+
+    def __init__(
+        self,
+        context: Any,
+        parent: Any,
+        root: Any,
+        overrides: dict | None = None,
+        index: int | None = None,
+        key: Any = None,
+        first: bool | None = None,
+        last: bool | None = None,
+    ):
+        self.context = context
+        self.parent = parent
+        self.root = root
+        self.overrides = overrides
+        self.index = index
+        self.key = key
+        self.first = first
+        self.last = last
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name == "@root":
+            return self.root
+        if name == "@_parent":
+            return self.parent
+        if name == "@index" and self.index is not None:
+            return self.index
+        if name == "@key" and self.key is not None:
+            return self.key
+        if name == "@first" and self.first is not None:
+            return self.first
+        if name == "@last" and self.last is not None:
+            return self.last
+        if name == "this":
+            return self.context
+        if self.overrides and name in self.overrides:
+            return self.overrides[name]
+        return pick(self.context, name, default)
+
+    __getitem__ = get
+
+    def __len__(self):
+        return len(self.context)
+
+    def __str__(self):
+        return str(self.context)
+
+
+def ensure_scope(context: Any, root: Any) -> Scope:
+    return context if isinstance(context, Scope) else Scope(context, context, root)
+
+
+def resolve(context: Any, problems: list, *segments: str) -> Any:
+    carryover_data = False
+    # bare "this" paths should not return a Scope object
+    if segments == ("",) and isinstance(context, Scope):
+        return context.get("this")
+
+    for segment in segments:
+        # handle @../index syntax by moving the extra @ along the segment path
+        if carryover_data:
+            carryover_data = False
+            segment = f"@{segment}"
+        if len(segment) > 1 and segment[0:2] == "@@":
+            segment = segment[1:]
+            carryover_data = True
+
+        if context is None:
+            problems.extend(segments)
+            return None
+        if segment in (None, ""):
+            continue
+        if type(context) in (list, tuple):
+            if segment == "length":
+                return len(context)
+            context = context[int(segment)]
+        elif isinstance(context, Scope):
+            context = context.get(segment)
+        else:
+            context = pick(context, segment)
+
+    if context is None:
+        problems.extend(segments)
+    return context
+
+
+async def resolve_subexpr(helpers: dict, name: str, context: Any, *args, **kwargs):
+    helper = helpers.get(name)
+    if helper is None:
+        raise HandleBarsTemplateError(f"Could not find property {name}")
+    value = helper(context, *args, **kwargs)
+    if isawaitable(value):
+        value = await value
+    return value
+
+
+def prepare(value: Any) -> str | StrList | OutputPart:
+    if value is None:
+        return ""
+    value_type = type(value)
+    if value_type is StrList or value_type is str:
+        return value
+    if value_type is bool:
+        return "true" if value else "false"
+    if isinstance(value, OutputPart):
+        return value
+    return str(value)
+
+
+def missing_value_error(problems: list) -> HandleBarsTemplateError:
+    if len(problems) == 1:
+        return HandleBarsTemplateError(f"Could not find variable {problems[0]!r}")
+    return HandleBarsTemplateError(
+        f"Could not find object attribute {'.'.join(problems).replace('..', '.')!r}"
+    )
+
+
+async def no_block(this: Any) -> None:
+    return None
+
+
+async def raw_content(content: str, this: Any) -> str:
+    return content
+
+
+@pure
+async def _each(this, options, context):
+    result = StrList()
+    try:
+        last_index = len(context) - 1
+        # no items renders the else block
+        if last_index < 0:
+            raise IndexError()
+    except (TypeError, IndexError):
+        return await options["inverse"](this)
+
+    # only mappings get a @key
+    has_keys = hasattr(context, "keys")
+    for index, value in enumerate(context):
+        kwargs = {"index": index, "first": index == 0, "last": index == last_index}
+        if has_keys:
+            kwargs["key"] = value
+            value = context[value]
+        scope = Scope(value, this, options["root"], **kwargs)
+        try:
+            result.grow(await options["fn"](scope))
+        except TypeError:
+            pass
+    return result
+
+
+# entries kept per memoized each block
+EACH_MEMO_SIZE = 4096
+
+
+async def each_memoized(memo: dict, this, options, context):
+    """_each that reuses the output rendered for an immutable item last time.
+
+    Used for blocks whose output only depends on the item and pure helpers.
+    Items opt in with a true __template_immutable__ attribute; the memo maps
+    their id to the item and its output.
+    """
+    if hasattr(context, "keys"):
+        return await _each(this, options, context)
+    result = StrList()
+    try:
+        last_index = len(context) - 1
+        if last_index < 0:
+            raise IndexError()
+    except (TypeError, IndexError):
+        return await options["inverse"](this)
+
+    for index, value in enumerate(context):
+        immutable = getattr(value, "__template_immutable__", False)
+        if immutable:
+            entry = memo.get(id(value))
+            if entry is not None and entry[0] is value:
+                result.grow(entry[1])
+                continue
+        scope = Scope(
+            value,
+            this,
+            options["root"],
+            index=index,
+            first=index == 0,
+            last=index == last_index,
+        )
+        try:
+            output = await options["fn"](scope)
+        except TypeError:
+            continue
+        if immutable:
+            if len(memo) >= EACH_MEMO_SIZE:
+                memo.pop(next(iter(memo), None), None)
+            memo[id(value)] = (value, output)
+        result.grow(output)
+    return result
+
+
+@pure
+async def _if(this, options, context):
+    if callable(context):
+        context = context(this)
+        if isawaitable(context):
+            context = await context
+    if context:
+        return await options["fn"](this)
+    return await options["inverse"](this)
+
+
+@pure
+async def _unless(this, options, context):
+    if not context:
+        return await options["fn"](this)
+
+
+@pure
+async def _with(this, options, context):
+    return await options["fn"](context)
+
+
+@pure
+def _lookup(this, context, key):
+    try:
+        return context[key]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def _log(this, context):
+    _LOGGER.debug("Template log: %s", context)
+
+
+@pure
+async def _block_helper_missing(this, options, context):
+    if callable(context):
+        context = context(this)
+        if isawaitable(context):
+            context = await context
+    if context != "" and not context:
+        return await options["inverse"](this)
+    if type(context) in (list, StrList, tuple):
+        return await _each(this, options, context)
+    if context is True:
+        return await options["fn"](this)
+    return await options["fn"](context)
+
+
+@pure
+def _helper_missing(scope, name, *args, **kwargs):
+    if not args and not kwargs:
+        return None
+    raise HandleBarsTemplateError(f"Could not find property {name}")
+
+
+DEFAULT_HELPERS = {
+    "blockHelperMissing": _block_helper_missing,
+    "each": _each,
+    "if": _if,
+    "helperMissing": _helper_missing,
+    "log": _log,
+    "unless": _unless,
+    "with": _with,
+    "lookup": _lookup,
+}
@@ -0,0 +1,54 @@
+from collections.abc import Iterable
+
+from pydantic import Field
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from .handlebars_runtime import OutputPart
+
+
+class MessagePart(OutputPart):
+    """Rendered output of a message block: its role and content.
+
+    The text form, a message tag, is only built when the part is converted to a
+    string.
+    """
+
+    __slots__ = ("content", "role")
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+    def __str__(self) -> str:
+        return f'<message role="{self.role}">{self.content}</message>'
+
+    def __repr__(self) -> str:
+        return f"MessagePart(role={self.role!r}, content={self.content!r})"
+
+
+class RenderedPrompt(SKBaseModel):
+    """The chat messages a prompt template emitted while rendering.
+
+    The message helper outputs a MessagePart per message block, so connectors can
+    send the messages as they are instead of parsing them back out of rendered text.
+    """
+
+    messages: list[dict[str, str]] = Field(default_factory=list)
+
+    @classmethod
+    def from_parts(cls, parts: Iterable[str | MessagePart]) -> "RenderedPrompt":
+        prompt = cls()
+        for part in parts:
+            if isinstance(part, MessagePart):
+                prompt.add_message(part.role, part.content)
+        return prompt
+
+    def add_message(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+
+    def __str__(self) -> str:
+        # the text form of the messages, for debugging and logging
+        return "\n".join(
+            f'<message role="{message["role"]}">{message["content"]}</message>'
+            for message in self.messages
+        )
@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from pydantic import PrivateAttr
+from semantic_kernel.sk_pydantic import SKBaseModel
+
+from .handlebars_compiler import CompiledTemplate, compile_template
+
+
+def template_key(template: str) -> str:
+    """Return the cache key of a template source."""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+
+class TemplateCache(SKBaseModel):
+    """LRU cache of compiled templates keyed by a hash of the template source.
+
+    Compiled templates hold no render state, so one entry can be shared by every
+    handler, plan and thread using the same template source.
+    """
+
+    max_size: int = 256
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    _entries: OrderedDict[str, CompiledTemplate] = PrivateAttr(
+        default_factory=OrderedDict
+    )
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def get_or_compile(self, template: str) -> CompiledTemplate:
+        key = template_key(template)
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        compiled = compile_template(template)
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            self._evict()
+        return compiled
+
+    def put(self, template: str, compiled: CompiledTemplate):
+        """Add a template compiled elsewhere, like one loaded from a prompt bundle."""
+        key = template_key(template)
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, template: str) -> bool:
+        """Drop the compiled entry of a template source; return True if there was one."""
+        return self.invalidate_key(template_key(template))
+
+    def invalidate_key(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, max_size: int):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __contains__(self, template: str) -> bool:
+        return template_key(template) in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+_template_cache = TemplateCache()
+
+
+def get_template_cache() -> TemplateCache:
+    """Return the process-wide compiled template cache."""
+    return _template_cache
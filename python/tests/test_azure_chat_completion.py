@@ -0,0 +1,218 @@
+import asyncio
+import gc
+import json
+from contextlib import asynccontextmanager
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from python.src.connectors import (
+    RESPONSE_OBJECT_KEY,
+    AzureChatCompletion,
+    ResponseCache,
+    get_response_cache,
+)
+
+
+@asynccontextmanager
+async def azure_stub():
+    """A local Azure OpenAI chat completions endpoint recording its clients."""
+    app = web.Application()
+    seen = {"peers": set(), "requests": 0}
+
+    async def complete(request: web.Request) -> web.Response:
+        seen["peers"].add(request.transport.get_extra_info("peername"))
+        seen["requests"] += 1
+        body = await request.json()
+        content = "echo: " + body["messages"][-1]["content"]
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for word in content.split(" "):
+                chunk = {
+                    "id": "chatcmpl",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": request.match_info["deployment"],
+                    "choices": [{"index": 0, "delta": {"content": word}}],
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+        return web.Response(
+            text=json.dumps(
+                {
+                    "id": "chatcmpl",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": request.match_info["deployment"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 1,
+                        "completion_tokens": 1,
+                        "total_tokens": 2,
+                    },
+                }
+            ),
+            content_type="application/json",
+        )
+
+    app.router.add_post("/openai/deployments/{deployment}/chat/completions", complete)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield server, seen
+    finally:
+        await server.close()
+
+
+def _service(server: TestServer) -> AzureChatCompletion:
+    return AzureChatCompletion(
+        deployment_name="gpt-35-turbo",
+        api_key="key",
+        endpoint=str(server.make_url("")).rstrip("/"),
+        api_version="2023-07-01-preview",
+    )
+
+
+async def _complete(
+    service: AzureChatCompletion, content: str, **request_settings
+) -> str:
+    result = await service.complete_chat_async(
+        f'<message role="user">{content}</message>',
+        request_settings={"temperature": 0.0, **request_settings},
+    )
+    return result["result"]
+
+
+def test_requests_reuse_one_session_and_connection():
+    async def run():
+        async with azure_stub() as (server, seen):
+            async with _service(server) as service:
+                for index in range(5):
+                    assert await _complete(service, str(index)) == f"echo: {index}"
+                stats = service.pool_stats
+            return stats, seen["peers"], seen["requests"]
+
+    stats, peers, requests = asyncio.run(run())
+    assert requests == 5
+    assert stats["sessions_created"] == 1
+    assert stats["requests"] == 5
+    # sequential requests go over one kept-alive connection
+    assert len(peers) == 1
+
+
+def test_one_session_per_event_loop():
+    service = None
+
+    async def run():
+        nonlocal service
+        async with azure_stub() as (server, _):
+            service = service or _service(server)
+            service.endpoint = str(server.make_url("")).rstrip("/")
+            assert await _complete(service, "hello") == "echo: hello"
+            assert await _complete(service, "again") == "echo: again"
+            return service._session
+
+    # both loops stay open, so the first session is still usable when the
+    # second loop asks for one
+    loops = [asyncio.new_event_loop(), asyncio.new_event_loop()]
+    try:
+        first = loops[0].run_until_complete(run())
+        second = loops[1].run_until_complete(run())
+        assert not first.closed
+        assert first is not second
+        assert service.pool_stats["sessions_created"] == 2
+        loops[0].run_until_complete(first.close())
+        loops[1].run_until_complete(service.aclose())
+    finally:
+        for loop in loops:
+            loop.close()
+
+
+def test_close_releases_the_session():
+    async def run():
+        async with azure_stub() as (server, _):
+            service = _service(server)
+            async with service:
+                await _complete(service, "hello")
+                session = service._session
+                assert service.pool_stats["session_open"] == 1
+            assert session.closed
+            assert service.pool_stats["session_open"] == 0
+            # a closed service opens a new session on the next request
+            assert await _complete(service, "later") == "echo: later"
+            assert service.pool_stats["sessions_created"] == 2
+            await service.aclose()
+            return service
+
+    service = asyncio.run(run())
+    assert service._session is None
+
+
+def test_streams_count_as_in_flight_until_they_are_over():
+    async def stream(service: AzureChatCompletion, content: str):
+        result = await service.complete_chat_async(
+            f'<message role="user">{content}</message>',
+            request_settings={"temperature": 0.0, "stream": True},
+        )
+        return result[RESPONSE_OBJECT_KEY]
+
+    async def run():
+        async with azure_stub() as (server, _):
+            async with _service(server) as service:
+                read = await stream(service, "read")
+                dropped = await stream(service, "dropped")
+                assert service.pool_stats["in_flight"] == 2
+                words = [chunk.choices[0].delta.content async for chunk in read]
+                assert words == ["echo:", "read"]
+                assert service.pool_stats["in_flight"] == 1
+                # a stream dropped without being read ends its request too
+                del dropped
+                gc.collect()
+                # the shared read of a coalesced stream stops on the next turn
+                await asyncio.sleep(0.01)
+                return service.pool_stats
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] == 2
+
+
+def test_cache_path_setting_selects_the_persistent_cache(tmp_path):
+    cache_path = str(tmp_path / "responses.sqlite")
+
+    async def run():
+        async with azure_stub() as (server, seen):
+            async with _service(server) as service:
+                for _ in range(2):
+                    assert (
+                        await _complete(
+                            service, "hello", cache=True, cache_path=cache_path
+                        )
+                        == "echo: hello"
+                    )
+            cache = get_response_cache(cache_path)
+            stats = cache.stats
+            cache.close()
+            # the response is in the database, not only in memory
+            stored = ResponseCache(path=cache_path)
+            found = len(stored) == 0 and await stored.get_async(
+                next(iter(cache._entries))
+            )
+            stored.close()
+            return seen["requests"], stats, found
+
+    requests, stats, found = asyncio.run(run())
+    assert requests == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert found["choices"][0]["message"]["content"] == "echo: hello"
+    assert get_response_cache().stats["size"] == 0
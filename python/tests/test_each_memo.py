@@ -0,0 +1,103 @@
+import asyncio
+
+from python.src.connectors import OpenAIChatHistory
+from python.src.template_engine.handlebars_compiler import compile_template
+from python.src.template_engine.handlebars_prompt_template_handler import (
+    builtin_helpers,
+)
+from python.src.template_engine.handlebars_runtime import pure
+
+TEMPLATE = (
+    "{{#each messages}}{{#message role=Role}}{{shout Content}}{{/message}}{{/each}}"
+)
+
+
+class Renderer:
+    """Renders a template, counting the items its each block renders."""
+
+    def __init__(self, template: str = TEMPLATE, helper_is_pure: bool = True):
+        self.rendered = []
+
+        def shout(this, value):
+            self.rendered.append(value)
+            return value.upper()
+
+        self.template = compile_template(template)
+        self.helpers = self.template.bind_helpers(
+            builtin_helpers(), {"shout": pure(shout) if helper_is_pure else shout}
+        )
+
+    def __call__(self, messages) -> str:
+        self.rendered.clear()
+        return asyncio.run(self.template({"messages": messages}, self.helpers))
+
+
+def _history(*contents: str) -> OpenAIChatHistory:
+    history = OpenAIChatHistory()
+    for content in contents:
+        history.add_user_message(content)
+    return history
+
+
+def test_records_rendered_before_hit_the_memo():
+    render = Renderer()
+    history = _history("a", "b")
+
+    first = render(history)
+    assert render.rendered == ["a", "b"]
+
+    assert render(history) == first
+    assert render.rendered == []
+    assert first == '<message role="user">A</message><message role="user">B</message>'
+
+
+def test_a_new_history_segment_renders_only_the_new_messages():
+    render = Renderer()
+    history = _history("a", "b")
+    render(history)
+
+    fork = history.fork()
+    fork.add_assistant_message("c")
+    history.add_user_message("d")
+
+    assert render(fork).endswith('<message role="assistant">C</message>')
+    assert render.rendered == ["c"]
+    assert render(history).endswith('<message role="user">D</message>')
+    assert render.rendered == ["d"]
+
+
+def test_a_changed_item_is_rendered_again():
+    render = Renderer()
+    history = _history("a", "b")
+    render(history)
+
+    # a record is never changed in place; a changed message is a new record
+    changed = _history("a", "B2")
+    messages = [history[0], changed[1]]
+
+    assert render(messages) == (
+        '<message role="user">A</message><message role="user">B2</message>'
+    )
+    assert render.rendered == ["B2"]
+
+
+def test_mutable_items_and_impure_or_positional_blocks_are_not_memoized():
+    history = _history("a", "b")
+
+    render = Renderer()
+    dicts = [{"Role": "user", "Content": "a"}]
+    render(dicts)
+    dicts[0]["Content"] = "x"
+    assert render(dicts) == '<message role="user">X</message>'
+
+    render = Renderer(helper_is_pure=False)
+    render(history)
+    render(history)
+    assert render.rendered == ["a", "b"]
+
+    render = Renderer(
+        "{{#each messages}}{{@index}}{{shout Content}}{{/each}}", helper_is_pure=True
+    )
+    render(history)
+    assert render(history) == "0A1B"
+    assert render.rendered == ["a", "b"]
@@ -0,0 +1,134 @@
+import pytest
+
+from python.src.plugins.function_binder import FunctionBinder
+
+
+def _parameter(name: str, type_: str = "string", **metadata) -> dict:
+    return {
+        "name": name,
+        "direction": "input",
+        "description": "",
+        "default_value": "",
+        "type": type_,
+        "required": False,
+        **metadata,
+    }
+
+
+def report(count, label, enabled, tags, kernel=None, note="none"):
+    return count, label, enabled, tags, kernel, note
+
+
+BINDER = FunctionBinder(
+    report,
+    "Report",
+    [
+        _parameter("count", "number", required=True),
+        _parameter("label", "string", default_value="total"),
+        _parameter("enabled", "boolean", default_value="false"),
+        _parameter("tags", "array", default_value="[]"),
+        _parameter("kernel", "kernel", required=True),
+    ],
+)
+
+
+def test_arguments_are_converted_to_their_declared_types():
+    kernel = object()
+
+    args, kwargs = BINDER.bind(
+        (),
+        {
+            "variables": {"count": "3", "label": 7, "enabled": "True"},
+            "tags": '["a", "b"]',
+            "kernel": kernel,
+        },
+    )
+
+    assert args == ()
+    assert report(**kwargs) == (3.0, "7", True, ["a", "b"], kernel, "none")
+
+
+def test_declared_defaults_are_converted_and_python_defaults_kept():
+    _, kwargs = BINDER.bind((), {"variables": {"count": 1}})
+
+    assert kwargs == {
+        "count": 1.0,
+        "label": "total",
+        "enabled": False,
+        "tags": [],
+    }
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(True, True), ("no", False), (" YES ", True), ("0", False), (1, True), (0, False)],
+)
+def test_booleans(value, expected):
+    _, kwargs = BINDER.bind((), {"variables": {"count": 1, "enabled": value}})
+
+    assert kwargs["enabled"] is expected
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [([1, 2], [1, 2]), ((1, 2), [1, 2]), ("[1, 2]", [1, 2]), (range(2), [0, 1])],
+)
+def test_arrays(value, expected):
+    _, kwargs = BINDER.bind((), {"variables": {"count": 1, "tags": value}})
+
+    assert kwargs["tags"] == expected
+
+
+@pytest.mark.parametrize(
+    "variables, message",
+    [
+        ({"count": "three"}, "Report expects a number for 'count', got 'three'"),
+        ({"count": [1]}, "Report expects a number for 'count', got [1]"),
+        (
+            {"count": 1, "enabled": "maybe"},
+            "Report expects a boolean for 'enabled', got 'maybe'",
+        ),
+        ({"count": 1, "enabled": 2}, "Report expects a boolean for 'enabled', got 2"),
+        ({"count": 1, "tags": "a, b"}, "Report expects a array for 'tags', got 'a, b'"),
+        (
+            {"count": 1, "tags": {"a": 1}},
+            "Report expects a array for 'tags', got {'a': 1}",
+        ),
+        ({"count": 1, "tags": 5}, "Report expects a array for 'tags', got 5"),
+        ({}, "Report is missing the required parameter 'count'"),
+    ],
+)
+def test_errors(variables, message):
+    with pytest.raises(ValueError) as error:
+        BINDER.bind((), {"variables": variables})
+
+    assert str(error.value) == message
+
+
+def test_an_invalid_declared_default_fails_when_the_binder_is_built():
+    with pytest.raises(ValueError, match="Report expects a number for 'count'"):
+        FunctionBinder(
+            report, "Report", [_parameter("count", "number", default_value="many")]
+        )
+
+
+def test_positional_arguments_and_variables_mapping():
+    args, kwargs = BINDER.bind(({"label": "x"}, 2), {})
+
+    assert args == ()
+    assert kwargs["count"] == 2.0
+    assert kwargs["label"] == "x"
+    with pytest.raises(TypeError, match="takes 6 positional arguments but 7"):
+        BINDER.bind(tuple(range(7)), {})
+
+
+def test_functions_taking_variables_get_the_arguments_as_they_are():
+    def legacy(variables, **kwargs):
+        return variables
+
+    binder = FunctionBinder(legacy, "Legacy", [_parameter("count", "number")])
+
+    assert binder.bind((), {"variables": {"count": "x"}}) == (
+        (),
+        {"variables": {"count": "x"}},
+    )
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from python.src.plugins import sk_function, sk_function_parameter
+from python.src.plugins.function_executors import (
+    INLINE,
+    PROCESS,
+    THREAD,
+    run_with_policy,
+    set_pool_size,
+    shutdown_executors,
+)
+from python.src.plugins.native_function import NativeFunction
+
+
+@pytest.fixture(autouse=True)
+def pools():
+    yield
+    set_pool_size(THREAD, None)
+    set_pool_size(PROCESS, None)
+    shutdown_executors()
+
+
+_output = sk_function_parameter(name="result", direction="output", description="")
+
+
+def _where() -> tuple[int, str]:
+    return os.getpid(), threading.current_thread().name
+
+
+def _fail():
+    raise KeyError("boom")
+
+
+def test_each_policy_runs_where_it_says():
+    async def run():
+        return [
+            await run_with_policy(policy, _where)
+            for policy in (INLINE, THREAD, PROCESS)
+        ]
+
+    inline, thread, process = asyncio.run(run())
+
+    assert inline == (os.getpid(), threading.current_thread().name)
+    assert thread[0] == os.getpid() and thread[1].startswith("sk-native")
+    assert process[0] != os.getpid()
+
+
+@pytest.mark.parametrize("policy", [INLINE, THREAD, PROCESS])
+def test_exceptions_are_raised_to_the_caller(policy):
+    with pytest.raises(KeyError, match="boom"):
+        asyncio.run(run_with_policy(policy, _fail))
+
+
+def test_cancelling_a_call_that_has_not_started_skips_it():
+    set_pool_size(THREAD, 1)
+    release = threading.Event()
+    started = []
+
+    def work(name):
+        started.append(name)
+        release.wait(5)
+        return name
+
+    async def run():
+        running = asyncio.ensure_future(run_with_policy(THREAD, work, "running"))
+        queued = asyncio.ensure_future(run_with_policy(THREAD, work, "queued"))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(running, queued, return_exceptions=True)
+        # the call that was running is not interrupted; it finishes on the pool
+        return await run_with_policy(THREAD, work, "next")
+
+    assert asyncio.run(run()) == "next"
+    assert started == ["running", "next"]
+
+
+def test_coroutine_functions_cannot_use_a_pool():
+    @sk_function(name="Slow", executor=THREAD)
+    @_output
+    async def slow():
+        return 1
+
+    with pytest.raises(ValueError, match="cannot use the 'thread' execution policy"):
+        NativeFunction(slow)
+
+
+def test_unknown_policies_are_errors():
+    with pytest.raises(ValueError, match="Unknown execution policy 'gpu'"):
+        NativeFunction(sk_function(name="Fast", executor="gpu")(_output(lambda: 1)))
+    with pytest.raises(ValueError, match="Inline functions do not run on a pool"):
+        set_pool_size(INLINE, 2)
+
+
+def test_native_functions_run_on_their_pool():
+    @sk_function(name="Where", executor=THREAD)
+    @_output
+    def where():
+        return threading.current_thread().name
+
+    assert asyncio.run(NativeFunction(where).run_async()).startswith("sk-native")
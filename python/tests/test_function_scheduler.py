@@ -0,0 +1,114 @@
+import asyncio
+
+from semantic_kernel.skill_definition.parameter_view import ParameterView
+
+from python.src.plugins import SKFunction
+from python.src.scheduling import FunctionScheduler
+
+
+def _parameters(names: tuple[str, ...]) -> list[ParameterView]:
+    return [
+        ParameterView(name=name, description="", default_value="") for name in names
+    ]
+
+
+class Step(SKFunction):
+    """A function running body with its name and variables."""
+
+    body: object = None
+
+    async def run_async(self, variables, *args, **kwargs):
+        return await self.body(self.name, variables)
+
+
+def _step(name: str, body, inputs=(), outputs=()) -> Step:
+    return Step(
+        name=name,
+        description=name,
+        input_variables=_parameters(inputs),
+        output_variables=_parameters(outputs),
+        body=body,
+    )
+
+
+async def _invoke(function: SKFunction, variables):
+    return await function.run_async(variables)
+
+
+def test_dependents_run_after_their_dependencies_with_their_outputs():
+    events = []
+
+    async def produce(name, variables):
+        events.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        events.append(f"{name} end")
+        return {"text": "produced"}
+
+    async def consume(name, variables):
+        events.append(f"{name} start")
+        return {"result": variables["text"]}
+
+    functions = [
+        _step("consume_first", consume, inputs=("text",)),
+        _step("produce", produce, outputs=("text",)),
+        _step("consume", consume, inputs=("text",)),
+    ]
+    results = asyncio.run(
+        FunctionScheduler().run(functions, {"text": "given"}, _invoke)
+    )
+
+    # only functions after the producer get its output
+    assert [result.get("result") for result in results] == ["given", None, "produced"]
+    assert events.index("consume start") > events.index("produce end")
+
+
+def test_independent_functions_run_concurrently():
+    arrived = []
+
+    async def meet(name, variables):
+        arrived.append(name)
+        while len(arrived) < 3:
+            await asyncio.sleep(0)
+        return {"result": name}
+
+    functions = [_step(name, meet, inputs=("input",)) for name in "abc"]
+
+    async def run():
+        return await asyncio.wait_for(
+            FunctionScheduler().run(functions, {"input": "x"}, _invoke), 1.0
+        )
+
+    assert asyncio.run(run()) == [{"result": "a"}, {"result": "b"}, {"result": "c"}]
+
+
+def test_variables_are_merged_in_list_order():
+    async def set_variable(name, variables):
+        # the first function finishes last
+        await asyncio.sleep(0.02 if name == "first" else 0)
+        variables["shared"] = name
+        variables[name] = True
+        return {}
+
+    functions = [_step(name, set_variable) for name in ("first", "second")]
+    variables = {"shared": None}
+    asyncio.run(FunctionScheduler().run(functions, variables, _invoke))
+
+    assert variables == {"shared": "second", "first": True, "second": True}
+
+
+def test_functions_taking_the_same_mutable_variable_run_in_order():
+    events = []
+
+    async def append(name, variables):
+        events.append(f"{name} start")
+        await asyncio.sleep(0.01)
+        variables["messages"].append(name)
+        events.append(f"{name} end")
+        return {}
+
+    functions = [_step(name, append, inputs=("messages",)) for name in "ab"]
+    messages = []
+    asyncio.run(FunctionScheduler().run(functions, {"messages": messages}, _invoke))
+
+    assert events == ["a start", "a end", "b start", "b end"]
+    assert messages == ["a", "b"]
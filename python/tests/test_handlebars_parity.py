@@ -0,0 +1,168 @@
+"""The compiled templates render the same text as pybars, which they replace."""
+
+import asyncio
+import glob
+import os
+
+import pytest
+import yaml
+
+from python.src.connectors import OpenAIChatHistory
+from python.src.template_engine.handlebars_compiler import compile_template
+from python.src.template_engine.handlebars_prompt_template_handler import (
+    builtin_helpers,
+)
+from python.src.template_engine.handlebars_runtime import DEFAULT_HELPERS
+
+pybars = pytest.importorskip("pybars")
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+PROMPTS = [
+    *sorted(glob.glob(os.path.join(ROOT, "samples", "*", "*", "*", "*.prompt.yaml"))),
+    os.path.join(ROOT, "src", "planners", "handlebar_planner.prompt.yaml"),
+]
+PLUGIN_HELPERS = (
+    "Intent_GetNextStep",
+    "Math_GenerateMathProblem",
+    "Math_PerformMath",
+    "Search_GetSearchQuery",
+    "Search_Search",
+)
+
+
+def _join(this, *args, **kwargs):
+    return "|".join(str(arg) for arg in args) + "".join(
+        f";{name}={value}" for name, value in sorted(kwargs.items())
+    )
+
+
+def _upper(this, value):
+    return str(value).upper()
+
+
+EDGE_HELPERS = {"join": _join, "upper": _upper}
+EDGE_CASES = [
+    # whitespace control
+    ("{{name}}  {{~name~}}  {{name}}", {"name": "x"}),
+    ("a\n  {{~#if ok~}}\n  yes\n  {{~/if~}}\nb", {"ok": True}),
+    ("line\n{{#if ok}}\nstandalone\n{{/if}}\nend", {"ok": True}),
+    # raw blocks and comments
+    ("{{{{raw}}}}{{name}} {{#if}}{{{{/raw}}}} {{name}}", {"name": "x"}),
+    ("{{! a comment }}{{!-- a }} comment --}}x", {}),
+    # else blocks
+    (
+        "{{#if ok}}yes{{else}}no{{/if}} {{#unless ok}}u{{else}}v{{/unless}}",
+        {"ok": False},
+    ),
+    ("{{#each items}}{{this}}{{else}}empty{{/each}}", {"items": []}),
+    # nested each with data variables and parent paths
+    (
+        "{{#each rows}}{{@index}}:{{#each items}}{{@index}}{{this}}{{../label}}"
+        "{{#if @first}}F{{/if}}{{#if @last}}L{{/if}},{{/each}};{{/each}}",
+        {
+            "rows": [
+                {"label": "x", "items": ["a", "b"]},
+                {"label": "y", "items": ["c"]},
+            ]
+        },
+    ),
+    (
+        "{{#each rows}}{{#each items}}{{../../label}}{{/each}}{{/each}}",
+        {"rows": [{"items": ["a"]}], "label": "L"},
+    ),
+    ("{{#each map}}{{@key}}={{this}} {{/each}}", {"map": {"k1": 1, "k2": 2}}),
+    (
+        "{{#each items}}{{#if @first}}[{{/if}}{{this}}"
+        "{{#unless @last}}, {{/unless}}{{#if @last}}]{{/if}}{{/each}}",
+        {"items": [1, 2, 3]},
+    ),
+    # escaping
+    ("{{text}} {{{text}}} {{&text}}", {"text": "<a href=\"x\">'&'</a>`="}),
+    # hash arguments and subexpressions
+    ('{{join 1 "two" 3.5 true null}} {{join 0 size=1 kind="x"}}', {}),
+    ('{{join (upper name) key=(join name "y")}}', {"name": "n"}),
+    (
+        "{{#each people}}{{name}} {{../greeting}},{{/each}}",
+        {"people": [{"name": "Ada"}, {"name": "Bob"}], "greeting": "hi"},
+    ),
+    # paths, with and lookup
+    ("{{#with person}}{{first}}{{/with}}", {"person": {"first": "Ada"}}),
+    (
+        "{{person.first}} {{person/first}} {{this.person.first}}",
+        {"person": {"first": "Ada"}},
+    ),
+    ("{{lookup map key}}", {"map": {"a": "A"}, "key": "a"}),
+    # missing values
+    ("{{missing}}", {}),
+    ("{{#if missing}}x{{/if}}", {}),
+]
+
+
+def _render_pybars(source: str, context: dict, helpers: dict) -> str:
+    try:
+        return str(pybars.Compiler().compile(source)(context, helpers=helpers))
+    except Exception as exc:
+        return f"error: {exc}"
+
+
+def _render(source: str, context: dict, helpers: dict) -> str:
+    try:
+        template = compile_template(source)
+        return asyncio.run(
+            template(context, template.bind_helpers(DEFAULT_HELPERS, helpers))
+        )
+    except Exception as exc:
+        return f"error: {exc}"
+
+
+@pytest.mark.parametrize("source, context", EDGE_CASES)
+def test_edge_cases_render_like_pybars(source, context):
+    assert _render(source, context, EDGE_HELPERS) == _render_pybars(
+        source, context, EDGE_HELPERS
+    )
+
+
+def _message_pybars(this, options, **kwargs):
+    return f'<message role="{kwargs["role"]}">{options["fn"](this)}</message>'
+
+
+async def _message(this, options, **kwargs):
+    return f'<message role="{kwargs["role"]}">{await options["fn"](this)}</message>'
+
+
+def _plugin_helper(name: str):
+    def helper(this, *args, **kwargs):
+        return f"<{name} {args} {sorted(kwargs.items())}>"
+
+    return helper
+
+
+@pytest.mark.parametrize("path", PROMPTS, ids=os.path.basename)
+def test_sample_prompts_render_like_pybars(path):
+    with open(path) as file:
+        source = yaml.safe_load(file)["template"]
+    history = OpenAIChatHistory()
+    history.add_system_message("sys 'quoted' & <b>")
+    history.add_user_message("what is 2+2?")
+    history.add_assistant_message("It's 4.\nline two")
+    context = {
+        "messages": history,
+        "persona": "a 'snarky' <persona> & co",
+        "goal": "Solve: 2 + 2",
+        "last_plan": "an old plan",
+        "last_error": "boom",
+        "function_catalog": "the functions",
+    }
+    # the synchronous built-in helpers work with both engines
+    shared = {
+        name: helper
+        for name, helper in builtin_helpers().items()
+        if name not in DEFAULT_HELPERS and name != "message"
+    }
+    shared.update({name: _plugin_helper(name) for name in PLUGIN_HELPERS})
+
+    rendered = _render(source, context, {**shared, "message": _message})
+    assert not rendered.startswith("error")
+    assert rendered == _render_pybars(
+        source, context, {**shared, "message": _message_pybars}
+    )
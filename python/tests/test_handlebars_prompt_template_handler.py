@@ -0,0 +1,90 @@
+import asyncio
+
+from python.src.template_engine.handlebars_compiler import compile_template
+from python.src.template_engine.handlebars_prompt_template_handler import (
+    HandleBarsPromptTemplateHandler,
+    builtin_helpers,
+)
+from python.src.template_engine.handlebars_runtime import pure
+from python.src.template_engine.rendered_prompt import MessagePart
+
+
+class Function:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = []
+
+    async def run_async(self, *args, **kwargs) -> str:
+        self.calls.append((args, kwargs))
+        return f"{self.name}{args}"
+
+
+def test_only_the_helpers_a_template_references_are_bound():
+    handler = HandleBarsPromptTemplateHandler(
+        '{{Math_Add 1 2}}{{#if ok}} {{json "x"}}{{/if}} (binding test)'
+    )
+    add, subtract = Function("add"), Function("subtract")
+    kwargs = {"plugin_functions": {"Math_Add": add, "Math_Subtract": subtract}}
+
+    helpers = handler._bind_helpers(dict(kwargs))
+
+    assert {"Math_Add", "if", "json"} <= helpers.keys()
+    assert "Math_Subtract" not in helpers
+    assert "camelCase" not in helpers
+    assert handler.external_helpers == {"Math_Add"}
+
+    rendered = asyncio.run(handler.render({"ok": True}, **kwargs))
+
+    assert rendered == 'add(1, 2) "x" (binding test)'
+    assert subtract.calls == []
+    args, call_kwargs = add.calls[0]
+    assert args == (1, 2)
+    assert call_kwargs["called_by_template"] is True
+    assert call_kwargs["variables"] == {}
+
+
+def test_constant_message_blocks_are_rendered_once():
+    handler = HandleBarsPromptTemplateHandler(
+        '{{#message role="system"}}Be brief.{{/message}}'
+        "{{#message role=role}}{{question}}{{/message}}(constant test)"
+    )
+    template = handler._template_compiler
+
+    async def render(variables):
+        return await template.render_parts(variables, handler._bind_helpers({}))
+
+    first = asyncio.run(render({"role": "user", "question": "a"}))
+    second = asyncio.run(render({"role": "user", "question": "b"}))
+
+    system, question = [part for part in first if isinstance(part, MessagePart)]
+    assert (system.role, str(system)) == (
+        "system",
+        '<message role="system">Be brief.</message>',
+    )
+    assert question.content == "a"
+    # the constant block is reused, the block with variables is rendered again
+    parts = [part for part in second if isinstance(part, MessagePart)]
+    assert parts[0] is system
+    assert [part.content for part in parts] == ["Be brief.", "b"]
+
+
+def test_constant_blocks_of_impure_helpers_are_rendered_every_time():
+    calls = []
+
+    def impure(this, options, **kwargs):
+        calls.append("impure")
+        return "i"
+
+    @pure
+    def counted(this, options, **kwargs):
+        calls.append("pure")
+        return "p"
+
+    template = compile_template('{{#a x="1"}}t{{/a}}{{#b x="1"}}t{{/b}}')
+    helpers = template.bind_helpers(builtin_helpers(), {"a": impure, "b": counted})
+
+    for _ in range(3):
+        assert asyncio.run(template(None, helpers)) == "ip"
+
+    assert calls.count("impure") == 3
+    assert calls.count("pure") == 1
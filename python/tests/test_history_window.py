@@ -0,0 +1,85 @@
+import asyncio
+
+from pydantic import Field
+
+from python.src.connectors import OpenAIChatHistory
+from python.src.plugins import SemanticFunction, SKFunction
+from python.src.template_engine import RenderedPrompt
+
+
+class Recorder(SKFunction):
+    """A helper function recording the history it was called with."""
+
+    name: str = "Count"
+    description: str = "Counts the messages"
+    input_variables: list = Field(default_factory=list)
+    output_variables: list = Field(default_factory=list)
+
+    async def run_async(self, *args, variables=None, **kwargs):
+        self.__dict__.setdefault("calls", []).append(variables["messages"])
+        return str(len(variables["messages"]))
+
+
+class Service:
+    name = "gpt-35-turbo"
+
+    def __init__(self):
+        self.prompts: list[RenderedPrompt] = []
+
+    async def complete_chat_async(self, rendered, request_settings, **kwargs):
+        self.prompts.append(rendered)
+        return {"result": "done"}
+
+
+def _chat_function() -> SemanticFunction:
+    return SemanticFunction.from_dict(
+        {
+            "name": "Chat",
+            "description": "Chats",
+            "template_format": "handlebars",
+            "template": (
+                "{{#each messages}}"
+                "{{#message role=Role}}{{Content}}{{/message}}"
+                "{{/each}}"
+                '{{#message role="system"}}{{Test_Count messages=messages}}{{/message}}'
+            ),
+            "input_variables": [
+                {
+                    "name": "messages",
+                    "description": "The history",
+                    "type": "ChatHistory",
+                    "is_required": True,
+                }
+            ],
+            "output_variable": {"name": "result", "description": "The reply"},
+            "execution_settings": [
+                {
+                    "model_id_pattern": ".*",
+                    "history_window": {"max_tokens": 30, "policy": "last_tokens"},
+                }
+            ],
+        }
+    )
+
+
+def test_nested_helpers_get_the_whole_history():
+    history = OpenAIChatHistory()
+    for index in range(20):
+        history.add_user_message(f"message number {index}")
+    recorder = Recorder()
+    service = Service()
+
+    asyncio.run(
+        _chat_function().run_async(
+            {"messages": history},
+            services=[service],
+            plugin_functions={"Test_Count": recorder},
+        )
+    )
+    (messages,) = recorder.calls
+    assert messages is history
+    rendered = service.prompts[0].messages
+    # the prompt itself only renders the messages that fit the window
+    assert 1 < len(rendered) - 1 < len(history)
+    assert rendered[-2]["content"] == "message number 19"
+    assert rendered[-1]["content"] == str(len(history))
@@ -0,0 +1,86 @@
+import asyncio
+
+import openai
+
+from python.src.connectors import AzureChatCompletion
+from python.src.kernel import newKernel
+from python.src.plugins import SemanticFunction
+from python.src.streaming import StreamChunk, StreamResult
+
+CHUNKS = 50
+
+
+def _function() -> SemanticFunction:
+    return SemanticFunction.from_dict(
+        {
+            "name": "Echo",
+            "description": "Echoes the input",
+            "template_format": "handlebars",
+            "template": '{{#message role="user"}}{{input}}{{/message}}',
+            "input_variables": [
+                {
+                    "name": "input",
+                    "description": "The text to echo",
+                    "type": "string",
+                    "is_required": True,
+                }
+            ],
+            "output_variable": {"name": "result", "description": "The echo"},
+            "execution_settings": [{"model_id_pattern": ".*", "temperature": 0}],
+        }
+    )
+
+
+def _chunk(content: str) -> dict:
+    return openai.util.convert_to_openai_object(
+        {
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        }
+    )
+
+
+def test_slow_consumer_stalls_the_upstream_read(monkeypatch):
+    read = []
+
+    async def acreate(**model_args):
+        assert model_args["stream"]
+
+        async def stream():
+            for index in range(CHUNKS):
+                read.append(index)
+                yield _chunk(f"{index} ")
+
+        return stream()
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    service = AzureChatCompletion(
+        deployment_name="gpt-35-turbo",
+        api_key="key",
+        endpoint="http://127.0.0.1:1",
+        api_version="2023-07-01-preview",
+    )
+    kernel = newKernel(ai_services=[service])
+    function = _function()
+    buffer_size = 2
+
+    async def run():
+        events = kernel.run_stream_async(
+            function, variables={"input": "hello"}, buffer_size=buffer_size
+        )
+        first = await events.__anext__()
+        assert isinstance(first, StreamChunk)
+        # give the producer every chance to read ahead of the consumer
+        for _ in range(20):
+            await asyncio.sleep(0)
+        stalled_at = len(read)
+        rest = [event async for event in events]
+        await service.aclose()
+        return stalled_at, rest
+
+    stalled_at, rest = asyncio.run(run())
+    # one chunk consumed, buffer_size queued and one waiting to be queued
+    assert stalled_at <= buffer_size + 2
+    assert len(read) == CHUNKS
+    assert isinstance(rest[-1], StreamResult)
+    assert rest[-1].result["result"] == "".join(f"{index} " for index in range(CHUNKS))
@@ -0,0 +1,113 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+from python.src.connectors import RESPONSE_OBJECT_KEY, LoadBalancer
+from python.src.connectors.ai.openai.load_balancer import CLOSED, HALF_OPEN, OPEN
+
+
+class Deployment:
+    def __init__(self, endpoint: str):
+        self.name = "gpt-35-turbo"
+        self.endpoint = endpoint
+
+
+def _stream(chunks: int, fail: bool = False):
+    async def stream():
+        for index in range(chunks):
+            await asyncio.sleep(0)
+            yield index
+        if fail:
+            raise RuntimeError("connection reset")
+
+    return stream()
+
+
+def test_a_stream_is_tracked_until_it_ends():
+    balancer = LoadBalancer()
+    deployment = Deployment("a")
+
+    async def run():
+        async def send():
+            return {RESPONSE_OBJECT_KEY: _stream(3)}
+
+        result = await balancer.call(deployment, send)
+        stats = balancer.stats["gpt-35-turbo@a"]
+        assert stats["in_flight"] == 1 and stats["requests"] == 0
+        assert [chunk async for chunk in result[RESPONSE_OBJECT_KEY]] == [0, 1, 2]
+
+    asyncio.run(run())
+    stats = balancer.stats["gpt-35-turbo@a"]
+    assert stats["in_flight"] == 0
+    assert stats["requests"] == 1 and stats["failures"] == 0
+
+
+def test_errors_while_streaming_count_against_the_deployment():
+    balancer = LoadBalancer(failure_threshold=2)
+    deployment = Deployment("a")
+
+    async def run():
+        async def send():
+            return {RESPONSE_OBJECT_KEY: _stream(2, fail=True)}
+
+        for _ in range(2):
+            result = await balancer.call(deployment, send)
+            with pytest.raises(RuntimeError):
+                async for _ in result[RESPONSE_OBJECT_KEY]:
+                    pass
+
+    asyncio.run(run())
+    stats = balancer.stats["gpt-35-turbo@a"]
+    assert stats["failures"] == 2 and stats["state"] == OPEN
+
+
+def test_only_the_probe_ends_probing():
+    balancer = LoadBalancer(failure_threshold=1, open_seconds=0)
+    deployment = Deployment("a")
+    # a request that started before the circuit opened
+    earlier = balancer._begin(deployment)
+    with pytest.raises(RuntimeError):
+        with balancer.track(deployment):
+            raise RuntimeError("down")
+    health = balancer._health_of(deployment)
+    assert health.state == OPEN
+    assert balancer.choose([deployment, Deployment("b")]) is not None
+    assert health.state == HALF_OPEN
+
+    probe = balancer._begin(deployment)
+    assert probe.probe and health.probing
+    balancer._finish(earlier, asyncio.CancelledError())
+    # the probe is still running, so no other request may probe
+    assert health.probing
+    assert not health.available(0.0, balancer.open_seconds)
+    balancer._finish(probe)
+    assert not health.probing and health.state == CLOSED
+
+
+def test_a_dropped_probe_stream_ends_probing():
+    balancer = LoadBalancer(failure_threshold=1, open_seconds=0)
+    deployment = Deployment("a")
+    with pytest.raises(RuntimeError):
+        with balancer.track(deployment):
+            raise RuntimeError("down")
+    health = balancer._health_of(deployment)
+    assert health.available(time.monotonic(), balancer.open_seconds)
+    assert health.state == HALF_OPEN
+
+    async def run():
+        async def send():
+            return {RESPONSE_OBJECT_KEY: _stream(3)}
+
+        result = await balancer.call(deployment, send)
+        assert health.probing and health.in_flight == 1
+        # the probe's stream is dropped without being iterated
+        del result
+        gc.collect()
+
+    asyncio.run(run())
+    assert health.in_flight == 0
+    assert not health.probing
+    # the deployment can be probed again
+    assert health.available(time.monotonic(), balancer.open_seconds)
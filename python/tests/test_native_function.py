@@ -0,0 +1,127 @@
+import asyncio
+import sys
+
+import numpy as np
+import pytest
+
+from python.src.kernel import newKernel
+from python.src.planners.plan_graph import compile_plan
+from python.src.plugins import sk_function, sk_function_parameter
+from python.src.plugins.native_function import NativeFunction
+from python.src.template_engine import HandleBarsPromptTemplateHandler
+
+
+class Scale:
+    def __init__(self):
+        self.calls = []
+
+    @sk_function(name="Scale", pure=True, batch="scale_batch")
+    @sk_function_parameter(
+        name="number", description="The number", type="number", required=True
+    )
+    @sk_function_parameter(
+        name="factor", description="The factor", type="number", default_value="2"
+    )
+    def scale(self, number: float, factor: float) -> float:
+        self.calls.append("scalar")
+        return number * factor
+
+    def scale_batch(self, number: np.ndarray, factor: np.ndarray) -> np.ndarray:
+        self.calls.append("batch")
+        return number * factor
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_number_inputs_run_as_one_batch_call():
+    scale = Scale()
+    function = NativeFunction(scale.scale)
+
+    results = _run(
+        function.run_batch_async(
+            [{"number": 1, "factor": 3}, {"number": 2.5, "factor": 2}]
+        )
+    )
+
+    assert results == [3.0, 5.0]
+    assert scale.calls == ["batch"]
+
+
+@pytest.mark.parametrize(
+    "variables_list",
+    [
+        # a bool or a numeric string is not a plain number
+        [{"number": True, "factor": 3}],
+        [{"number": "2", "factor": 3}],
+        # the calls pass different inputs
+        [{"number": 1, "factor": 3}, {"number": 2}],
+        # an input without a number type
+        [{"number": 1, "unit": 3}],
+    ],
+)
+def test_other_inputs_fall_back_to_a_call_each(variables_list):
+    scale = Scale()
+    function = NativeFunction(scale.scale)
+
+    assert not function.can_batch(variables_list)
+    _run(function.run_batch_async(variables_list))
+    assert scale.calls == ["scalar"] * len(variables_list)
+
+
+def test_a_batch_result_of_the_wrong_shape_is_an_error():
+    scale = Scale()
+    scale.scale_batch = lambda number, factor: np.zeros(3)
+    function = NativeFunction(scale.scale)
+
+    with pytest.raises(ValueError, match=r"returned shape \(3,\) for 2 calls"):
+        _run(function.run_batch_async([{"number": 1}, {"number": 2}]))
+
+
+def test_an_each_block_of_a_plan_calls_the_batch_once():
+    scale = Scale()
+    function = NativeFunction(scale.scale)
+    functions = {"Math_Scale": function}
+    template = "{{#each (range 1 (get 'n'))}}{{Math_Scale number=this}},{{/each}}"
+    template = template.replace("'", '"')
+
+    async def run():
+        graph = await compile_plan(template, functions)
+        graph_output = await graph.run({"n": 5}, plugin_functions=functions)
+        calls = list(scale.calls)
+        rendered = await HandleBarsPromptTemplateHandler(template).render(
+            {"n": 5}, plugin_functions=functions
+        )
+        return graph_output, calls, rendered
+
+    graph_output, calls, rendered = _run(run())
+
+    assert graph_output == rendered == "2.0,4.0,6.0,8.0,"
+    assert calls == ["batch"]
+
+
+def test_calls_that_do_not_batch_do_not_need_numpy(monkeypatch):
+    scale = Scale()
+    function = NativeFunction(scale.scale)
+    # numpy is only imported by calls that go to a batch implementation
+    monkeypatch.setitem(sys.modules, "numpy", None)
+
+    assert _run(function.run_async(variables={"number": "4"})) == 8.0
+    assert _run(function.run_batch_async([{"number": "1"}, {"number": "2"}])) == [
+        2.0,
+        4.0,
+    ]
+    with pytest.raises(ImportError):
+        _run(function.run_batch_async([{"number": 1}]))
+
+
+def test_the_kernel_runs_a_native_function():
+    kernel = newKernel(ai_services=[])
+    scale = Scale()
+
+    result = _run(
+        kernel.run_async(NativeFunction(scale.scale), variables={"number": 4})
+    )
+
+    assert result == 8.0
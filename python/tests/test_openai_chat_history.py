@@ -0,0 +1,73 @@
+import tracemalloc
+
+import pytest
+
+from python.src.connectors import OpenAIChatHistory
+
+
+def _history(count: int) -> OpenAIChatHistory:
+    history = OpenAIChatHistory()
+    for index in range(count):
+        history.add_user_message(f"message {index}")
+    return history
+
+
+def test_messages_cannot_be_changed_through_the_property():
+    history = _history(2)
+
+    with pytest.raises(AttributeError):
+        history.messages.append("lost")
+
+    history.add_assistant_message("kept")
+    assert [message.content for message in history.messages] == [
+        "message 0",
+        "message 1",
+        "kept",
+    ]
+
+
+def test_snapshots_and_forks_keep_their_own_messages():
+    history = _history(2)
+    snapshot = history.snapshot()
+    fork = history.fork()
+
+    history.add_user_message("history")
+    fork.add_user_message("fork")
+
+    assert [message.content for message in snapshot] == ["message 0", "message 1"]
+    assert history[-1].content == "history"
+    assert fork[-1].content == "fork"
+    assert len(history) == len(fork) == 3
+    # the messages from before are shared, not copied
+    assert fork[0] is history[0] is snapshot[0]
+    assert snapshot.fork().messages == snapshot.messages
+
+
+def test_long_chains_of_forks_keep_every_message():
+    history = _history(1)
+    for index in range(100):
+        history = history.fork()
+        history.add_user_message(f"fork {index}")
+
+    assert len(history) == 101
+    assert history[50].content == "fork 49"
+    assert [message.content for message in history][-2:] == ["fork 98", "fork 99"]
+
+
+def test_forks_do_not_copy_the_history():
+    history = _history(2000)
+    forks = []
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(200):
+            fork = history.fork()
+            fork.add_user_message("next")
+            forks.append(fork)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    # a copy of the record list alone would take 16 KB for each fork
+    assert used / len(forks) < 4000
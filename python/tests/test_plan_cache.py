@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from python.src.kernel import newKernel
+from python.src.planners.handlebars_planner import (
+    HandleBarsPlanner,
+    HandleBarsPlannerConfig,
+)
+from python.src.planners.plan_cache import PlanCache, parameterize_goal
+from python.src.planners.plan_validator import PlanValidationError
+from python.src.plugins import PluginDirectory
+
+PLUGINS = os.path.join(
+    os.path.dirname(__file__), "..", "samples", "04-DynamicRag", "Plugins"
+)
+GOAL = "What is 12.5 plus 7?"
+PLAN = (
+    "Plan\n```handlebars\n"
+    '{{set "sum" (Math_Add number1=12.5 number2=7)}}{{json (get "sum")}}\n'
+    "```"
+)
+
+
+def test_goals_differing_in_literals_share_a_signature():
+    assert parameterize_goal("What is  12.5 plus 7 for 'Ada'?") == (
+        "what is # plus # for $?",
+        ["12.5", "7", "Ada"],
+    )
+    assert PlanCache.key(GOAL, "c")[0] == PlanCache.key("what is 3 plus 40?", "c")[0]
+    assert PlanCache.key(GOAL, "c")[0] != PlanCache.key(GOAL, "other")[0]
+
+
+def test_literal_arguments_are_generalized_to_placeholders():
+    cache = PlanCache()
+
+    assert cache.admit(GOAL, "c", PLAN)
+
+    assert cache.get("What is 3 plus -40?", "c") == PLAN.replace("12.5", "3").replace(
+        "number2=7", "number2=-40"
+    )
+    assert cache.get(GOAL, "other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_quoted_literals_are_filled_in_quoted():
+    cache = PlanCache()
+    plan = '```handlebars\n{{Search_Search query="cats"}}\n```'
+
+    assert cache.admit('Search for "cats"', "c", plan)
+
+    assert cache.get('Search for "dogs \' and \\"q\\""', "c") is None
+    assert cache.get("Search for 'a \"b\"'", "c") == (
+        '```handlebars\n{{Search_Search query="a \\"b\\""}}\n```'
+    )
+
+
+@pytest.mark.parametrize(
+    "goal, plan",
+    [
+        # the goal literal is not used by the plan
+        ("What is 1 plus 2?", PLAN),
+        # the goal literal is used twice
+        ("What is 7 plus 7?", PLAN.replace("12.5", "7")),
+        # the literal is also used as a constant
+        ("Add 7", PLAN.replace("12.5", "7")),
+        # no handlebars block
+        (GOAL, "just text 12.5 7"),
+    ],
+)
+def test_plans_that_cannot_be_generalized_are_not_admitted(goal, plan):
+    cache = PlanCache()
+
+    assert not cache.admit(goal, "c", plan)
+    assert len(cache) == 0
+
+
+def test_the_least_recently_used_plan_is_evicted():
+    cache = PlanCache(max_size=1)
+    cache.admit(GOAL, "a", PLAN)
+    cache.admit(GOAL, "b", PLAN)
+
+    assert cache.get(GOAL, "a") is None
+    assert cache.get(GOAL, "b") is not None
+
+
+def test_plans_persist_to_json(tmp_path):
+    path = str(tmp_path / "plans.json")
+    cache = PlanCache(path=path)
+    cache.admit(GOAL, "c", PLAN)
+
+    with open(path, encoding="utf-8") as file:
+        assert len(json.load(file)) == 1
+    restored = PlanCache(path=path)
+    assert restored.get("What is 1 plus 2?", "c") == PLAN.replace("12.5", "1").replace(
+        "number2=7", "number2=2"
+    )
+
+    assert restored.evict(GOAL, "c")
+    assert PlanCache(path=path).get(GOAL, "c") is None
+
+
+def test_unreadable_plan_files_are_ignored(tmp_path):
+    path = tmp_path / "plans.json"
+    path.write_text("not json")
+
+    assert PlanCache(path=str(path)).get(GOAL, "c") is None
+
+
+class Planner:
+    """A planner over the Math plugin whose model returns the given plans."""
+
+    def __init__(self, monkeypatch, *plans: str):
+        self.plans = list(plans)
+        self.calls = 0
+        self.cache = PlanCache()
+        self.config = HandleBarsPlannerConfig()
+        self.kernel = newKernel(
+            ai_services=[], plugins=[PluginDirectory(PLUGINS).plugin("Math")]
+        )
+
+        async def run_async(kernel, function, variables=None, **kwargs):
+            self.calls += 1
+            return {"result": self.plans.pop(0)}
+
+        monkeypatch.setattr(newKernel, "run_async", run_async)
+        self.planner = HandleBarsPlanner(
+            kernel=self.kernel, configuration=self.config, plan_cache=self.cache
+        )
+
+    def run(self, goal: str) -> tuple[bool, str]:
+        async def run():
+            plan = await self.planner.create_plan(goal)
+            return plan.from_cache, (await plan.run_async({}))["result"]
+
+        return asyncio.run(run())
+
+
+def test_a_plan_is_admitted_when_it_succeeds(monkeypatch):
+    planner = Planner(monkeypatch, PLAN)
+
+    assert planner.run(GOAL) == (False, "19.5")
+    assert planner.run("What is 3 plus 40?") == (True, "43.0")
+    assert planner.calls == 1
+
+
+def test_a_failing_plan_is_not_admitted_and_a_failing_cached_plan_is_evicted(
+    monkeypatch,
+):
+    failing = PLAN.replace("Math_Add", "Math_Missing")
+    planner = Planner(monkeypatch, failing, PLAN)
+
+    with pytest.raises(PlanValidationError):
+        planner.run(GOAL)
+    assert len(planner.cache) == 0
+
+    planner.run(GOAL)
+    # the cached plan stops working, for example after a function changed
+    key, _ = planner.cache.key(GOAL, planner.planner.get_catalog().fingerprint)
+    planner.cache._entries[key] = failing
+    with pytest.raises(PlanValidationError):
+        planner.run(GOAL)
+    assert len(planner.cache) == 0
+
+
+def test_repairs_after_an_error_skip_the_cache(monkeypatch):
+    planner = Planner(monkeypatch, PLAN, PLAN)
+    planner.run(GOAL)
+
+    planner.config.last_error = "the last plan failed"
+
+    assert planner.run(GOAL) == (False, "19.5")
+    assert planner.calls == 2
@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+import pytest
+
+from python.src.kernel import newKernel
+from python.src.planners.handlebars_plan import HandleBarsPlan
+from python.src.planners.plan_graph import PlanGraph, compile_plan
+from python.src.plugins import PluginDirectory
+from python.src.template_engine import HandleBarsPromptTemplateHandler
+
+PLUGINS = os.path.join(
+    os.path.dirname(__file__), "..", "samples", "04-DynamicRag", "Plugins"
+)
+MATH_PLANS = [
+    '{{set "sum" (Math_Add number1=23847 number2=347)}}{{json (get "sum")}}',
+    '{{set "a" 10}}{{set "b" 4}}'
+    '{{set "d" (Math_Subtract number1=(get "a") number2=(get "b"))}}'
+    'Difference: {{get "d"}}',
+    '{{set name="n" value=(Math_Round number1=(Math_Divide number1=10 number2=3)'
+    ' number2=2)}}Result {{get "n"}}',
+    '{{set "r" (Math_Sqrt number=(Math_Pow number=3 power=4))}}\n'
+    '{{json (get "r")}}\n{{json (equal (get "r") 9)}}',
+    "{{#each (range 1 5)}}{{Math_Multiply number1=this number2=3}} {{/each}}",
+    '{{set "x" (Math_Max number1=(get "input") number2=2)}}'
+    '{{set "y" (Math_Min number1=(get "x") number2=100)}}{{json (array (get "x") (get "y"))}}',
+    "{{!-- the steps --}}\n{{Math_Floor number=2.7}} {{Math_Ceil number=2.2}}\n"
+    "{{Math_Absolute number=-3}} {{Math_Sign number=-3}}",
+    '{{set "total" 0}}{{#each (array 1 2 3)}}{{Math_Modulo number1=this number2=2}}'
+    '{{/each}}{{set "total" (Math_Add number1=(get "total") number2=(get "input"))}}'
+    '{{get "total"}}',
+    '{{set "angle" 0}}{{json (Math_Cos number=(get "angle"))}} '
+    "{{Math_Log number1=100 number2=10}} {{greaterThan (Math_Sin number=0) -1}}",
+]
+
+
+@pytest.fixture(scope="module")
+def kernel():
+    return newKernel(ai_services=[], plugins=[PluginDirectory(PLUGINS).plugin("Math")])
+
+
+@pytest.mark.parametrize("template", MATH_PLANS)
+def test_a_compiled_plan_matches_the_rendered_template(kernel, template):
+    functions = kernel.function_registry.functions
+    rendered_variables = {"input": 7}
+    graph_variables = {"input": 7}
+
+    async def run():
+        graph = await compile_plan(template, functions)
+        assert isinstance(graph, PlanGraph)
+        # every step only waits for steps before it
+        assert len({step.index for step in graph.steps}) == len(graph.steps)
+        assert all(
+            dependency < step.index
+            for step in graph.steps
+            for dependency in step.dependencies
+        )
+        rendered = await HandleBarsPromptTemplateHandler(template).render(
+            rendered_variables, plugin_functions=functions
+        )
+        return rendered, await graph.run(graph_variables, plugin_functions=functions)
+
+    rendered, output = asyncio.run(run())
+
+    assert output == rendered
+    assert graph_variables == rendered_variables
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "{{Math_Add number1=person.age number2=1}}",
+        "{{#if input}}{{Math_Sqrt number=4}}{{/if}}",
+        "{{#each items}}{{Math_Sqrt number=this.value}}{{/each}}",
+    ],
+)
+def test_plans_with_variable_paths_or_other_blocks_are_rendered(kernel, template):
+    functions = kernel.function_registry.functions
+    plan = HandleBarsPlan(kernel=kernel, template=f"```handlebars\n{template}\n```")
+    variables = {"person": {"age": 41}, "input": True, "items": [{"value": 4}]}
+
+    async def run():
+        return await compile_plan(template, functions), await plan.run_async(variables)
+
+    graph, result = asyncio.run(run())
+
+    assert graph is None
+    assert isinstance(result["response_object"], HandleBarsPromptTemplateHandler)
+    assert result["result"] in ("42.0", "2.0")
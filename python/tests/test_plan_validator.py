@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from python.src.planners.plan_validator import has_errors, validate_plan
+from python.src.plugins import PluginDirectory
+
+PLUGINS = os.path.join(
+    os.path.dirname(__file__), "..", "samples", "04-DynamicRag", "Plugins"
+)
+
+
+@pytest.fixture(scope="module")
+def functions():
+    return PluginDirectory(PLUGINS).plugin("Math").functions.values()
+
+
+def _errors(plan: str, functions) -> list[tuple[str, str]]:
+    return [
+        (diagnostic.code, diagnostic.message)
+        for diagnostic in validate_plan(plan, functions)
+        if diagnostic.severity == "error"
+    ]
+
+
+def test_a_valid_plan_has_no_diagnostics(functions):
+    plan = (
+        "Steps\n```handlebars\n"
+        '{{set "sum" (Math_Add number1=1 number2="2.5")}}\n'
+        '{{#each (range 1 3)}}{{Math_Multiply number1=this number2=(get "sum")}}'
+        "{{/each}}\n"
+        '{{json (get "sum")}}\n'
+        "```"
+    )
+
+    assert validate_plan(plan, functions) == []
+
+
+@pytest.mark.parametrize(
+    "template, code, message",
+    [
+        (
+            "{{equal 1}}",
+            "arity",
+            "equal takes 2 positional arguments, got 1",
+        ),
+        (
+            "{{range 1 2 3}}",
+            "arity",
+            "range takes 1 to 2 positional arguments, got 3",
+        ),
+        (
+            '{{set "x"}}',
+            "arity",
+            "set takes a name and a value, as two arguments or as name= and value=",
+        ),
+        (
+            "{{Math_Missing number=1}}",
+            "unknown_helper",
+            "Unknown helper 'Math_Missing'",
+        ),
+        ("{{#loop items}}{{/loop}}", "unknown_helper", "Unknown helper 'loop'"),
+        (
+            "{{Math_Sqrt 4}}",
+            "positional_arguments",
+            "Math_Sqrt takes its parameters by name, like Math_Sqrt number=...",
+        ),
+        (
+            "{{Math_Sqrt value=4}}",
+            "unknown_parameter",
+            "Math_Sqrt has no parameter 'value'; it takes number",
+        ),
+        (
+            "{{Math_Add number1=1}}",
+            "missing_parameter",
+            "Math_Add is missing the required parameter 'number2'",
+        ),
+        (
+            '{{Math_Sqrt number="four"}}',
+            "type_mismatch",
+            "Math_Sqrt expects a number for 'number', got 'four'",
+        ),
+        (
+            "{{Math_Sqrt number=true}}",
+            "type_mismatch",
+            "Math_Sqrt expects a number for 'number', got True",
+        ),
+        (
+            "{{Math_Sqrt number=(range 3)}}",
+            "type_mismatch",
+            "Math_Sqrt expects a number for 'number', got the list from range",
+        ),
+        ("{{#if ok}}", "syntax", None),
+    ],
+)
+def test_errors(functions, template, code, message):
+    errors = _errors(template, functions)
+
+    # the first error is the one the plan is about; a misnamed argument also
+    # leaves a required parameter missing
+    assert errors[0][0] == code
+    if message is not None:
+        assert errors[0][1] == message
+
+
+def test_kernel_parameters_are_passed_by_the_kernel(functions):
+    assert _errors('{{Math_PerformMath math_problem="1 + 1"}}', functions) == []
+    assert _errors("{{Math_PerformMath}}", functions) == [
+        (
+            "missing_parameter",
+            "Math_PerformMath is missing the required parameter 'math_problem'",
+        )
+    ]
+
+
+def test_optional_parameters_may_be_left_out(functions):
+    assert _errors("{{Math_Log number1=8}}", functions) == []
+
+
+def test_reading_a_variable_that_is_never_set_is_a_warning(functions):
+    diagnostics = validate_plan('{{json (get "total")}}', functions)
+
+    assert not has_errors(diagnostics)
+    assert [(d.severity, d.code, d.line) for d in diagnostics] == [
+        ("warning", "undefined_variable", 1)
+    ]
+
+
+def test_a_plan_without_a_handlebars_block_is_an_error(functions):
+    assert _errors("```python\nprint(1)\n```", functions)[0][0] == "no_template"
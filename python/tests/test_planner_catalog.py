@@ -0,0 +1,20 @@
+import asyncio
+import os
+
+from python.src.planners.planner_catalog import PlannerCatalog
+from python.src.plugins import PluginDirectory
+
+PLUGINS = os.path.join(
+    os.path.dirname(__file__), "..", "samples", "04-DynamicRag", "Plugins"
+)
+
+
+def test_catalog_renders_the_math_plugin():
+    functions = list(PluginDirectory(PLUGINS).plugin("Math").functions.values())
+    catalog = PlannerCatalog(functions)
+
+    text = asyncio.run(catalog.render(catalog.functions))
+
+    for function in functions:
+        assert f"### {{{{{function.fully_qualified_name}}}}}`" in text
+    assert "  - number1: number - The first number to add (required)" in text
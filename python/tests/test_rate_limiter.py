@@ -0,0 +1,58 @@
+import asyncio
+import gc
+
+from python.src.connectors import RateLimiter
+
+
+def test_a_stream_holds_its_slot_until_it_ends():
+    limiter = RateLimiter(max_concurrency=1, tokens_per_minute=6000)
+    events = []
+
+    async def send(name: str):
+        async def stream():
+            for index in range(3):
+                events.append(f"{name}{index}")
+                await asyncio.sleep(0)
+                yield {"choices": [{"delta": {"content": "word "}}]}
+
+        return stream()
+
+    async def consume(name: str):
+        stream = await limiter.run(lambda: send(name), 100, completion_tokens=90)
+        async for _ in stream:
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(consume("a"), consume("b"))
+
+    asyncio.run(run())
+    # the second stream only started once the first one ended
+    assert events == ["a0", "a1", "a2", "b0", "b1", "b2"]
+    assert limiter.stats["active"] == 0
+    # 10 prompt tokens and 3 completion tokens per stream were used
+    assert limiter.stats["available_tokens"] > 6000 - 2 * 100
+
+
+def test_a_dropped_stream_releases_its_slot():
+    limiter = RateLimiter(max_concurrency=1)
+
+    async def send():
+        async def stream():
+            yield {"choices": [{"delta": {"content": "word"}}]}
+
+        return stream()
+
+    async def run():
+        stream = await limiter.run(send, 10)
+        assert limiter.stats["active"] == 1
+        # the stream is dropped without being iterated
+        del stream
+        gc.collect()
+        assert limiter.stats["active"] == 0
+        second = await asyncio.wait_for(limiter.run(send, 10), 1.0)
+        assert [chunk async for chunk in second] == [
+            {"choices": [{"delta": {"content": "word"}}]}
+        ]
+
+    asyncio.run(run())
+    assert limiter.stats["active"] == 0
@@ -0,0 +1,85 @@
+import asyncio
+
+import openai
+import pytest
+
+from python.src.connectors import AzureChatCompletion, OpenAIChatHistory
+from python.src.plugins import SemanticFunction
+from python.src.template_engine.rendered_prompt import MessagePart
+
+
+def _function() -> SemanticFunction:
+    return SemanticFunction.from_dict(
+        {
+            "name": "Chat",
+            "description": "Chats",
+            "template_format": "handlebars",
+            "template": (
+                '{{#message role="system"}}Be brief. </message> is text.{{/message}}'
+                "{{#each messages}}"
+                "{{#message role=Role}}{{~Content~}}{{/message}}"
+                "{{/each}}"
+            ),
+            "input_variables": [
+                {
+                    "name": "messages",
+                    "description": "The chat history",
+                    "type": "ChatHistory",
+                    "is_required": True,
+                }
+            ],
+            "output_variable": {"name": "result", "description": "The reply"},
+            "execution_settings": [{"model_id_pattern": ".*", "temperature": 0}],
+        }
+    )
+
+
+def test_chat_completion_sends_message_parts_without_text(monkeypatch):
+    sent = []
+
+    async def acreate(**model_args):
+        sent.append(model_args["messages"])
+        return openai.util.convert_to_openai_object(
+            {
+                "object": "chat.completion",
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": "ok"}}
+                ],
+            }
+        )
+
+    def no_text(*args, **kwargs):
+        pytest.fail("the prompt was converted to text")
+
+    monkeypatch.setattr(openai.ChatCompletion, "acreate", acreate)
+    monkeypatch.setattr(MessagePart, "__str__", no_text)
+    monkeypatch.setattr(OpenAIChatHistory, "from_rendered_template", no_text)
+    service = AzureChatCompletion(
+        deployment_name="gpt-35-turbo",
+        api_key="key",
+        endpoint="http://127.0.0.1:1",
+        api_version="2023-07-01-preview",
+    )
+    history = OpenAIChatHistory()
+    history.add_user_message("Hi <b>there</b>")
+    history.add_assistant_message("Hello")
+
+    async def run():
+        result = await _function().run_async({"messages": history}, services=[service])
+        await service.aclose()
+        return result
+
+    assert asyncio.run(run())["result"] == "ok"
+    assert sent == [
+        [
+            {"role": "system", "content": "Be brief. </message> is text."},
+            {"role": "user", "content": "Hi <b>there</b>"},
+            {"role": "assistant", "content": "Hello"},
+        ]
+    ]
+
+
+def test_message_parts_render_as_text_on_demand():
+    part = MessagePart("user", "hello")
+    assert str(part) == '<message role="user">hello</message>'
+    assert not isinstance(part, str)
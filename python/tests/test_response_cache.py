@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+from python.src.connectors import ResponseCache
+
+
+def test_sqlite_tier_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    connection = ResponseCache._connection
+
+    def record_thread(self):
+        threads.append(threading.get_ident())
+        return connection(self)
+
+    monkeypatch.setattr(ResponseCache, "_connection", record_thread)
+
+    async def run():
+        cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+        await cache.set_async("key", {"content": "cached"})
+        # the memory tier answers without touching the database
+        assert await cache.get_async("key") == {"content": "cached"}
+        reopened = ResponseCache(path=cache.path)
+        assert await reopened.get_async("key") == {"content": "cached"}
+        assert await reopened.get_async("missing") is None
+        cache.close()
+        reopened.close()
+        return threading.get_ident(), reopened.stats
+
+    loop_thread, stats = asyncio.run(run())
+    assert len(threads) == 3
+    assert loop_thread not in threads
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_memory_only_cache_stays_on_the_event_loop():
+    async def run():
+        cache = ResponseCache()
+        await cache.set_async("key", [1, 2])
+        return await cache.get_async("key"), await cache.get_async("other")
+
+    assert asyncio.run(run()) == ([1, 2], None)
@@ -0,0 +1,98 @@
+import asyncio
+import gc
+
+from python.src.connectors.ai.openai.single_flight import SingleFlight
+
+
+def _source(chunks: int, read: list):
+    async def create():
+        async def stream():
+            for index in range(chunks):
+                read.append(index)
+                await asyncio.sleep(0)
+                yield index
+
+        return stream()
+
+    return create
+
+
+def test_consumers_of_a_stream_share_one_read():
+    flight = SingleFlight()
+    read = []
+
+    async def run():
+        streams = await asyncio.gather(
+            *(flight.do("key", _source(5, read), stream=True) for _ in range(3))
+        )
+        return await asyncio.gather(*(_collect(stream) for stream in streams))
+
+    assert asyncio.run(run()) == [[0, 1, 2, 3, 4]] * 3
+    assert read == [0, 1, 2, 3, 4]
+    assert flight.calls == 1 and flight.coalesced == 2
+    assert flight.in_flight == 0
+
+
+def test_the_slowest_consumer_bounds_the_read():
+    flight = SingleFlight(stream_buffer_size=2)
+    read = []
+
+    async def run():
+        fast, slow = await asyncio.gather(
+            flight.do("key", _source(10, read), stream=True),
+            flight.do("key", _source(10, read), stream=True),
+        )
+        received = []
+
+        async def consume_fast():
+            async for chunk in fast:
+                received.append(chunk)
+
+        consumer = asyncio.ensure_future(consume_fast())
+        for _ in range(20):
+            await asyncio.sleep(0)
+        # the fast consumer waits for the slow one to catch up
+        stalled = (list(read), list(received))
+        rest = [chunk async for chunk in slow]
+        await consumer
+        return stalled, received, rest
+
+    (stalled_read, stalled_received), received, rest = asyncio.run(run())
+    assert stalled_read == [0, 1]
+    assert stalled_received == [0, 1]
+    assert received == rest == list(range(10))
+
+
+def test_a_dropped_consumer_does_not_hold_the_others_back():
+    flight = SingleFlight(stream_buffer_size=1)
+    read = []
+
+    async def run():
+        kept, dropped = await asyncio.gather(
+            flight.do("key", _source(5, read), stream=True),
+            flight.do("key", _source(5, read), stream=True),
+        )
+        del dropped
+        gc.collect()
+        return await asyncio.wait_for(_collect(kept), 1.0)
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert flight.in_flight == 0
+
+
+def test_a_late_caller_starts_a_new_call_once_chunks_were_dropped():
+    flight = SingleFlight()
+    read = []
+
+    async def run():
+        first = await flight.do("key", _source(3, read), stream=True)
+        assert await first.__anext__() == 0
+        late = await flight.do("key", _source(3, read), stream=True)
+        return await _collect(first), await _collect(late)
+
+    assert asyncio.run(run()) == ([1, 2], [0, 1, 2])
+    assert flight.calls == 2 and flight.coalesced == 0
+
+
+async def _collect(stream) -> list:
+    return [chunk async for chunk in stream]
@@ -0,0 +1,78 @@
+import asyncio
+
+from python.src.template_engine import TemplateCache, get_template_cache
+from python.src.template_engine.handlebars_prompt_template_handler import (
+    HandleBarsPromptTemplateHandler,
+)
+
+
+def test_a_template_is_compiled_once():
+    cache = TemplateCache()
+
+    first = cache.get_or_compile("Hello {{name}}")
+    second = cache.get_or_compile("Hello {{name}}")
+    other = cache.get_or_compile("Bye {{name}}")
+
+    assert first is second
+    assert other is not first
+    assert cache.stats == {
+        "size": 2,
+        "max_size": 256,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+    }
+
+
+def test_the_least_recently_used_template_is_evicted():
+    cache = TemplateCache(max_size=2)
+    cache.get_or_compile("a {{x}}")
+    cache.get_or_compile("b {{x}}")
+    # using a makes b the least recently used template
+    cache.get_or_compile("a {{x}}")
+
+    cache.get_or_compile("c {{x}}")
+
+    assert "a {{x}}" in cache
+    assert "b {{x}}" not in cache
+    assert "c {{x}}" in cache
+    assert cache.evictions == 1
+
+    cache.resize(1)
+
+    assert len(cache) == 1
+    assert "c {{x}}" in cache
+    assert cache.evictions == 2
+
+
+def test_an_invalidated_template_is_compiled_again():
+    cache = TemplateCache()
+    first = cache.get_or_compile("Hello {{name}}")
+
+    assert cache.invalidate("Hello {{name}}")
+    assert not cache.invalidate("Hello {{name}}")
+    assert cache.get_or_compile("Hello {{name}}") is not first
+    assert cache.misses == 2
+
+
+def test_handlers_of_one_template_share_the_compiled_template():
+    template = "{{#each items}}{{../prefix}}{{this}} {{/each}}(shared cache test)"
+    hits = get_template_cache().hits
+
+    first = HandleBarsPromptTemplateHandler(template)
+    second = HandleBarsPromptTemplateHandler(template)
+
+    assert first._template_compiler is second._template_compiler
+    assert get_template_cache().hits == hits + 1
+
+    async def render_both():
+        return await asyncio.gather(
+            first.render({"items": [1, 2], "prefix": "a"}),
+            second.render({"items": [3], "prefix": "b"}),
+        )
+
+    # the shared template keeps no state between renders
+    assert asyncio.run(render_both()) == [
+        "a1 a2 (shared cache test)",
+        "b3 (shared cache test)",
+    ]
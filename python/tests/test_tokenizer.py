@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+from python.src.models.chat import tokenizer
+
+
+@pytest.fixture
+def restore_encoding():
+    yield
+    tokenizer._encoding = None
+    tokenizer.count_tokens.cache_clear()
+
+
+def test_tokens_are_estimated_by_default():
+    text = "Count the tokens of this sentence, please."
+    assert tokenizer.count_tokens(text) == tokenizer.estimate_tokens(text)
+
+
+def test_load_encoding_without_tiktoken_keeps_estimating(monkeypatch, restore_encoding):
+    monkeypatch.setattr(tokenizer, "tiktoken", None)
+    assert not tokenizer.load_encoding()
+    assert tokenizer.count_tokens("hello world") == 2
+
+
+def test_load_encoding_counts_with_the_encoding(monkeypatch, restore_encoding):
+    encoding = SimpleNamespace(encode=lambda text, disallowed_special: text.split("o"))
+    loaded = []
+
+    def get_encoding(name):
+        loaded.append(name)
+        return encoding
+
+    monkeypatch.setattr(
+        tokenizer, "tiktoken", SimpleNamespace(get_encoding=get_encoding)
+    )
+    # an estimate cached before the encoding was loaded is not reused
+    assert tokenizer.count_tokens("foo boo zoo") == 3
+    assert tokenizer.load_encoding()
+    assert loaded == ["cl100k_base"]
+    assert tokenizer.count_tokens("foo boo zoo") == 7